@@ -0,0 +1,11 @@
+"""
+效能基準測試
+以 `python -m benchmarks.<模塊名>` 在專案根目錄執行：
+- bench_batch_mmap.py: 一萬張 PNG 的批次掃描中 Pillow、逐塊讀取與 mmap 的峰值 RSS 與讀取系統調用數比較
+- bench_metadata_reader.py: 檔頭元數據讀取與 Pillow 讀取的單檔延遲比較
+- bench_preview.py: 快速預覽路徑與僅 LANCZOS 的延遲與畫質比較
+- bench_prompt_formats.py: 混合格式語料中各格式的提示詞讀取吞吐量
+- bench_prompt_tokenizer.py: 加權提示詞分詞器與原本以逗號切分的速度比較
+- bench_startup.py: 以 -X importtime 量測到第一個窗口的啟動時間，並防止 AI 模組在啟動時載入
+- bench_tag_stats.py: 十萬張圖片的標籤統計建立、保存時增量更新與 top-k 查詢耗時
+"""
@@ -0,0 +1,145 @@
+"""
+比較批次掃描的三種讀取方式的峰值記憶體（RSS）與讀取系統調用數
+
+- pillow：Image.open + img.info，txt 以 open().read() 讀取（原本的做法）
+- header：逐塊 seek / read 檔頭，txt 以 open().read() 讀取
+- mmap：映射整個檔案後以 memoryview 切片掃描，txt 同樣以 mmap 讀取（批次模式的做法）
+
+每種方式在獨立的子進程中執行，峰值 RSS 取自 getrusage，讀取系統調用數（syscr）與
+讀取位元組數（rchar）取自 /proc/self/io（僅 Linux）。
+
+用法：
+    python -m benchmarks.bench_batch_mmap [--files 10000] [--size 256]
+"""
+from typing import Dict, Optional
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+
+
+MODES = ('pillow', 'header', 'mmap')
+PARAMETERS = ("masterpiece, best quality, 1girl, solo, long hair, smile\n"
+              "Negative prompt: lowres, bad anatomy\n"
+              "Steps: 28, Sampler: DPM++ 2M Karras, CFG scale: 7, Seed: 1234")
+
+
+def make_corpus(folder: str, count: int, size: int) -> None:
+    """建立帶有 parameters 文字塊的 PNG 與同名 txt（使用雜訊以避免被高度壓縮）"""
+    noise = Image.effect_noise((size, size), 64).convert('RGB')
+    info = PngInfo()
+    info.add_text('parameters', PARAMETERS)
+    first = os.path.join(folder, "00000.png")
+    noise.save(first, pnginfo=info, compress_level=1)
+    with open(first, 'rb') as f:
+        data = f.read()
+    # 內容相同的檔案直接複製位元組，避免重複編碼
+    for i in range(count):
+        path = os.path.join(folder, f"{i:05d}.png")
+        if i:
+            with open(path, 'wb') as f:
+                f.write(data)
+        with open(os.path.splitext(path)[0] + '.txt', 'w', encoding='utf-8') as f:
+            f.write("smile, outdoors, cherry blossoms, school uniform")
+
+
+def read_proc_io() -> Dict[str, int]:
+    """讀取 /proc/self/io，不支援時返回空字典"""
+    try:
+        with open('/proc/self/io', 'r') as f:
+            return {key: int(value) for key, value in
+                    (line.split(': ') for line in f.read().splitlines())}
+    except OSError:
+        return {}
+
+
+def peak_rss_mb() -> float:
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 為單位，macOS 以位元組為單位
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def run_worker(mode: str, folder: str) -> Dict[str, float]:
+    """在當前進程中以指定方式掃描資料夾，返回統計"""
+    from utils.image_utils import _read_info_with_pillow, prompts_from_info, read_txt_prompts
+    from utils.metadata_reader import read_image_metadata
+    from utils.prompt_tokenizer import split_prompts
+
+    paths = sorted(os.path.join(folder, name) for name in os.listdir(folder)
+                   if name.endswith('.png'))
+    baseline_rss = peak_rss_mb()
+    before = read_proc_io()
+    start = time.perf_counter()
+    for path in paths:
+        txt_path = os.path.splitext(path)[0] + '.txt'
+        if mode == 'pillow':
+            prompts_from_info(_read_info_with_pillow(path))
+            with open(txt_path, 'r', encoding='utf-8') as f:
+                split_prompts(f.read().strip())
+        elif mode == 'header':
+            prompts_from_info(read_image_metadata(path))
+            read_txt_prompts(txt_path)
+        else:
+            prompts_from_info(read_image_metadata(path, use_mmap=True))
+            read_txt_prompts(txt_path, use_mmap=True)
+    elapsed = time.perf_counter() - start
+    after = read_proc_io()
+    return {
+        'files': len(paths),
+        'seconds': elapsed,
+        'peak_rss_mb': peak_rss_mb(),
+        'rss_growth_mb': peak_rss_mb() - baseline_rss,
+        'syscr': after.get('syscr', 0) - before.get('syscr', 0) if after else -1,
+        'rchar_mb': (after.get('rchar', 0) - before.get('rchar', 0)) / 1024 / 1024 if after else -1,
+    }
+
+
+def run_mode(mode: str, folder: str) -> Optional[Dict[str, float]]:
+    """在子進程中執行一種方式，使峰值 RSS 互不影響"""
+    result = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_batch_mmap', '--worker', mode, folder],
+        capture_output=True, text=True)
+    if result.returncode != 0:
+        print(result.stderr, file=sys.stderr)
+        return None
+    return json.loads(result.stdout)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--files', type=int, default=10000)
+    parser.add_argument('--size', type=int, default=256, help="圖片邊長（像素）")
+    parser.add_argument('--worker', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('folder', nargs='?', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.folder)))
+        return
+
+    with tempfile.TemporaryDirectory() as folder:
+        make_corpus(folder, args.files, args.size)
+        total_mb = sum(os.path.getsize(os.path.join(folder, name))
+                       for name in os.listdir(folder)) / 1024 / 1024
+        print(f"語料：{args.files} 個 PNG 與同名 txt，共 {total_mb:.0f} MB")
+        print(f"{'方式':<8}{'檔案/秒':>10}{'峰值 RSS':>12}{'RSS 增長':>12}"
+              f"{'讀取調用':>12}{'讀取量':>12}")
+        for mode in MODES:
+            stats = run_mode(mode, folder)
+            if stats is None:
+                continue
+            syscr = f"{stats['syscr']:.0f}" if stats['syscr'] >= 0 else "-"
+            rchar = f"{stats['rchar_mb']:.1f} MB" if stats['rchar_mb'] >= 0 else "-"
+            print(f"{mode:<8}{stats['files'] / stats['seconds']:>10.0f}"
+                  f"{stats['peak_rss_mb']:>9.1f} MB{stats['rss_growth_mb']:>9.1f} MB"
+                  f"{syscr:>12}{rchar:>12}")
+
+
+if __name__ == "__main__":
+    main()
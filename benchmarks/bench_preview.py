@@ -0,0 +1,74 @@
+"""
+比較快速預覽路徑（JPEG draft / reduce）與僅使用 LANCZOS 的延遲與畫質
+
+畫質以快速路徑輸出相對於 LANCZOS 輸出的 PSNR 表示（越高越接近，40 dB 以上肉眼難以分辨）。
+
+用法：
+    python -m benchmarks.bench_preview [--size 4000] [--repeat 3]
+"""
+from typing import Tuple
+import argparse
+import math
+import os
+import tempfile
+import time
+from PIL import Image, ImageChops, ImageDraw, ImageStat
+from utils.image_handler import ImageHandler
+
+
+def make_source(size: int) -> Image.Image:
+    """建立帶有漸層、細線與雜訊的測試圖片，讓縮放誤差可以被量測"""
+    width, height = size, size * 3 // 4
+    image = Image.merge('RGB', [
+        Image.linear_gradient('L').resize((width, height)),
+        Image.radial_gradient('L').resize((width, height)),
+        Image.effect_noise((width, height), 40),
+    ])
+    draw = ImageDraw.Draw(image)
+    for x in range(0, width, 37):
+        draw.line([(x, 0), (width - x, height)], fill=(255, 255, 255), width=3)
+    return image
+
+
+def psnr(a: Image.Image, b: Image.Image) -> float:
+    """計算兩張圖片之間的 PSNR（dB）"""
+    rms = ImageStat.Stat(ImageChops.difference(a, b)).rms
+    mse = sum(r * r for r in rms) / len(rms)
+    return float('inf') if mse == 0 else 10 * math.log10(255 * 255 / mse)
+
+
+def run(handler: ImageHandler, path: str, fast: bool, repeat: int) -> Tuple[float, Image.Image]:
+    """返回多次執行中的最佳延遲（毫秒）與輸出圖片"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with Image.open(path) as image:
+            result = handler.resize_image(image, fast=fast)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=4000, help="來源圖片寬度（像素）")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    handler = ImageHandler()
+    source = make_source(args.size)
+    with tempfile.TemporaryDirectory() as folder:
+        for name, kwargs in [('jpeg', {'quality': 92}), ('png', {'compress_level': 1})]:
+            path = os.path.join(folder, f"source.{name}")
+            source.save(path, **kwargs)
+
+            slow_ms, reference = run(handler, path, False, args.repeat)
+            fast_ms, preview = run(handler, path, True, args.repeat)
+            print(f"{name:>4} {source.width}x{source.height}: "
+                  f"LANCZOS {slow_ms:.1f} ms, 快速 {fast_ms:.1f} ms "
+                  f"({slow_ms / fast_ms:.1f}x), PSNR {psnr(reference, preview):.1f} dB")
+    handler.prefetcher.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+比較加權提示詞分詞器與原本以逗號切分（str.split）的速度
+
+語料分為純標籤、含 A1111 權重語法（括號、[a|b]、<lora:...>、BREAK）與括號中含逗號三種，
+分別量測 split_prompts()、tokenize_prompt() 與舊的切分方式每條提示詞的耗時。
+
+用法：
+    python -m benchmarks.bench_prompt_tokenizer [--prompts 20000] [--repeat 5]
+"""
+from typing import Callable, List
+import argparse
+import random
+import time
+from utils.prompt_tokenizer import parse_token, split_prompts, tokenize_prompt
+
+
+TAGS = ["1girl", "solo", "long_hair", "smile", "blue eyes", "looking at viewer", "outdoors",
+        "cherry blossoms", "school uniform", "pleated skirt", "upper body", "sky", "day"]
+WEIGHTED = ["(masterpiece:1.2)", "((best quality))", "[blurry]", "[cat|dog]",
+            "<lora:detail_tweaker:0.6>", "ganyu \\(genshin impact\\)"]
+GROUPED = ["(red hair, twintails:1.1)", "(sunset, (clouds:0.8), horizon)"]
+
+
+def old_split(text: str) -> List[str]:
+    """原本的實作"""
+    return [p.strip() for p in text.split(',') if p.strip()]
+
+
+def make_prompts(count: int, extra: List[str], seed: int = 0) -> List[str]:
+    """每條提示詞包含 10 個普通標籤與 extra 中的 4 個（extra 為空時只有普通標籤）"""
+    rng = random.Random(seed)
+    prompts = []
+    for _ in range(count):
+        tags = rng.sample(TAGS, 10)
+        if extra:
+            tags += [rng.choice(extra) for _ in range(4)]
+            rng.shuffle(tags)
+            tags.insert(len(tags) // 2, "BREAK")
+        prompts.append(", ".join(tags))
+    return prompts
+
+
+def best_us(func: Callable[[str], list], prompts: List[str], repeat: int) -> float:
+    """多次執行中的最佳平均耗時（微秒/條）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for prompt in prompts:
+            func(prompt)
+        best = min(best, time.perf_counter() - start)
+    return best / len(prompts) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--prompts', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'語料':<10}{'str.split':>12}{'split_prompts':>16}{'tokenize_prompt':>18}  (µs/條)")
+    corpora = [("純標籤", []), ("含權重", WEIGHTED), ("括號含逗號", WEIGHTED + GROUPED)]
+    for name, extra in corpora:
+        prompts = make_prompts(args.prompts, extra)
+        parse_token.cache_clear()
+        old = best_us(old_split, prompts, args.repeat)
+        new = best_us(split_prompts, prompts, args.repeat)
+        tokens = best_us(tokenize_prompt, prompts, args.repeat)
+        print(f"{name:<10}{old:>12.2f}{new:>16.2f}{tokens:>18.2f}")
+
+
+if __name__ == "__main__":
+    main()
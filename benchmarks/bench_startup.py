@@ -0,0 +1,128 @@
+"""
+啟動時間基準：以 `python -X importtime` 執行 prompt_reader.main，量測到第一個窗口出現為止的時間
+
+子進程中把 MainWindow.run 換成「繪製一次窗口後立即關閉」，因此量到的是
+解譯器啟動、模組載入、建立窗口並完成第一次繪製的總時間。沒有顯示器時只量測模組載入。
+
+除了列出最耗時的模組，也作為防護：第一個窗口出現前載入了 AI 相關的重量級模組
+（google.genai 等），或模組載入總時間超過 --budget-ms 時以狀態碼 1 結束。
+
+用法：
+    python -m benchmarks.bench_startup [--repeat 3] [--budget-ms 300] [--top 10]
+"""
+from typing import Dict, List, Tuple
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+
+# 第一個窗口出現前不應載入的模組（只在第一次使用 Gemini 時載入）
+DEFERRED_MODULES = ('google.genai', 'httpx', 'pydantic', 'utils.gemini_interface')
+
+_CHILD = r"""
+import json, sys
+import prompt_reader
+import ui.main_window
+
+def show_once(self):
+    self.root.update()
+    print('WINDOW', flush=True)
+    self.root.destroy()
+
+ui.main_window.MainWindow.run = show_once
+try:
+    prompt_reader.main([])
+except Exception as e:  # 沒有顯示器時 Tk() 會失敗
+    print('NO_WINDOW ' + str(e).splitlines()[0], flush=True)
+print('MODULES ' + json.dumps(sorted(sys.modules)), flush=True)
+"""
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """
+    解析 -X importtime 的輸出
+
+    Returns:
+        List[Tuple[str, int, int, int]]: （模組, 自身微秒, 累計微秒, 巢狀層級）
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def run_once(root: str) -> Dict:
+    """啟動一次子進程並返回量測結果"""
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, '-X', 'importtime', '-c', _CHILD], cwd=root,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    window_ms = None
+    modules: List[str] = []
+    note = ''
+    for line in proc.stdout:
+        if line.startswith('WINDOW'):
+            window_ms = (time.perf_counter() - start) * 1000
+        elif line.startswith('NO_WINDOW'):
+            note = line[len('NO_WINDOW '):].strip()
+        elif line.startswith('MODULES '):
+            modules = json.loads(line[len('MODULES '):])
+    stderr = proc.stderr.read()
+    proc.wait()
+
+    rows = parse_importtime(stderr)
+    return {
+        'window_ms': window_ms,
+        'import_ms': sum(row[2] for row in rows if row[3] == 0) / 1000,
+        'rows': rows,
+        'modules': modules,
+        'note': note,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--budget-ms', type=float, default=300,
+                        help="模組載入總時間的上限（毫秒），超過時以狀態碼 1 結束")
+    parser.add_argument('--top', type=int, default=10, help="列出最耗時的模組數")
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results = [run_once(root) for _ in range(args.repeat)]
+    best = min(results, key=lambda r: r['import_ms'])
+
+    print(f"模組載入：最佳 {best['import_ms']:.1f} ms（{args.repeat} 次）")
+    windows = [r['window_ms'] for r in results if r['window_ms'] is not None]
+    if windows:
+        print(f"第一個窗口：最佳 {min(windows):.1f} ms")
+    else:
+        print(f"未建立窗口（{best['note'] or '沒有顯示器'}），只量測模組載入")
+
+    print("累計時間最長的頂層模組：")
+    top_level = sorted((row for row in best['rows'] if row[3] == 0),
+                       key=lambda row: row[2], reverse=True)
+    for name, _, cumulative_us, _ in top_level[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    failed = False
+    loaded = [name for name in best['modules']
+              if any(name == m or name.startswith(m + '.') for m in DEFERRED_MODULES)]
+    if loaded:
+        print(f"失敗：第一個窗口出現前載入了 {', '.join(loaded[:5])}")
+        failed = True
+    if best['import_ms'] > args.budget_ms:
+        print(f"失敗：模組載入 {best['import_ms']:.1f} ms 超過上限 {args.budget_ms:.0f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
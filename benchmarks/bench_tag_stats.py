@@ -0,0 +1,92 @@
+"""
+量測標籤統計在大型資料集上的建立、增量更新與查詢耗時
+
+以 Zipf 分佈產生標籤詞彙（少數標籤出現在大多數圖片中，與實際資料集相似），
+比較保存一張圖片的 txt 後增量更新與重新統計整個資料夾的耗時，
+並量測更新後 top_tags() 與 cooccurring() 的查詢延遲。
+
+用法：
+    python -m benchmarks.bench_tag_stats [--images 100000] [--tags 30] [--vocabulary 20000]
+        [--edits 200]
+"""
+from collections import Counter
+from typing import Callable, List
+import argparse
+import itertools
+import random
+import statistics
+import time
+from utils.tag_stats import TagStatistics
+
+
+def make_images(count: int, tags_per_image: int, vocabulary: int,
+                seed: int = 0) -> List[List[str]]:
+    """產生每張圖片的標籤，第 i 個標籤被選中的權重為 1 / (i + 1)"""
+    rng = random.Random(seed)
+    names = [f"tag_{i}" for i in range(vocabulary)]
+    cumulative = list(itertools.accumulate(1 / (i + 1) for i in range(vocabulary)))
+    images = []
+    for _ in range(count):
+        tags = set(rng.choices(names, cum_weights=cumulative, k=tags_per_image))
+        images.append(sorted(tags))
+    return images
+
+
+def best_ms(func: Callable[[], object], repeat: int) -> float:
+    """多次執行中的最佳耗時（毫秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1e3
+
+
+def recount(images: List[List[str]]) -> Counter:
+    """不做增量更新時每次保存都要重新統計的最低成本（只計算標籤次數）"""
+    counts: Counter = Counter()
+    for tags in images:
+        counts.update(tags)
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--images', type=int, default=100000)
+    parser.add_argument('--tags', type=int, default=30)
+    parser.add_argument('--vocabulary', type=int, default=20000)
+    parser.add_argument('--edits', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    images = make_images(args.images, args.tags, args.vocabulary)
+    paths = [f"{i:06d}.png" for i in range(len(images))]
+
+    start = time.perf_counter()
+    stats = TagStatistics.build(paths, lambda path: images[int(path[:6])])
+    build = time.perf_counter() - start
+    print(f"{len(images)} 張圖片，{stats.tag_count} 個不同標籤，建立耗時 {build:.2f} 秒")
+
+    top_tag = stats.top_tags(1)[0][0]
+    first_top = best_ms(lambda: stats.top_tags(50), 1)
+    first_partners = best_ms(lambda: stats.cooccurring(top_tag, 50), 1)
+
+    # 模擬在界面中編輯並保存一張圖片的 txt（移除兩個標籤、加入兩個標籤），每次保存後查詢
+    rng = random.Random(1)
+    timings: List[List[float]] = [[], [], []]
+    for _ in range(args.edits):
+        path = rng.choice(paths)
+        tags = images[int(path[:6])][2:] + [top_tag, f"tag_{rng.randrange(args.vocabulary)}"]
+        timings[0].append(best_ms(lambda: stats.set_image_tags(path, tags), 1))
+        timings[1].append(best_ms(lambda: stats.top_tags(50), 1))
+        timings[2].append(best_ms(lambda: stats.cooccurring(top_tag, 50), 1))
+    update, top, partners = (statistics.median(t) for t in timings)
+    full = best_ms(lambda: recount(images), args.repeat)
+
+    print(f"首次查詢（建立排名）  top_tags: {first_top:.2f} ms  cooccurring: {first_partners:.2f} ms")
+    print(f"保存一張圖片（中位數）增量更新: {update:.3f} ms  重新統計次數: {full:.1f} ms")
+    print(f"更新後查詢（中位數）  top_tags: {top:.3f} ms  cooccurring({top_tag}): {partners:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,21 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import argparse
 import os
 import sys
 import traceback
 from dotenv import load_dotenv
-from utils.translations import TranslationManager
-from ui.main_window import MainWindow
-from typing import Optional
-import tkinter as tk
-from tkinter import ttk
+from typing import List, Optional
 
 # 加载环境变量
 load_dotenv()
 
 
-def setup_style(root: tk.Tk) -> None:
+def setup_style(root) -> None:
     """設置應用程序樣式"""
+    from tkinter import ttk
+
     style = ttk.Style()
     style.theme_use("clam")
 
@@ -37,8 +36,25 @@ def setup_style(root: tk.Tk) -> None:
     style.configure("TListbox", padding=5)
 
 
-def main() -> None:
-    """主函數"""
+def setup_working_directory() -> None:
+    """確保在正確的工作目錄中運行圖形界面"""
+    if getattr(sys, 'frozen', False):
+        # 如果是打包後的可執行文件
+        os.chdir(os.path.dirname(sys.executable))
+    else:
+        # 如果是直接運行 Python 腳本
+        os.chdir(os.path.dirname(os.path.abspath(__file__)))
+        print(f"工作目錄設置為：{os.getcwd()}")
+
+
+def run_gui() -> int:
+    """運行圖形界面"""
+    # 無界面命令不需要載入 tkinter
+    from utils.translations import TranslationManager
+    from ui.main_window import MainWindow
+
+    setup_working_directory()
+
     # 創建翻譯管理器
     translation_manager = TranslationManager()
 
@@ -50,17 +66,85 @@ def main() -> None:
 
     # 運行應用程序
     app.run()
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """建立命令列參數解析器"""
+    parser = argparse.ArgumentParser(
+        prog="prompt_reader", description="圖片提示詞管理器")
+    parser.add_argument(
+        "--log-level", help="日誌等級 DEBUG / INFO / WARNING / ERROR（預設讀取 PROMPT_READER_LOG_LEVEL，否則為 WARNING）")
+    parser.add_argument(
+        "--trace", metavar="FILE", help="記錄解碼、縮放、元數據、txt 讀寫與 Gemini 的耗時，結束時寫入此文件（預設讀取 PROMPT_READER_TRACE）")
+    parser.add_argument(
+        "--trace-format", choices=("chrome", "json"),
+        help="追蹤文件格式：chrome（chrome://tracing / Perfetto）或 json（含統計），預設為 chrome")
+    subparsers = parser.add_subparsers(dest="command")
+
+    from utils.batch_extract import (
+        add_common_arguments, add_extract_arguments, add_params_arguments)
+    extract_parser = subparsers.add_parser(
+        "extract", help="無界面批次提取資料夾樹中所有圖片的提示詞")
+    add_extract_arguments(extract_parser)
+
+    sidecar_parser = subparsers.add_parser(
+        "write-sidecars", help="將圖片元數據與 txt 合併後的提示詞批次寫回 txt 文件")
+    add_common_arguments(sidecar_parser)
+
+    params_parser = subparsers.add_parser(
+        "params", help="批次讀取完整的生成參數（反向提示詞、種子、採樣器、LoRA 等）並匯出為 CSV / Parquet / Arrow")
+    add_params_arguments(params_parser)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """主函數"""
+    args = build_parser().parse_args(argv)
+
+    from utils.tracing import export_trace, setup_logging, start_tracing
+    setup_logging(args.log_level)
+    trace_path = start_tracing(args.trace)
+    try:
+        return run_command(args)
+    finally:
+        if trace_path:
+            export_trace(trace_path, args.trace_format)
+
+
+def run_command(args: argparse.Namespace) -> int:
+    """執行子命令，沒有子命令時運行圖形界面"""
+    if args.command == "extract":
+        from utils.batch_extract import run_extract
+        run_extract(args.folder, output=args.output, fmt=args.format,
+                    workers=args.workers, chunksize=args.chunksize,
+                    recursive=not args.no_recursive)
+        return 0
+
+    if args.command == "write-sidecars":
+        from utils.batch_extract import SIDECAR_ERROR, run_write_sidecars
+        counts = run_write_sidecars(args.folder, workers=args.workers,
+                                    chunksize=args.chunksize,
+                                    recursive=not args.no_recursive)
+        return 1 if counts[SIDECAR_ERROR] else 0
+
+    if args.command == "params":
+        from utils.batch_extract import run_export_params
+        try:
+            run_export_params(args.folder, args.output, fmt=args.format,
+                              workers=args.workers, chunksize=args.chunksize,
+                              recursive=not args.no_recursive)
+        except ImportError:
+            print(f"匯出 {args.format} 需要安裝 pyarrow：pip install pyarrow", file=sys.stderr)
+            return 1
+        return 0
+
+    return run_gui()
 
 
 if __name__ == "__main__":
-    # 確保在正確的工作目錄中運行
-    if getattr(sys, 'frozen', False):
-        # 如果是打包後的可執行文件
-        os.chdir(os.path.dirname(sys.executable))
-    else:
-        # 如果是直接運行 Python 腳本
-        os.chdir(os.path.dirname(os.path.abspath(__file__)))
-        print(f"工作目錄設置為：{os.getcwd()}")
-
+    # 打包成執行檔時，縮略圖生成的工作進程需要
+    import multiprocessing
+    multiprocessing.freeze_support()
     # 運行主程序
     sys.exit(main())
@@ -0,0 +1,25 @@
+from utils.display_cache import DisplayImageCache
+from PIL import Image
+
+
+def test_lru_eviction_by_bytes():
+    image = Image.new('RGB', (10, 10))  # 300 位元組
+    cache = DisplayImageCache(max_bytes=700)
+    cache.put('a', image)
+    cache.put('b', image)
+    assert cache.get('a') is image  # a 變為最近使用
+    cache.put('c', image)           # 超過容量，淘汰 b
+
+    assert cache.get('b') is None
+    assert cache.get('c') is image
+    assert cache.stats() == {'hits': 2, 'misses': 1, 'evictions': 1,
+                             'entries': 2, 'bytes': 600}
+
+
+def test_key_changes_with_mtime(tmp_path):
+    path = str(tmp_path / "a.png")
+    Image.new('RGB', (4, 4)).save(path)
+    key = DisplayImageCache.make_key(path, 400, 400)
+    assert key == DisplayImageCache.make_key(path, 400, 400)
+    assert key != DisplayImageCache.make_key(path, 200, 200)
+    assert DisplayImageCache.make_key(str(tmp_path / "missing.png"), 400, 400) is None
@@ -0,0 +1,58 @@
+from utils.folder_watcher import ADDED, REMOVED, InotifyWatcher, PollingWatcher
+from utils.image_handler import ImageHandler
+import os
+import sys
+import time
+import pytest
+
+
+def _wait_for_events(watcher, count, timeout=5.0):
+    events = []
+    deadline = time.monotonic() + timeout
+    while len(events) < count and time.monotonic() < deadline:
+        events.extend(watcher.drain())
+        time.sleep(0.02)
+    return events
+
+
+def _exercise(make_watcher, folder):
+    (folder / 'old.png').write_bytes(b'x')
+    (folder / 'skip.txt').write_bytes(b'x')
+    watcher = make_watcher(str(folder)).start()
+    time.sleep(0.1)
+    try:
+        (folder / 'new.png').write_bytes(b'png')
+        os.rename(folder / 'old.png', folder / 'renamed.png')
+        events = _wait_for_events(watcher, 3)
+    finally:
+        watcher.cancel()
+    return {(event.kind, os.path.basename(event.path)) for event in events}
+
+
+def test_polling_watcher_reports_adds_and_removes(tmp_path):
+    events = _exercise(lambda folder: PollingWatcher(folder, interval=0.02), tmp_path)
+    assert events == {(ADDED, 'new.png'), (REMOVED, 'old.png'), (ADDED, 'renamed.png')}
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason="需要 inotify")
+def test_inotify_watcher_reports_adds_and_removes(tmp_path):
+    events = _exercise(lambda folder: InotifyWatcher(folder, timeout=0.05), tmp_path)
+    assert events == {(ADDED, 'new.png'), (REMOVED, 'old.png'), (ADDED, 'renamed.png')}
+
+
+def test_apply_changes_keeps_current_image(tmp_path):
+    handler = ImageHandler()
+    handler.reset(str(tmp_path))
+    handler.add_images([str(tmp_path / f'{name}.png') for name in 'bdf'])
+    handler.current_index = 1  # d.png
+    try:
+        assert not handler.apply_changes([str(tmp_path / 'a.png'), str(tmp_path / 'e.png')],
+                                         [str(tmp_path / 'b.png')])
+        assert handler.get_current_image_path() == str(tmp_path / 'd.png')
+        assert [os.path.basename(p) for p in handler.image_files] == ['a.png', 'd.png', 'e.png', 'f.png']
+
+        # 刪除當前圖片時，當前索引指向下一張
+        assert handler.apply_changes([], [str(tmp_path / 'd.png')])
+        assert handler.get_current_image_path() == str(tmp_path / 'e.png')
+    finally:
+        handler.prefetcher.shutdown()
@@ -0,0 +1,134 @@
+from types import SimpleNamespace
+from PIL import Image
+from utils.gemini_interface import GeminiInterface
+import asyncio
+import io
+
+
+class StubModels:
+    """模擬 client.models / client.aio.models，記錄同時進行的請求數"""
+
+    def __init__(self, text="tag a\n\ntag b\ntag c\ntag d\ntag e\ntag f", delay=0.01):
+        self.text = text
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.calls = 0
+        self.contents = []
+
+    def generate_content(self, model, contents, config):
+        self.calls += 1
+        self.contents.append(contents)
+        return SimpleNamespace(text=self.text)
+
+    async def agenerate_content(self, model, contents, config):
+        self.calls += 1
+        self.contents.append(contents)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+        return SimpleNamespace(text=self.text)
+
+
+def make_interface(max_concurrency=2):
+    models = StubModels()
+    client = SimpleNamespace(
+        models=models,
+        aio=SimpleNamespace(models=SimpleNamespace(generate_content=models.agenerate_content)))
+    return GeminiInterface('test-key', client=client, max_concurrency=max_concurrency), models
+
+
+def make_images(tmp_path, count):
+    paths = []
+    for i in range(count):
+        path = tmp_path / f"{i}.png"
+        Image.new('RGB', (8, 8), (i, i, i)).save(path)
+        paths.append(str(path))
+    return paths
+
+
+def test_sync_suggestions_are_limited_to_five():
+    gemini, models = make_interface()
+    suggestions = gemini.get_prompt_suggestions(Image.new('RGB', (8, 8)), ['cat'])
+    assert suggestions == ['tag a', 'tag b', 'tag c', 'tag d', 'tag e']
+    assert models.calls == 1
+
+
+def test_batch_respects_concurrency_limit(tmp_path):
+    gemini, models = make_interface(max_concurrency=3)
+    paths = make_images(tmp_path, 10)
+    streamed = []
+
+    results = asyncio.run(gemini.batch_prompt_suggestions(
+        paths, ['cat'], on_result=lambda path, s: streamed.append(path)))
+
+    assert sorted(results) == sorted(paths)
+    assert sorted(streamed) == sorted(paths)
+    assert models.calls == 10
+    assert 1 < models.max_active <= 3
+
+
+def test_missing_image_yields_empty_suggestions(tmp_path):
+    gemini, models = make_interface()
+    results = asyncio.run(gemini.batch_prompt_suggestions(
+        [str(tmp_path / 'missing.png')], []))
+    assert results == {str(tmp_path / 'missing.png'): []}
+    assert models.calls == 0
+
+
+def test_cache_hits_skip_the_api(tmp_path):
+    from utils.suggestion_cache import SuggestionCache
+    cache = SuggestionCache(str(tmp_path / 'cache.sqlite'))
+    gemini, models = make_interface()
+    gemini.cache = cache
+    path = make_images(tmp_path, 1)[0]
+
+    first = asyncio.run(gemini.aget_prompt_suggestions_for_path(path, ['b', 'a']))
+    # 暫存提示詞順序不同仍命中
+    second = asyncio.run(gemini.aget_prompt_suggestions_for_path(path, ['a', 'b']))
+    assert first == second
+    assert models.calls == 1
+    assert cache.stats()['hits'] == 1
+
+    # 略過快取時重新請求
+    asyncio.run(gemini.aget_prompt_suggestions_for_path(path, ['a', 'b'], use_cache=False))
+    assert models.calls == 2
+
+
+def test_upload_is_downscaled_and_encoded_once(tmp_path, monkeypatch):
+    import utils.gemini_interface as gemini_module
+    from utils.upload_payload import UploadSettings
+    encodes = []
+    encode = gemini_module.encode_for_upload
+    monkeypatch.setattr(gemini_module, 'encode_for_upload',
+                        lambda img, settings: encodes.append(img.size) or encode(img, settings))
+
+    gemini, models = make_interface()
+    gemini.upload_settings = UploadSettings(max_edge=64, format='WEBP', quality=80)
+    path = tmp_path / 'large.png'
+    Image.new('RGBA', (400, 200), (255, 0, 0, 128)).save(path)
+
+    for _ in range(2):
+        asyncio.run(gemini.aget_prompt_suggestions_for_path(str(path), ['cat']))
+
+    assert models.calls == 2
+    assert encodes == [(400, 200)]
+    part = models.contents[-1][1]
+    assert part.inline_data.mime_type == 'image/webp'
+    with Image.open(io.BytesIO(part.inline_data.data)) as uploaded:
+        assert uploaded.size == (64, 32)
+
+
+def test_image_and_path_requests_share_the_cache(tmp_path):
+    from utils.suggestion_cache import SuggestionCache
+    gemini, models = make_interface()
+    gemini.cache = SuggestionCache(str(tmp_path / 'cache.sqlite'))
+    path = make_images(tmp_path, 1)[0]
+
+    with Image.open(path) as img:
+        gemini.get_prompt_suggestions(img, ['cat'])
+    asyncio.run(gemini.aget_prompt_suggestions_for_path(path, ['cat']))
+    assert models.calls == 1
@@ -0,0 +1,83 @@
+from utils.generation_params import GenerationTable, extract_generation_params
+import csv
+import json
+import pytest
+
+
+PARAMETERS = ("1girl, <lora:detail_tweaker:0.6>, smile\n"
+              "Negative prompt: lowres, bad hands\n"
+              "Steps: 28, Sampler: DPM++ 2M, Schedule type: Karras, CFG scale: 6.5, Seed: 1234, "
+              "Size: 832x1216, Model hash: 7f96a1a9ca, Model: animagine, "
+              "Lora hashes: \"detail_tweaker: e3b0c44298fc\", Version: v1.10.0")
+
+
+def test_a1111_parameters_are_fully_parsed():
+    params = extract_generation_params({'parameters': PARAMETERS})
+    assert params.source_format == 'a1111'
+    assert params.prompt == '1girl, <lora:detail_tweaker:0.6>, smile'
+    assert params.negative_prompt == 'lowres, bad hands'
+    assert (params.steps, params.sampler, params.scheduler) == (28, 'DPM++ 2M', 'Karras')
+    assert (params.cfg_scale, params.seed) == (6.5, 1234)
+    assert (params.width, params.height) == (832, 1216)
+    assert (params.model, params.model_hash) == ('animagine', '7f96a1a9ca')
+    assert params.loras == (('detail_tweaker', 0.6),)
+
+
+def test_comfyui_graph_params():
+    graph = {
+        '3': {'class_type': 'KSampler', 'inputs': {
+            'positive': ['6', 0], 'negative': ['7', 0], 'model': ['10', 0], 'seed': 42,
+            'steps': 20, 'cfg': 7, 'sampler_name': 'euler', 'scheduler': 'normal'}},
+        '4': {'class_type': 'CheckpointLoaderSimple', 'inputs': {'ckpt_name': 'sdxl.safetensors'}},
+        '5': {'class_type': 'EmptyLatentImage', 'inputs': {'width': 1024, 'height': 768}},
+        '6': {'class_type': 'CLIPTextEncode', 'inputs': {'text': 'cat', 'clip': ['10', 1]}},
+        '7': {'class_type': 'CLIPTextEncode', 'inputs': {'text': 'blurry', 'clip': ['10', 1]}},
+        '10': {'class_type': 'LoraLoader', 'inputs': {
+            'lora_name': 'style.safetensors', 'strength_model': 0.8, 'model': ['4', 0]}},
+    }
+    params = extract_generation_params({'prompt': json.dumps(graph)})
+    assert (params.prompt, params.negative_prompt) == ('cat', 'blurry')
+    assert (params.seed, params.steps, params.cfg_scale) == (42, 20, 7.0)
+    assert (params.sampler, params.scheduler, params.model) == ('euler', 'normal', 'sdxl.safetensors')
+    assert (params.width, params.height) == (1024, 768)
+    assert params.loras == (('style.safetensors', 0.8),)
+
+
+def test_table_csv_export(tmp_path):
+    table = GenerationTable()
+    table.append('a.png', extract_generation_params({'parameters': PARAMETERS}))
+    table.append('b.png', extract_generation_params({}))
+    assert len(table) == 2
+    assert table.columns['seed'] == [1234, None]
+    assert table.row(0).steps == 28
+
+    path = tmp_path / 'params.csv'
+    table.export(str(path), 'csv')
+    with open(path, encoding='utf-8', newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert rows[0]['path'] == 'a.png' and rows[0]['seed'] == '1234'
+    assert rows[0]['loras'] == 'detail_tweaker:0.6'
+    assert rows[1]['source_format'] == 'generic' and rows[1]['seed'] == ''
+
+
+def test_arrow_export_keeps_64_bit_seeds():
+    pa = pytest.importorskip('pyarrow')
+    # ComfyUI 的種子範圍是 0 到 2**64 - 1
+    table = GenerationTable()
+    table.append('a.png', extract_generation_params({'parameters': PARAMETERS}))
+    table.append('b.png', extract_generation_params({'parameters': PARAMETERS.replace(
+        'Seed: 1234', f"Seed: {2 ** 64 - 1}")}))
+    # 隨機種子的標記 -1 不能使整個匯出失敗
+    table.append('c.png', extract_generation_params({'parameters': PARAMETERS.replace(
+        'Seed: 1234', 'Seed: -1')}))
+    arrow = table.to_arrow()
+    assert arrow.schema.field('seed').type == pa.uint64()
+    assert arrow.column('seed').to_pylist() == [1234, 2 ** 64 - 1, None]
+
+
+def test_out_of_range_seeds_are_unknown():
+    for seed in (-1, 2 ** 64):
+        params = extract_generation_params({'parameters': PARAMETERS.replace(
+            'Seed: 1234', f"Seed: {seed}")})
+        assert params.seed is None
+        assert params.steps == 28
@@ -0,0 +1,94 @@
+from utils.image_prefetcher import ImagePrefetcher, PreparedImage
+import threading
+import time
+
+
+def _wait_for(prefetcher, path, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        prepared = prefetcher.get(path)
+        if prepared is not None:
+            return prepared
+        time.sleep(0.01)
+    raise AssertionError(f"{path} 未完成")
+
+
+def test_cancel_queued_work_does_not_deadlock():
+    release = threading.Event()
+
+    def prepare(path):
+        release.wait(5)
+        return PreparedImage(path, None, [])
+
+    # 單一工作執行緒被第一張圖片佔用，其餘工作都在佇列中
+    prefetcher = ImagePrefetcher(prepare, radius=2, max_workers=1)
+    paths = [str(i) for i in range(100)]
+    prefetcher.prefetch_around(paths, 0)
+
+    done = threading.Event()
+
+    def jump_and_clear():
+        prefetcher.prefetch_around(paths, 50)
+        prefetcher.clear()
+        done.set()
+
+    threading.Thread(target=jump_and_clear, daemon=True).start()
+    assert done.wait(2), "取消佇列中的工作時死鎖"
+
+    release.set()
+    prefetcher.prefetch_around(paths, 10)
+    assert _wait_for(prefetcher, '10').path == '10'
+    prefetcher.shutdown()
+
+
+def test_failed_prepare_is_reported_once():
+    calls = []
+
+    def prepare(path):
+        calls.append(path)
+        if len(calls) == 1:
+            raise OSError("truncated")
+        return PreparedImage(path, None, [])
+
+    prefetcher = ImagePrefetcher(prepare, radius=0)
+    prefetcher.request('a')
+    prepared = _wait_for(prefetcher, 'a')
+    assert prepared.error == "truncated"
+
+    # 失敗的結果只返回一次，再次請求時重新準備
+    assert prefetcher.get('a') is None
+    prefetcher.request('a')
+    assert _wait_for(prefetcher, 'a').error is None
+    prefetcher.shutdown()
+
+
+def test_selecting_an_image_after_its_prefetch_failed(tmp_path):
+    from PIL import Image
+    from utils.image_handler import ImageHandler
+    good, bad = str(tmp_path / 'a.png'), str(tmp_path / 'b.png')
+    Image.new('RGB', (8, 8)).save(good)
+    with open(bad, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\ncorrupt')
+
+    handler = ImageHandler()
+    handler.reset(str(tmp_path))
+    handler.add_images([good, bad])
+    try:
+        # 顯示第一張時在背景預取第二張，預取失敗
+        assert handler.set_current_image(0)
+        deadline = time.monotonic() + 5
+        while bad not in handler.prefetcher._ready:
+            assert time.monotonic() < deadline, "預取未完成"
+            time.sleep(0.01)
+
+        # 之後選中第二張時，輪詢仍能得到失敗的結果
+        assert handler.set_current_image(1)
+        deadline = time.monotonic() + 5
+        prepared = handler.get_prepared_image(1)
+        while prepared is None:
+            assert time.monotonic() < deadline, "選中失敗的圖片後無限輪詢"
+            time.sleep(0.01)
+            prepared = handler.get_prepared_image(1)
+        assert prepared.error is not None
+    finally:
+        handler.prefetcher.shutdown()
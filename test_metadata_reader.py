@@ -0,0 +1,84 @@
+from utils.metadata_reader import read_image_metadata, decode_user_comment
+from utils.image_utils import get_image_prompts
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+import os
+
+
+def _save_png(path, text_chunks):
+    """建立帶有文字塊的 PNG，text_chunks 為 (類型, 鍵, 值) 列表"""
+    info = PngInfo()
+    for kind, key, value in text_chunks:
+        if kind == 'tEXt':
+            info.add_text(key, value)
+        elif kind == 'zTXt':
+            info.add_text(key, value, zip=True)
+        elif kind == 'iTXt':
+            info.add_itxt(key, value, lang="en", tkey=key)
+    Image.new('RGB', (64, 64), 'red').save(path, pnginfo=info)
+
+
+def test_png_text_chunks_match_pillow(tmp_path):
+    path = os.path.join(tmp_path, "a.png")
+    _save_png(path, [
+        ('tEXt', 'parameters', "1girl, solo, smile\nSteps: 20"),
+        ('zTXt', 'Comment', "compressed " * 50),
+        ('iTXt', 'Description', "提示詞, 測試"),
+    ])
+
+    info = read_image_metadata(path)
+    with Image.open(path) as img:
+        expected = {k: v for k, v in img.info.items() if isinstance(v, str)}
+
+    assert info == expected
+    assert read_image_metadata(path, use_mmap=True) == expected
+    assert get_image_prompts(path) == ['1girl', 'solo', 'smile']
+
+
+def test_jpeg_exif_and_comment(tmp_path):
+    path = os.path.join(tmp_path, "a.jpg")
+    exif = Image.Exif()
+    exif[0x010E] = "a description"
+    exif.get_ifd(0x8769)[0x9286] = b'UNICODE\x00' + \
+        "masterpiece, 1girl".encode('utf-16-be')
+    Image.new('RGB', (32, 32), 'blue').save(
+        path, exif=exif, comment="jpeg comment")
+
+    info = read_image_metadata(path)
+    assert info['ImageDescription'] == "a description"
+    assert info['UserComment'] == "masterpiece, 1girl"
+    assert info['Comment'] == "jpeg comment"
+    assert read_image_metadata(path, use_mmap=True) == info
+
+
+def test_user_comment_encodings():
+    payload = "hello, world"
+    assert decode_user_comment(
+        b'UNICODE\x00' + payload.encode('utf-16-le')) == payload
+    assert decode_user_comment(
+        b'UNICODE\x00' + payload.encode('utf-16-be')) == payload
+    assert decode_user_comment(b'ASCII\x00\x00\x00' + b'hello') == "hello"
+
+
+def test_other_formats_fall_back_to_pillow(tmp_path):
+    path = os.path.join(tmp_path, "a.bmp")
+    Image.new('RGB', (8, 8)).save(path)
+
+    assert read_image_metadata(path) is None
+    assert read_image_metadata(path, use_mmap=True) is None
+    assert get_image_prompts(path) == []
+
+    empty = os.path.join(tmp_path, "empty.png")
+    open(empty, 'wb').close()
+    assert read_image_metadata(empty, use_mmap=True) is None
+
+
+def test_sidecar_read_with_mmap(tmp_path):
+    from utils.image_utils import read_txt_prompts
+    path = os.path.join(tmp_path, "a.txt")
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write("1girl, 提示詞,\r\nsmile\r\n")
+    assert read_txt_prompts(path, use_mmap=True) == read_txt_prompts(path) == ['1girl', '提示詞', 'smile']
+
+    open(path, 'w').close()
+    assert read_txt_prompts(path, use_mmap=True) == []
@@ -0,0 +1,41 @@
+from utils.prompt_formats import detect_format, extract_prompts_with_format
+import json
+
+
+COMFYUI_GRAPH = {
+    '3': {'class_type': 'KSampler',
+          'inputs': {'positive': ['6', 0], 'negative': ['7', 0], 'model': ['4', 0], 'seed': 1}},
+    '4': {'class_type': 'CheckpointLoaderSimple', 'inputs': {'ckpt_name': 'model.safetensors'}},
+    '6': {'class_type': 'CLIPTextEncode', 'inputs': {'text': ['10', 0], 'clip': ['4', 1]}},
+    '7': {'class_type': 'CLIPTextEncode', 'inputs': {'text': 'lowres, bad hands', 'clip': ['4', 1]}},
+    '10': {'class_type': 'PrimitiveString', 'inputs': {'value': '1girl, solo,\nsmile'}},
+}
+
+
+def test_formats_are_detected_in_priority_order():
+    cases = [
+        ({'parameters': '1girl, solo\nblue sky\nNegative prompt: lowres\nSteps: 20'},
+         'a1111', ['1girl', 'solo', 'blue sky']),
+        ({'UserComment': 'cat, dog\nSteps: 20, Sampler: Euler'}, 'a1111', ['cat', 'dog']),
+        ({'prompt': json.dumps(COMFYUI_GRAPH), 'workflow': '{not json'},
+         'comfyui', ['1girl', 'solo', 'smile']),
+        ({'Software': 'NovelAI', 'Description': 'short',
+          'Comment': json.dumps({'prompt': 'cat ears, maid', 'uc': 'lowres'})},
+         'novelai', ['cat ears', 'maid']),
+        ({'invokeai_metadata': json.dumps({'positive_prompt': 'castle, sunset'})},
+         'invokeai', ['castle', 'sunset']),
+        ({'sd-metadata': json.dumps({'image': {'prompt': [{'prompt': 'forest [blurry], fog'}]}})},
+         'invokeai', ['forest', 'fog']),
+        ({'Dream': '"a cat [ugly], window" -s 50 -S 42'}, 'invokeai', ['a cat', 'window']),
+        ({'prompt': 'plain, text'}, 'generic', ['plain', 'text']),
+    ]
+    for info, name, prompts in cases:
+        assert extract_prompts_with_format(info) == (name, prompts)
+        assert detect_format(info) == name
+
+
+def test_broken_metadata_falls_through():
+    # 特徵相符但 JSON 損壞時交給後面的格式
+    info = {'invokeai_metadata': '{broken', 'Comment': 'fallback, tags'}
+    assert extract_prompts_with_format(info) == ('generic', ['fallback', 'tags'])
+    assert extract_prompts_with_format({}) == ('generic', [])
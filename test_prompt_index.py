@@ -0,0 +1,76 @@
+from utils.prompt_index import PromptIndex, INDEX_FILENAME
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+import os
+
+
+def _make_image(folder, name, parameters):
+    info = PngInfo()
+    info.add_text('parameters', parameters)
+    path = os.path.join(folder, name)
+    Image.new('RGB', (16, 16)).save(path, pnginfo=info)
+    return path
+
+
+def test_lookup_skips_unchanged_files(tmp_path, monkeypatch):
+    folder = str(tmp_path)
+    image_path = _make_image(folder, "a.png", "1girl, smile")
+    index = PromptIndex(folder)
+    assert index.get_image_prompts(image_path) == ['1girl', 'smile']
+    assert os.path.exists(os.path.join(folder, INDEX_FILENAME))
+
+    # 重新開啟索引（模擬重啟），未變更的圖片不應再被解析
+    index.close()
+    index = PromptIndex(folder)
+    monkeypatch.setattr('utils.prompt_index.read_image_info',
+                        lambda path: (_ for _ in ()).throw(AssertionError(path)))
+    assert index.get_image_prompts(image_path) == ['1girl', 'smile']
+
+
+def test_stale_rows_are_refreshed(tmp_path):
+    folder = str(tmp_path)
+    image_path = _make_image(folder, "a.png", "1girl")
+    txt_path = os.path.join(folder, "a.txt")
+    index = PromptIndex(folder)
+
+    assert index.get_txt_prompts(txt_path) is None
+    with open(txt_path, 'w', encoding='utf-8') as f:
+        f.write("cat, dog")
+    assert index.get_txt_prompts(txt_path) == ['cat', 'dog']
+
+    # 修改後大小改變，記錄應失效
+    with open(txt_path, 'w', encoding='utf-8') as f:
+        f.write("cat, dog, bird")
+    assert index.get_txt_prompts(txt_path) == ['cat', 'dog', 'bird']
+
+    _make_image(folder, "a.png", "1girl, solo, long hair")
+    assert index.refresh([image_path]) == 1
+    assert index.refresh([image_path]) == 0
+    assert index.get_image_prompts(image_path) == ['1girl', 'solo', 'long hair']
+
+
+def test_prune_removes_missing_images(tmp_path):
+    folder = str(tmp_path)
+    a = _make_image(folder, "a.png", "a")
+    b = _make_image(folder, "b.png", "b")
+    index = PromptIndex(folder)
+    index.refresh([a, b])
+    assert index.stats() == (2, 0)
+
+    os.remove(b)
+    assert index.prune([a]) == 1
+    assert index.stats() == (1, 0)
+
+
+def test_parse_failures_are_not_cached(tmp_path):
+    folder = str(tmp_path)
+    image_path = os.path.join(folder, "a.png")
+    # 寫入到一半的圖片
+    with open(image_path, 'wb') as f:
+        f.write(b'partial')
+    index = PromptIndex(folder)
+    assert index.get_image_prompts(image_path) == []
+    assert index.stats() == (0, 0)
+
+    _make_image(folder, "a.png", "1girl")
+    assert index.get_image_prompts(image_path) == ['1girl']
@@ -0,0 +1,28 @@
+from utils.prompt_list import PromptListModel
+
+
+def test_keeps_order_and_rejects_duplicates():
+    model = PromptListModel(['b', 'a', 'b'])
+    assert model.items() == ['b', 'a']
+    assert model.add('c') is True
+    assert model.add('a') is False
+    assert model.insert(0, 'z') is True
+    assert model.items() == ['z', 'b', 'a', 'c']
+    assert 'a' in model and 'x' not in model
+    assert model.extend(['c', 'd', 'd']) == 1
+
+
+def test_delete_updates_membership():
+    model = PromptListModel(['a', 'b', 'c', 'd'])
+    model.delete(1, 2)
+    assert model.items() == ['a', 'd']
+    assert 'b' not in model and 'c' not in model
+    assert model.pop(0) == 'a'
+    assert model.remove('d') is True
+    assert len(model) == 0
+    assert model.add('b') is True
+
+    model.replace(['x', 'x', 'y'])
+    assert model[0:2] == ['x', 'y']
+    model.clear()
+    assert 'x' not in model
@@ -0,0 +1,33 @@
+from utils.image_utils import merge_prompts
+from utils.prompt_tokenizer import KIND_BREAK, KIND_EDIT, KIND_LORA, split_prompts, tokenize_prompt
+
+
+def test_commas_inside_brackets_do_not_split():
+    text = ("(masterpiece:1.2), (red hair, twintails:1.1), [cat|dog], <lora:detail:0.6>, "
+            "ganyu \\(genshin impact\\), (sunset, (clouds:0.8), horizon) BREAK smile\nsky")
+    assert split_prompts(text) == [
+        '(masterpiece:1.2)', '(red hair, twintails:1.1)', '[cat|dog]', '<lora:detail:0.6>',
+        'ganyu \\(genshin impact\\)', '(sunset, (clouds:0.8), horizon)', 'smile', 'sky']
+    # 括號沒有閉合時不會吞掉之後的標籤
+    assert split_prompts("a, (b, c, d") == ['a', '(b', 'c', 'd']
+
+
+def test_weights_and_canonical_tags():
+    tokens = tokenize_prompt("((Long_Hair)), [blurry], (smile:1.3), [a:b:0.5], <lora:Style:0.8>, BREAK, x")
+    assert [(t.tag, t.weight, t.depth) for t in tokens[:3]] == [
+        ('long hair', 1.21, 2), ('blurry', 0.9091, 1), ('smile', 1.3, 1)]
+    assert (tokens[3].tag, tokens[3].kind) == ('[a:b:0.5]', KIND_EDIT)
+    assert (tokens[4].tag, tokens[4].weight, tokens[4].kind) == ('<lora:style>', 0.8, KIND_LORA)
+    assert tokens[5].kind == KIND_BREAK
+
+
+def test_merge_compares_canonical_tags():
+    merged = merge_prompts(['long_hair', '(smile:1.2)', 'sky'], ['Long hair', 'smile'])
+    assert merged == ['Long hair', 'sky', 'smile']
+
+
+def test_deeply_nested_commas_do_not_split():
+    nested = '(' * 8 + 'b, [c, {d, <e, f>}]' + ')' * 8
+    assert split_prompts(f"a, {nested}, g") == ['a', nested, 'g']
+    # 多餘的閉括號不影響之後的括號
+    assert split_prompts("a), (b, c), d") == ['a)', '(b, c)', 'd']
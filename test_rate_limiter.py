@@ -0,0 +1,113 @@
+from types import SimpleNamespace
+from utils.gemini_interface import GeminiInterface
+from utils.rate_limiter import RateLimiter, RetryPolicy, TokenBucket, is_retryable
+import asyncio
+import pytest
+import time
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeAPIError(Exception):
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+class FlakyModels:
+    """前 failures 次請求拋出指定錯誤，每次請求有固定延遲，並記錄送出時間"""
+
+    def __init__(self, failures=0, code=429, latency=0.005):
+        self.failures = failures
+        self.code = code
+        self.latency = latency
+        self.sent = []
+
+    async def generate_content(self, model, contents, config):
+        self.sent.append(time.monotonic())
+        await asyncio.sleep(self.latency)
+        if len(self.sent) <= self.failures:
+            raise FakeAPIError(self.code)
+        usage = SimpleNamespace(prompt_token_count=10)
+        return SimpleNamespace(text="tag", usage_metadata=usage)
+
+
+def make_interface(models, rate_limiter=None, max_retries=5):
+    client = SimpleNamespace(aio=SimpleNamespace(models=models))
+    return GeminiInterface('test-key', client=client, max_concurrency=8,
+                           rate_limiter=rate_limiter,
+                           retry_policy=RetryPolicy(max_retries, base_delay=0.01, max_delay=0.05))
+
+
+def test_token_bucket_spaces_reservations():
+    clock = FakeClock()
+    bucket = TokenBucket(61, burst=1, clock=clock)  # 每秒補充 1 個
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(1)
+    assert bucket.reserve() == pytest.approx(2)
+    clock.now = 10
+    assert bucket.reserve() == 0
+
+
+def test_pause_blocks_new_reservations():
+    clock = FakeClock()
+    limiter = RateLimiter(6000, clock=clock)
+    limiter.pause(3)
+    assert limiter.reserve() == pytest.approx(3)
+    clock.now = 5
+    assert limiter.blocked_for() == 0
+
+
+def test_retryable_errors():
+    assert is_retryable(FakeAPIError(429))
+    assert is_retryable(FakeAPIError(503))
+    assert is_retryable(TimeoutError())
+    assert not is_retryable(FakeAPIError(400))
+    assert not is_retryable(ValueError())
+
+
+def test_retries_429_with_backoff():
+    models = FlakyModels(failures=2)
+    gemini = make_interface(models, RateLimiter(6000))
+    assert asyncio.run(gemini._gemini_async(gemini.model, ["prompt"], {})) == "tag"
+    assert len(models.sent) == 3
+
+
+def test_gives_up_on_non_retryable_errors():
+    models = FlakyModels(failures=1, code=400)
+    gemini = make_interface(models)
+    with pytest.raises(FakeAPIError):
+        asyncio.run(gemini._gemini_async(gemini.model, ["prompt"], {}))
+    assert len(models.sent) == 1
+
+
+def test_gives_up_after_max_retries():
+    models = FlakyModels(failures=10)
+    gemini = make_interface(models, max_retries=2)
+    with pytest.raises(FakeAPIError):
+        asyncio.run(gemini._gemini_async(gemini.model, ["prompt"], {}))
+    assert len(models.sent) == 3
+
+
+def test_concurrent_requests_stay_under_rpm():
+    # 600 RPM、瞬間容量 10：前 10 個立即送出，之後約每 0.1 秒一個
+    models = FlakyModels()
+    gemini = make_interface(models, RateLimiter(600))
+
+    async def run():
+        await asyncio.gather(*(gemini._gemini_async(gemini.model, ["p"], {})
+                               for _ in range(14)))
+
+    start = time.monotonic()
+    asyncio.run(run())
+    assert len(models.sent) == 14
+    assert time.monotonic() - start >= 0.35
+    # 瞬間容量用完後，連續 13 個請求至少跨越兩個補充間隔
+    sent = sorted(models.sent)
+    assert all(sent[i + 12] - sent[i] >= 0.2 for i in range(len(sent) - 12))
@@ -0,0 +1,11 @@
+import subprocess
+import sys
+
+
+def test_gui_startup_does_not_import_gemini_stack():
+    # 窗口出現前不應載入 google-genai，它只在第一次請求建議時才載入
+    code = ("import sys, prompt_reader, ui.main_window; "
+            "print(any(m == 'google.genai' or m.startswith('google.genai.') "
+            "or m == 'utils.gemini_interface' for m in sys.modules))")
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == 'False'
@@ -0,0 +1,35 @@
+from utils.suggestion_cache import SuggestionCache, make_cache_key
+import time
+
+
+def test_ttl_expires_entries(tmp_path):
+    cache = SuggestionCache(str(tmp_path / 'cache.sqlite'), ttl=60)
+    key = make_cache_key('abc', ['cat'], 'model', {'temperature': 0.7})
+    cache.put(key, ['dog'])
+    assert cache.get(key) == ['dog']
+
+    cache.conn.execute('UPDATE suggestions SET created = ?', (time.time() - 120,))
+    assert cache.get(key) is None
+    assert cache.stats()['evictions'] == 1
+    assert cache.hit_rate() == 0.5
+
+
+def test_size_limit_evicts_least_recently_used(tmp_path):
+    cache = SuggestionCache(str(tmp_path / 'cache.sqlite'), max_bytes=300)
+    keys = [make_cache_key(str(i), [], 'model', {}) for i in range(4)]
+    for key in keys[:3]:
+        cache.put(key, ['x' * 20])
+        time.sleep(0.01)
+    cache.get(keys[0])
+    cache.put(keys[3], ['x' * 20])
+
+    assert cache.stats()['bytes'] <= 300
+    assert cache.get(keys[0]) == ['x' * 20]
+    assert cache.get(keys[1]) is None
+
+
+def test_key_depends_on_config_and_model():
+    base = make_cache_key('abc', ['a', 'b'], 'model', {'temperature': 0.7})
+    assert base == make_cache_key('abc', ['b', 'a'], 'model', {'temperature': 0.7})
+    assert base != make_cache_key('abc', ['a', 'b'], 'other', {'temperature': 0.7})
+    assert base != make_cache_key('abc', ['a', 'b'], 'model', {'temperature': 0.2})
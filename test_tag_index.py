@@ -0,0 +1,73 @@
+from utils.tag_index import TagIndex, TagQueryError, normalize_tag
+import pytest
+
+
+@pytest.fixture
+def index():
+    images = [
+        ['1girl', 'long_hair', 'smile'],
+        ['1girl', 'watermark'],
+        ['cat', 'Long Hair'],
+        ['dog', 'smile'],
+    ]
+    return TagIndex.build(list(range(len(images))), lambda i: images[i])
+
+
+def test_normalize_tag():
+    assert normalize_tag("  Long_Hair ") == "long hair"
+    assert normalize_tag("blue  eyes") == "blue eyes"
+    assert normalize_tag("((Long_Hair:1.2))") == "long hair"
+    assert normalize_tag("BREAK") == ""
+
+
+def test_weighted_tags_match_stats():
+    from utils.tag_stats import TagStatistics
+    tags = {'a': ['(masterpiece:1.2)', '1girl'], 'b': ['masterpiece'], 'c': ['[cat]', 'BREAK']}
+    paths = sorted(tags)
+    index = TagIndex.build(paths, tags.get)
+    stats = TagStatistics.build(paths, tags.get)
+    assert [paths[i] for i in index.query('masterpiece')] == stats.images('masterpiece') == ['a', 'b']
+    assert index.query('"(masterpiece:1.2)" AND NOT 1girl') == [1]
+    assert index.query('cat') == [2]
+    assert 'BREAK' not in index.tags()
+
+
+def test_boolean_queries(index):
+    assert index.query("1girl") == [0, 1]
+    assert index.query("1girl AND NOT watermark") == [0]
+    assert index.query("cat OR dog") == [2, 3]
+    assert index.query("long hair") == [0, 2]
+    assert index.query('"long hair" AND NOT (cat OR dog)') == [0]
+    assert index.query("NOT smile") == [1, 2]
+    assert index.query("missing") == []
+    assert index.count("LONG_HAIR") == 2
+
+
+def test_precedence(index):
+    # NOT > AND > OR
+    assert index.query("cat OR 1girl AND watermark") == [1, 2]
+    assert index.query("(cat OR 1girl) AND watermark") == [1]
+
+
+@pytest.mark.parametrize("query", ["", "AND", "(1girl", "1girl )", "NOT"])
+def test_syntax_errors(index, query):
+    with pytest.raises(TagQueryError):
+        index.query(query)
+
+
+def test_handler_filter_rebuilds_after_the_list_changes(tmp_path):
+    from utils.image_handler import ImageHandler
+    tags = {str(tmp_path / 'a.png'): ['cat'], str(tmp_path / 'b.png'): ['dog'],
+            str(tmp_path / 'c.png'): ['cat']}
+    handler = ImageHandler()
+    handler.reset(str(tmp_path))
+    handler.get_image_tags = tags.get
+    try:
+        handler.add_images(sorted(tags)[:2])
+        assert handler.apply_filter('cat') == 1
+        handler.add_images([str(tmp_path / 'c.png')])
+        assert handler.apply_filter('cat') == 2
+        assert handler.matches_filter(str(tmp_path / 'c.png'))
+        assert not handler.matches_filter(str(tmp_path / 'b.png'))
+    finally:
+        handler.prefetcher.shutdown()
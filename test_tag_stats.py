@@ -0,0 +1,72 @@
+from utils.tag_stats import TagStatistics
+import os
+import random
+
+
+def test_counts_and_queries():
+    images = {
+        'a.png': ['1girl', '(smile:1.2)', 'long_hair', 'BREAK'],
+        'b.png': ['1girl', 'smile'],
+        'c.png': ['cat', 'Long Hair'],
+    }
+    stats = TagStatistics.build(sorted(images), images.get)
+
+    assert stats.image_count == 3
+    assert stats.top_tags(2) == [('1girl', 2), ('long hair', 2)]
+    assert stats.count('((smile))') == 2
+    assert stats.cooccurring('1girl') == [('smile', 2), ('long hair', 1)]
+    assert stats.images('long_hair') == ['a.png', 'c.png']
+    assert stats.cooccurring('missing') == []
+
+
+def test_incremental_updates_match_rebuild():
+    rng = random.Random(0)
+    vocabulary = [f"tag{i}" for i in range(12)]
+    images = {f"{i}.png": rng.sample(vocabulary, 4) for i in range(40)}
+    stats = TagStatistics.build(sorted(images), images.get)
+    # 先建立排名，之後的更新必須增量調整它們
+    stats.top_tags()
+    for tag in vocabulary[:6]:
+        stats.cooccurring(tag)
+
+    for _ in range(200):
+        path = rng.choice(sorted(images))
+        images[path] = rng.sample(vocabulary, rng.randrange(6))
+        stats.set_image_tags(path, images[path])
+    stats.remove_image('0.png')
+    images['0.png'] = []
+
+    expected = TagStatistics.build(sorted(images), images.get)
+    assert stats.top_tags(len(vocabulary)) == expected.top_tags(len(vocabulary))
+    for tag in vocabulary:
+        assert stats.cooccurring(tag, 100) == expected.cooccurring(tag, 100)
+        assert stats.images(tag) == expected.images(tag)
+
+
+def test_handler_replays_saves_and_drops_builds_for_old_folder(tmp_path):
+    from utils.image_handler import ImageHandler
+    folder = str(tmp_path)
+    a, b = os.path.join(folder, 'a.png'), os.path.join(folder, 'b.png')
+    handler = ImageHandler()
+    handler.reset(folder)
+    handler.add_images([a, b])
+
+    def get_tags(path):
+        if path == a:
+            # 建立期間保存了 txt，磁碟上仍是舊內容
+            handler.update_image_tags(a, ['smile'])
+        return {a: ['cat'], b: ['dog']}[path]
+
+    handler.get_image_tags = get_tags
+    stats = handler.build_tag_stats()
+    assert handler.tag_stats is stats
+    assert (stats.count('smile'), stats.count('cat'), stats.count('dog')) == (1, 0, 1)
+
+    def switch_folder(path):
+        handler.reset(os.path.join(folder, 'other'))
+        return ['cat']
+
+    handler.get_image_tags = switch_folder
+    handler.build_tag_stats()
+    assert handler.tag_stats is None
+    handler.prefetcher.shutdown()
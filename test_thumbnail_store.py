@@ -0,0 +1,49 @@
+from utils.thumbnail_store import ThumbnailGenerator, ThumbnailStore, make_thumbnail
+from PIL import Image
+import io
+import os
+import time
+
+
+def _write_image(path, size=(600, 300), mode='RGB'):
+    Image.new(mode, size, (200, 100, 50, 128) if mode == 'RGBA' else (200, 100, 50)).save(path)
+    return str(path)
+
+
+def test_make_thumbnail_fits_size(tmp_path):
+    path = _write_image(tmp_path / 'a.png', mode='RGBA')
+    record = make_thumbnail(path, size=64)
+    assert record is not None
+    with Image.open(io.BytesIO(record[3])) as thumb:
+        assert thumb.format == 'JPEG'
+        assert thumb.size == (64, 32)
+    assert make_thumbnail(str(tmp_path / 'missing.png')) is None
+
+
+def test_store_ignores_stale_thumbnails(tmp_path):
+    path = _write_image(tmp_path / 'a.png')
+    store = ThumbnailStore(str(tmp_path))
+    store.put_many([make_thumbnail(path)])
+    assert list(store.get_many([path])) == [path]
+
+    # 圖片被修改後，舊的縮略圖不再返回
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert store.get_many([path]) == {}
+    assert store.count() == 1
+
+
+def test_generator_collects_all_requested(tmp_path):
+    paths = [_write_image(tmp_path / f'{i}.png') for i in range(5)]
+    generator = ThumbnailGenerator(size=32, workers=1, batch_size=2)
+    try:
+        generator.request(paths)
+        generator.request(paths[:2], urgent=True)  # 已排入的圖片不會重複生成
+        records = []
+        deadline = time.monotonic() + 30
+        while not generator.is_idle() and time.monotonic() < deadline:
+            records.extend(generator.collect())
+            time.sleep(0.01)
+    finally:
+        generator.shutdown()
+    assert sorted(record[0] for record in records) == sorted(paths)
@@ -0,0 +1,33 @@
+from utils.tracing import Tracer
+import json
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer()
+    with tracer.span('decode', path='a.png'):
+        pass
+    assert len(tracer.spans) == 0
+
+
+def test_export_chrome_and_json(tmp_path):
+    tracer = Tracer()
+    tracer.enable()
+    for _ in range(3):
+        with tracer.span('decode', path='a.png'):
+            pass
+    with tracer.span('txt_write'):
+        pass
+
+    chrome_path = tmp_path / 'trace.json'
+    assert tracer.export(str(chrome_path), 'chrome') == 4
+    events = json.loads(chrome_path.read_text(encoding='utf-8'))['traceEvents']
+    complete = [event for event in events if event['ph'] == 'X']
+    assert [event['name'] for event in complete] == ['decode'] * 3 + ['txt_write']
+    assert complete[0]['args'] == {'path': 'a.png'}
+    assert all(event['dur'] >= 0 for event in complete)
+
+    json_path = tmp_path / 'spans.json'
+    tracer.export(str(json_path), 'json')
+    data = json.loads(json_path.read_text(encoding='utf-8'))
+    assert data['summary']['decode']['count'] == 3
+    assert len(data['spans']) == 4
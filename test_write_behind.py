@@ -0,0 +1,43 @@
+from utils.write_behind import WriteBehindWriter
+import os
+
+
+def test_edits_are_coalesced_into_one_write(tmp_path):
+    path = str(tmp_path / 'a.txt')
+    written = []
+    writer = WriteBehindWriter(debounce=60)
+    for i in range(5):
+        writer.schedule(path, f'tag{i}', on_written=written.append)
+
+    # 防抖期間可以讀回尚未寫入的內容
+    assert writer.pending(path) == 'tag4'
+    assert not os.path.exists(path)
+
+    assert writer.close(timeout=5)
+    assert writer.writes == 1
+    assert written == [path]
+    assert writer.pending(path) is None
+    with open(path, encoding='utf-8') as f:
+        assert f.read() == 'tag4'
+
+
+def test_flush_writes_without_waiting_for_debounce(tmp_path):
+    path = str(tmp_path / 'a.txt')
+    writer = WriteBehindWriter(debounce=60)
+    try:
+        writer.schedule(path, 'cat')
+        assert writer.flush(wait=True, timeout=5)
+        with open(path, encoding='utf-8') as f:
+            assert f.read() == 'cat'
+    finally:
+        writer.close(timeout=5)
+
+
+def test_failed_writes_are_reported(tmp_path):
+    path = str(tmp_path / 'missing' / 'a.txt')
+    writer = WriteBehindWriter(debounce=0)
+    writer.schedule(path, 'cat')
+    writer.close(timeout=5)
+    errors = writer.drain_errors()
+    assert [error_path for error_path, _ in errors] == [path]
+    assert writer.writes == 0
@@ -1,21 +1,43 @@
 from typing import Optional, Callable, List
 import tkinter as tk
 from tkinter import ttk, filedialog
-import os
+import threading
 from utils.image_handler import ImageHandler
-from utils.image_utils import get_image_prompts
-from PIL import Image, ImageTk
+from utils.image_prefetcher import PreparedImage
+from utils.folder_scanner import FolderScanner
+from utils.folder_watcher import ADDED, RESCAN, FolderWatcher, create_folder_watcher
+from utils.image_utils import merge_prompts
+from utils.tag_index import TagQueryError
+from PIL import ImageTk
 from utils.translations import TranslationManager
+from utils.tracing import get_logger
+from .thumbnail_grid import ThumbnailGrid
+from .tag_stats_window import TagStatsWindow
+
+logger = get_logger(__name__)
 
 
 class ImageViewer:
+    # 等待背景準備圖片時的輪詢間隔（毫秒）
+    PREFETCH_POLL_MS = 15
+    # 背景掃描資料夾時的輪詢間隔（毫秒）
+    SCAN_POLL_MS = 50
+    # 套用資料夾監視事件的間隔（毫秒）
+    WATCH_POLL_MS = 500
+
     def __init__(self, parent: tk.Tk, translation_manager: TranslationManager) -> None:
         self.parent = parent
         self.translation_manager = translation_manager
         self.image_handler = ImageHandler()
+        self.thumbnail_grid: Optional[ThumbnailGrid] = None
+        self.tag_stats_window: Optional[TagStatsWindow] = None
         self.frame = self.create_frame(parent)
         self.current_folder = ""
         self.current_txt_path = None
+        self.folder_scanner: Optional[FolderScanner] = None
+        self.folder_watcher: Optional[FolderWatcher] = None
+        # 背景掃描時自動顯示的第一張圖片，用於判斷用戶是否已切換圖片
+        self.scan_first_path: Optional[str] = None
         self.on_save: Optional[Callable] = None
         self.on_exit: Optional[Callable] = None
 
@@ -42,7 +64,8 @@ class ImageViewer:
         self.exit_button = ttk.Button(
             frame,
             text=self.get_text("exit"),
-            command=self.on_exit
+            # 延遲查找，使用主窗口連接後替換的 on_exit（會先保存未寫入的編輯）
+            command=lambda: self.on_exit()
         )
         self.exit_button.grid(row=3, column=0, pady=10)
 
@@ -68,6 +91,35 @@ class ImageViewer:
         )
         self.folder_label.grid(row=0, column=1, sticky=(tk.W, tk.E))
 
+        self.thumbnails_button = ttk.Button(
+            folder_frame,
+            text=self.get_text("thumbnails"),
+            command=self.open_thumbnail_grid
+        )
+        self.thumbnails_button.grid(row=0, column=2, padx=(10, 0))
+
+        self.tag_stats_button = ttk.Button(
+            folder_frame,
+            text=self.get_text("tag_stats"),
+            command=self.open_tag_stats
+        )
+        self.tag_stats_button.grid(row=0, column=3, padx=(5, 0))
+
+        # 提示詞篩選輸入框
+        self.filter_label = ttk.Label(
+            folder_frame,
+            text=self.get_text("filter")
+        )
+        self.filter_label.grid(row=1, column=0, padx=(0, 10), sticky=tk.W)
+
+        self.filter_var = tk.StringVar()
+        self.filter_entry = ttk.Entry(
+            folder_frame,
+            textvariable=self.filter_var
+        )
+        self.filter_entry.grid(row=1, column=1, sticky=(tk.W, tk.E))
+        self.filter_entry.bind('<Return>', self.on_filter_enter)
+
     def create_image_frame(self, parent: ttk.Frame) -> None:
         """創建圖片顯示區域"""
         image_frame = ttk.Frame(
@@ -139,36 +191,126 @@ class ImageViewer:
 
     def select_folder(self) -> None:
         """選擇文件夾並加載內容"""
-        print("\n=== ImageViewer 開始選擇資料夾 ===")  # 調試信息
-
         folder_path = filedialog.askdirectory()
         if folder_path:
-            print(f"用戶選擇的資料夾：'{folder_path}'")  # 調試信息
+            logger.debug("選擇資料夾：%s", folder_path)
             self.current_folder = folder_path
             self.folder_label.config(text=folder_path)
 
-            print("正在加載圖片...")  # 調試信息
-            if self.image_handler.load_images(folder_path):
-                # 更新總數顯示
-                total_images = self.image_handler.get_total_images()
-                self.total_label.config(text=f"/{total_images}")
-                print(f"找到 {total_images} 張圖片")  # 調試信息
+            # 在背景掃描資料夾，找到的圖片分批加入列表
+            if self.folder_scanner is not None:
+                self.folder_scanner.cancel()
+            # 先開始監視，掃描期間新增或刪除的圖片在掃描完成後套用
+            self.stop_folder_watch()
+            self.folder_watcher = create_folder_watcher(folder_path)
+            self.folder_scanner = self.image_handler.start_folder_scan(
+                folder_path)
+            self.scan_first_path = None
+            self.total_label.config(text="/0")  # 重置總數顯示
+            self.update_button_states()
+            self._poll_folder_scan(self.folder_scanner)
+            return folder_path
+
+        logger.debug("用戶取消選擇資料夾")
+        return None
+
+    def _poll_folder_scan(self, scanner: FolderScanner) -> None:
+        """將背景掃描到的圖片加入列表，並逐步更新總數顯示"""
+        if scanner is not self.folder_scanner:
+            # 用戶已選擇了另一個資料夾
+            return
 
-                # 顯示第一張圖片
+        for batch in scanner.drain():
+            self.image_handler.add_images(batch)
+
+        total_images = self.image_handler.get_total_images()
+        self.total_label.config(text=f"/{total_images}")
+        if total_images:
+            if self.image_handler.get_current_index() < 0:
+                # 顯示第一張找到的圖片
                 self.show_image(0)
+                self.save_button.config(state=tk.NORMAL)
+                # 之後的批次可能排在它之前，掃描完成時若用戶沒有切換過圖片，再回到第一張
+                self.scan_first_path = self.image_handler.get_current_image_path()
+            else:
+                # 新圖片可能排在當前圖片之前，更新編號與按鈕狀態
+                self.validate_image_number(None)
                 self.update_button_states()
+
+        if not scanner.is_finished():
+            self.frame.after(self.SCAN_POLL_MS,
+                             self._poll_folder_scan, scanner)
+        else:
+            if (self.scan_first_path is not None
+                    and self.image_handler.get_current_image_path() == self.scan_first_path
+                    and self.image_handler.get_current_index() != 0):
+                self.show_image(0)
+            self.scan_first_path = None
+            if total_images:
+                logger.info("找到 %d 張圖片", total_images)
+            else:
+                logger.warning("資料夾中沒有找到圖片")
+            self.frame.after(self.WATCH_POLL_MS,
+                             self._poll_folder_watch, self.folder_watcher)
+
+    def _poll_folder_watch(self, watcher: Optional[FolderWatcher]) -> None:
+        """將資料夾中新增與刪除的圖片套用到列表，不重新掃描資料夾"""
+        if watcher is None or watcher is not self.folder_watcher:
+            # 用戶已選擇了另一個資料夾
+            return
+
+        events = watcher.drain()
+        if events:
+            # 同一檔案的多個事件只保留最後一個
+            latest = {}
+            rescan = False
+            for event in events:
+                if event.kind == RESCAN:
+                    rescan = True
+                else:
+                    latest[event.path] = event.kind
+            added = sorted(path for path, kind in latest.items() if kind == ADDED)
+            removed = [path for path, kind in latest.items() if kind != ADDED]
+            logger.debug("資料夾變動：新增 %d，刪除 %d", len(added), len(removed))
+
+            had_images = self.image_handler.get_current_index() >= 0
+            current_removed = self.image_handler.apply_changes(added, removed)
+            if rescan:
+                current_removed |= self.image_handler.sync_with_folder(
+                    self.current_folder)
+            self.on_images_changed(current_removed or not had_images)
+
+        self.frame.after(self.WATCH_POLL_MS, self._poll_folder_watch, watcher)
+
+    def on_images_changed(self, reload_current: bool) -> None:
+        """
+        圖片列表變動後更新界面
+
+        Args:
+            reload_current (bool): 當前圖片被刪除（或之前沒有圖片）時為 True，需要顯示新的當前圖片
+        """
+        total_images = self.image_handler.get_total_images()
+        self.total_label.config(text=f"/{total_images}")
+        if reload_current:
+            if total_images:
+                self.show_image(max(0, self.image_handler.get_current_index()))
                 self.save_button.config(state=tk.NORMAL)
-                print("=== ImageViewer 資料夾選擇完成 ===\n")  # 調試信息
-                return folder_path
             else:
-                print("警告：資料夾中沒有找到圖片")  # 調試信息
-                self.total_label.config(text="/0")  # 重置總數顯示
-                print("=== ImageViewer 資料夾選擇完成 ===\n")  # 調試信息
-                return folder_path
+                # 資料夾中已沒有圖片
+                self.photo = None
+                self.image_label.configure(image='')
+                self.validate_image_number(None)
+        else:
+            self.validate_image_number(None)
+        self.update_button_states()
+        if self.thumbnail_grid is not None and self.thumbnail_grid.is_open():
+            self.thumbnail_grid.render()
 
-        print("用戶取消選擇資料夾")  # 調試信息
-        print("=== ImageViewer 資料夾選擇完成 ===\n")  # 調試信息
-        return None
+    def stop_folder_watch(self) -> None:
+        """停止監視目前的資料夾"""
+        if self.folder_watcher is not None:
+            self.folder_watcher.cancel()
+            self.folder_watcher = None
 
     def show_image(self, index: int) -> None:
         """顯示指定索引的圖片"""
@@ -178,72 +320,92 @@ class ImageViewer:
             # 更新總數顯示
             total_images = len(self.image_handler.image_files)
             self.total_label.config(text=f"/{total_images}")
-
-            # 調整圖片大小並顯示
-            image = self.image_handler.current_image
-            if image:
-                resized_image = self.image_handler.resize_image(image)
-                self.photo = ImageTk.PhotoImage(resized_image)
-                self.image_label.configure(image=self.photo)
-
-                # 更新按鈕狀態
-                self.update_button_states()
-
-                # 加載對應的文本內容
-                if hasattr(self, 'load_text_content'):
-                    current_image_path = self.image_handler.image_files[index]
-                    self.load_text_content(current_image_path)
-
-            # 獲取當前圖片路徑
-            current_image_path = self.image_handler.get_current_image_path()
-
-            # 讀取圖片提示詞
-            image_prompts = get_image_prompts(current_image_path)
-
-            # 讀取文本文件提示詞
-            txt_prompts = []
-            if hasattr(self, 'load_text_content'):
-                self.load_text_content(current_image_path)
-                # 從左側列表獲取文本文件的提示詞，並確保是列表類型
-                temp_txt_prompts = list(
-                    self.list_manager.left_list.listbox.get(0, tk.END))
-                # 過濾掉 no_txt_file
-                if not (len(temp_txt_prompts) == 1 and temp_txt_prompts[0] == self.get_text("no_txt_file")):
-                    txt_prompts = temp_txt_prompts
-
-                # 如果沒有文本文件但有圖片提示詞，清空左側列表
-                if len(txt_prompts) == 0 and image_prompts:
-                    self.list_manager.left_list.listbox.delete(0, tk.END)
-
-            # 合併提示詞並去重，並按字母順序排序
-            all_prompts = sorted(list(set(image_prompts + txt_prompts)))
-
-            if all_prompts:
-                # 更新提示詞列表
-                self.update_prompt_list(all_prompts)
-                # 更新狀態標籤
-                status_parts = []
-                if image_prompts:
-                    status_parts.append(
-                        f"{self.get_text('image_prompts_count')}: {len(image_prompts)}")
-                if txt_prompts:
-                    status_parts.append(
-                        f"{self.get_text('txt_prompts_count')}: {len(txt_prompts)}")
-                if all_prompts:
-                    status_parts.append(
-                        f"{self.get_text('total_unique_prompts')}: {len(all_prompts)}")
-
-                status_text = ", ".join(status_parts)
-                self.list_manager.status_label.config(text=status_text)
-            else:
-                # 如果沒有任何提示詞，顯示提示信息
-                self.list_manager.status_label.config(
-                    text=self.get_text("no_prompts_found"))
-
             self.update_button_states()
+            if self.thumbnail_grid is not None and self.thumbnail_grid.is_open():
+                # 更新縮略圖網格中當前圖片的標示
+                self.thumbnail_grid.render()
+
+            prepared = self.image_handler.get_prepared_image(index)
+            if prepared is None:
+                # 圖片仍在背景解碼，稍後再顯示，不阻塞界面
+                self.frame.after(self.PREFETCH_POLL_MS,
+                                 self._show_when_ready, index)
+            else:
+                self.display_prepared_image(prepared)
             return True
         return False
 
+    def _show_when_ready(self, index: int) -> None:
+        """等待背景準備完成後顯示圖片（用戶已切換到其他圖片時放棄）"""
+        if index != self.image_handler.get_current_index():
+            return
+        prepared = self.image_handler.get_prepared_image(index)
+        if prepared is None:
+            self.frame.after(self.PREFETCH_POLL_MS,
+                             self._show_when_ready, index)
+        else:
+            self.display_prepared_image(prepared)
+
+    def display_prepared_image(self, prepared: PreparedImage) -> None:
+        """顯示已準備好的圖片及其提示詞"""
+        # 顯示已縮放的圖片
+        image = prepared.display_image
+        if image:
+            self.photo = ImageTk.PhotoImage(image)
+            self.image_label.configure(image=self.photo)
+        else:
+            self.photo = None
+            self.image_label.configure(image='')
+
+        # 獲取當前圖片路徑
+        current_image_path = prepared.path
+
+        # 圖片提示詞已在背景解析
+        image_prompts = prepared.image_prompts
+
+        # 讀取文本文件提示詞
+        txt_prompts = []
+        if hasattr(self, 'load_text_content'):
+            self.load_text_content(current_image_path)
+            # 從左側列表獲取文本文件的提示詞，並確保是列表類型
+            temp_txt_prompts = self.list_manager.left_list.model.items()
+            # 過濾掉 no_txt_file
+            if not (len(temp_txt_prompts) == 1 and temp_txt_prompts[0] == self.get_text("no_txt_file")):
+                txt_prompts = temp_txt_prompts
+
+            # 如果沒有文本文件但有圖片提示詞，清空左側列表
+            if len(txt_prompts) == 0 and image_prompts:
+                self.list_manager.left_list.listbox.delete(0, tk.END)
+
+        # 合併提示詞並去重，並按字母順序排序
+        all_prompts = merge_prompts(image_prompts, txt_prompts)
+
+        if all_prompts:
+            # 更新提示詞列表
+            self.update_prompt_list(all_prompts)
+            # 更新狀態標籤
+            status_parts = []
+            if image_prompts:
+                status_parts.append(
+                    f"{self.get_text('image_prompts_count')}: {len(image_prompts)}")
+            if txt_prompts:
+                status_parts.append(
+                    f"{self.get_text('txt_prompts_count')}: {len(txt_prompts)}")
+            if all_prompts:
+                status_parts.append(
+                    f"{self.get_text('total_unique_prompts')}: {len(all_prompts)}")
+
+            status_text = ", ".join(status_parts)
+            self.list_manager.status_label.config(text=status_text)
+        else:
+            # 如果沒有任何提示詞，顯示提示信息
+            self.list_manager.status_label.config(
+                text=self.get_text("no_prompts_found"))
+
+        if prepared.error is not None:
+            self.list_manager.status_label.config(
+                text=f"{self.get_text('image_load_error')}: {prepared.error}")
+
     def update_counter(self, current: int, total: int) -> None:
         """更新圖片計數"""
         self.current_image_var.set(str(current))
@@ -258,22 +420,62 @@ class ImageViewer:
 
     def prev_image(self) -> None:
         """顯示上一張圖片"""
-        if self.image_handler.can_move_prev():
-            self.show_image(self.image_handler.get_current_index() - 1)
+        index = self.image_handler.get_prev_index()
+        if index is not None:
+            self.show_image(index)
 
     def next_image(self) -> None:
         """顯示下一張圖片"""
-        if self.image_handler.can_move_next():
-            self.show_image(self.image_handler.get_current_index() + 1)
+        index = self.image_handler.get_next_index()
+        if index is not None:
+            self.show_image(index)
 
     def on_save_click(self) -> None:
         """處理保存按鈕點擊事件"""
-        print("保存按鈕被點擊")  # 調試信息
         if hasattr(self, 'save_text_content'):
-            print("調用 save_text_content 方法")  # 調試信息
             self.save_text_content()
         else:
-            print("錯誤：save_text_content 方法未連接")  # 調試信息
+            logger.error("save_text_content 方法未連接")
+
+    def open_thumbnail_grid(self) -> None:
+        """打開縮略圖網格窗口（已打開時移到最前面）"""
+        if not self.current_folder:
+            return
+        if self.thumbnail_grid is not None and self.thumbnail_grid.is_open():
+            self.thumbnail_grid.window.lift()
+            self.thumbnail_grid.scroll_to_current()
+            return
+        self.thumbnail_grid = ThumbnailGrid(self.parent, self)
+
+    def close_thumbnail_grid(self) -> None:
+        """關閉縮略圖網格窗口並停止生成縮略圖"""
+        if self.thumbnail_grid is not None:
+            self.thumbnail_grid.close()
+            self.thumbnail_grid = None
+
+    def open_tag_stats(self) -> None:
+        """打開標籤統計窗口（已打開時移到最前面）"""
+        if not self.current_folder:
+            return
+        if self.tag_stats_window is not None and self.tag_stats_window.is_open():
+            self.tag_stats_window.window.lift()
+            if not self.image_handler.is_tag_stats_current():
+                # 圖片列表已變動
+                self.tag_stats_window.build()
+            return
+        self.tag_stats_window = TagStatsWindow(self.parent, self)
+
+    def on_tags_saved(self, image_path: str, txt_prompts: List[str]) -> None:
+        """
+        圖片的 txt 已保存：增量更新標籤統計並刷新統計窗口
+
+        Args:
+            image_path (str): 圖片路徑
+            txt_prompts (List[str]): 保存到 txt 的提示詞
+        """
+        self.image_handler.update_image_tags(image_path, txt_prompts)
+        if self.tag_stats_window is not None and self.tag_stats_window.is_open():
+            self.tag_stats_window.refresh()
 
     def load_text_content(self, image_path: str) -> None:
         """加載文本內容"""
@@ -285,9 +487,66 @@ class ImageViewer:
         if hasattr(self, 'frame') and self.frame.winfo_exists():
             self.frame.winfo_toplevel().quit()
 
+    def on_filter_enter(self, event: tk.Event) -> None:
+        """處理篩選輸入：建立標籤索引（如有需要）後只瀏覽符合的圖片"""
+        query = self.filter_var.get().strip()
+        if not query:
+            self.image_handler.clear_filter()
+            self.update_button_states()
+            return
+        if not self.image_handler.get_total_images():
+            return
+
+        if self.image_handler.is_tag_index_current():
+            self._apply_filter(query)
+            return
+
+        # 首次篩選時在背景建立標籤索引
+        self.list_manager.status_label.config(
+            text=self.get_text("filter_building"))
+        builder = threading.Thread(
+            target=self.image_handler.build_tag_index, daemon=True)
+        builder.start()
+        self._wait_for_tag_index(builder, query)
+
+    def _wait_for_tag_index(self, builder: threading.Thread, query: str) -> None:
+        """等待背景建立標籤索引完成後套用篩選"""
+        if builder.is_alive():
+            self.frame.after(self.SCAN_POLL_MS,
+                             self._wait_for_tag_index, builder, query)
+        else:
+            self._apply_filter(query)
+
+    def _apply_filter(self, query: str) -> None:
+        """套用篩選並跳到第一張符合的圖片"""
+        try:
+            matches = self.image_handler.apply_filter(query)
+        except TagQueryError as e:
+            self.list_manager.status_label.config(
+                text=f"{self.get_text('filter_error')}: {str(e)}")
+            return
+
+        if not matches:
+            self.image_handler.clear_filter()
+            self.list_manager.status_label.config(
+                text=self.get_text("filter_no_matches"))
+            self.update_button_states()
+            return
+
+        if not self.image_handler.matches_filter(self.image_handler.get_current_image_path()):
+            # 當前圖片不符合條件，從頭開始找第一張符合的圖片
+            self.image_handler.current_index = -1
+            self.show_image(self.image_handler.get_next_index())
+        self.update_button_states()
+        self.list_manager.status_label.config(
+            text=f"{self.get_text('filter_matches')}: {matches}")
+
     def update_texts(self) -> None:
         """更新界面文字"""
         self.folder_button.config(text=self.get_text("select_folder"))
+        self.filter_label.config(text=self.get_text("filter"))
+        self.thumbnails_button.config(text=self.get_text("thumbnails"))
+        self.tag_stats_button.config(text=self.get_text("tag_stats"))
         self.folder_label.config(text=self.get_text(
             "no_folder") if not self.current_folder else self.current_folder)
         self.prev_button.config(text=self.get_text("prev"))
@@ -324,8 +583,5 @@ class ImageViewer:
     def update_prompt_list(self, prompts: List[str]) -> None:
         """更新提示詞列表"""
         if hasattr(self, 'list_manager'):
-            # 清空左側列表
-            self.list_manager.left_list.listbox.delete(0, tk.END)
-            # 添加新的提示詞
-            for prompt in prompts:
-                self.list_manager.left_list.listbox.insert(tk.END, prompt)
+            # 一次取代左側列表的所有提示詞
+            self.list_manager.left_list.listbox.replace(prompts)
@@ -1,29 +1,55 @@
 import tkinter as tk
 from tkinter import ttk
+import importlib
 import os
+import queue
+import threading
 from .ui_components import ListFrame
-from utils.gemini_interface import GeminiInterface
-from PIL import Image
-from typing import List, Optional, Callable
+from utils.prompt_index import get_prompt_index
+from utils.async_runner import AsyncRunner
+from utils.suggestion_cache import SuggestionCache
+from utils.upload_payload import UploadSettings
+from utils.rate_limiter import RateLimiter
+from utils.write_behind import WriteBehindWriter
+from utils.tracing import get_logger, span
+from utils.image_utils import split_prompts
+from typing import Dict, List, Optional, Callable, Tuple
+
+logger = get_logger(__name__)
 
 
 class ListManager:
+    # 批次建議每次最多請求的圖片數
+    BATCH_SUGGESTION_LIMIT = 20
+    # 輪詢背景建議結果的間隔（毫秒）
+    SUGGESTION_POLL_MS = 50
+    # 窗口顯示後多久開始在背景預先載入 Gemini 模組（毫秒）
+    GEMINI_PRELOAD_DELAY_MS = 1000
+    # 最後一次編輯後多久自動寫入文件（毫秒）
+    AUTOSAVE_DELAY_MS = 500
+    # 退出時等待寫入完成的最長時間（秒）
+    AUTOSAVE_EXIT_TIMEOUT = 10
+
     def __init__(self, parent, translation_manager):
         self.translation_manager = translation_manager
         self.create_frame(parent)
         self.current_folder = ""
         self.current_txt_path = None
 
-        # 初始化 Gemini 接口
-        api_key = os.getenv('GEMINI_API_KEY')
-        if api_key:
-            try:
-                self.gemini = GeminiInterface(api_key)
-            except Exception as e:
-                print(f"Error initializing Gemini interface: {str(e)}")
-                self.gemini = None
-        else:
-            self.gemini = None
+        # 每次編輯只標記待寫入，由背景執行緒合併後寫入文本文件與暫存列表
+        self.autosave = WriteBehindWriter(self.AUTOSAVE_DELAY_MS / 1000)
+
+        # Gemini 接口在第一次使用時才初始化，google-genai 的載入不拖慢窗口出現；
+        # 設置了 API 密鑰時在窗口顯示後於背景預先載入
+        self.gemini = None
+        if os.getenv('GEMINI_API_KEY'):
+            self.frame.after(self.GEMINI_PRELOAD_DELAY_MS, self._preload_gemini)
+
+        # 在背景事件循環中請求 Gemini，結果經由佇列交回界面執行緒
+        self.async_runner = AsyncRunner()
+        self.suggestion_queue: 'queue.Queue[Tuple[str, List[str]]]' = queue.Queue()
+        self.suggestion_results: Dict[str, List[str]] = {}
+        self.pending_suggestions = 0
 
         # 創建右鍵選單
         self.context_menu = tk.Menu(parent, tearoff=0)
@@ -86,6 +112,16 @@ class ListManager:
             command=self.get_gemini_suggestions
         )
         self.gemini_button.grid(row=0, column=0, padx=2)
+        # 按住 Shift 點擊時略過快取，重新請求建議
+        self.gemini_button.bind('<Shift-Button-1>', self.on_gemini_shift_click)
+
+        # 添加 Gemini 批次建議按鈕
+        self.batch_gemini_button = ttk.Button(
+            self.input_buttons_frame,
+            text=self.get_text("batch_suggestions"),
+            command=self.get_batch_gemini_suggestions
+        )
+        self.batch_gemini_button.grid(row=0, column=1, padx=2)
 
         # 添加到提示詞區域按鈕
         self.add_to_left_button = ttk.Button(
@@ -93,7 +129,7 @@ class ListManager:
             text=self.get_text("add_to_prompts"),
             command=self.add_to_left
         )
-        self.add_to_left_button.grid(row=0, column=1, padx=2)
+        self.add_to_left_button.grid(row=0, column=2, padx=2)
 
         # 添加到暫存區域按鈕
         self.add_to_right_button = ttk.Button(
@@ -101,7 +137,7 @@ class ListManager:
             text=self.get_text("add_to_temp"),
             command=self.add_to_right
         )
-        self.add_to_right_button.grid(row=0, column=2, padx=2)
+        self.add_to_right_button.grid(row=0, column=3, padx=2)
 
         # 綁定回車鍵事件
         self.prompt_entry.bind('<Return>', self.on_enter_press)
@@ -167,10 +203,9 @@ class ListManager:
         if selection:
             index = selection[0]
             item = self.left_list.listbox.get(index)
-            # 檢查是否已存在於右側列表
-            existing_items = self.right_list.listbox.get(0, tk.END)
-            if item not in existing_items:
-                self.right_list.listbox.insert(tk.END, item)
+            # 已存在於右側列表時不會重複添加
+            if self.right_list.listbox.add(item):
+                self.mark_temp_dirty()
 
     def move_to_left(self):
         """將選中項目複製到左側列表"""
@@ -178,105 +213,93 @@ class ListManager:
         if selection:
             index = selection[0]
             item = self.right_list.listbox.get(index)
-            # 檢查是否已存在於左側列表
-            existing_items = self.left_list.listbox.get(0, tk.END)
-            if item not in existing_items:
-                self.left_list.listbox.insert(tk.END, item)
+            # 已存在於左側列表時不會重複添加
+            if self.left_list.listbox.add(item):
+                self.mark_text_dirty()
 
     def delete_left_item(self):
         """刪除左側列表中選中的項目"""
         selection = self.left_list.listbox.curselection()
         if selection:
             self.left_list.listbox.delete(selection[0])
+            self.mark_text_dirty()
 
     def delete_right_item(self):
         """刪除右側列表中選中的項目"""
         selection = self.right_list.listbox.curselection()
         if selection:
             self.right_list.listbox.delete(selection[0])
+            self.mark_temp_dirty()
 
     def set_current_folder(self, folder_path):
         """設置當前資料夾並執行相關操作"""
-        print("\n=== 設置當前資料夾 ===")
-        print(f"新資料夾路徑：'{folder_path}'")
+        logger.debug("設置當前資料夾：%s", folder_path)
 
         if not folder_path:
-            print("錯誤：資料夾路徑為空")
+            logger.error("資料夾路徑為空")
             return False
 
         if not os.path.exists(folder_path):
-            print(f"錯誤：資料夾不存在：{folder_path}")
+            logger.error("資料夾不存在：%s", folder_path)
             return False
 
         # 更新資料夾路徑
         self.current_folder = folder_path
-        print(f"已更新資料夾路徑：'{self.current_folder}'")
 
         # 載入暫存列表和收藏列表
         self.load_temp_list()
         self.load_favorites()
 
-        print("=== 資料夾設置完成 ===\n")
         return True
 
     def load_temp_list(self):
         """讀取暫存列表文件"""
-        print("\n=== 開始載入暫存列表 ===")  # 調試信息
-        print(f"當前資料夾路徑：'{self.current_folder}'")  # 調試信息
-
         if not self.current_folder:
-            print("錯誤：當前資料夾路徑為空")  # 調試信息
+            logger.error("當前資料夾路徑為空")
             self.status_label.config(text="錯誤：未選擇資料夾")
             return False
 
         # 清空右側列表
-        print("清空右側列表...")  # 調試信息
         self.right_list.listbox.delete(0, tk.END)
 
         temp_path = os.path.join(self.current_folder, 'temp.txt')
-        print(f"暫存檔案完整路徑：'{temp_path}'")  # 調試信息
+        logger.debug("載入暫存列表：%s", temp_path)
 
-        if os.path.exists(temp_path):
+        # 尚未寫入磁碟的暫存列表（例如剛切換回這個資料夾）
+        content = self.autosave.pending(temp_path)
+        if content is not None or os.path.exists(temp_path):
             try:
-                with open(temp_path, 'r', encoding='utf-8') as f:
-                    content = f.read().strip()
-                    items = [item.strip()
-                             for item in content.split(',') if item.strip()]
-                    print(f"成功讀取到 {len(items)} 個暫存提示詞")  # 調試信息
-                    print(f"提示詞列表：{items}")  # 調試信息
-
-                    # 插入項目到右側列表
-                    for item in items:
-                        self.right_list.listbox.insert(tk.END, item)
-
-                    # 更新狀態標籤
-                    success_msg = f"已載入 {len(items)} 個暫存提示詞"
-                    self.status_label.config(text=success_msg)
-                    print(f"成功：{success_msg}")  # 調試信息
-
-                    # 強制更新界面
-                    self.right_list.listbox.update()
-                    print("=== 暫存列表載入完成 ===\n")  # 調試信息
-                    return True
+                if content is None:
+                    with span('txt_read', path=temp_path), \
+                            open(temp_path, 'r', encoding='utf-8') as f:
+                        content = f.read()
+                items = split_prompts(content.strip())
+                logger.debug("讀取到 %d 個暫存提示詞：%s", len(items), items)
+
+                # 一次填入右側列表
+                self.right_list.listbox.replace(items)
+
+                # 更新狀態標籤
+                success_msg = f"已載入 {len(items)} 個暫存提示詞"
+                self.status_label.config(text=success_msg)
+
+                # 強制更新界面
+                self.right_list.listbox.update()
+                return True
             except Exception as e:
                 error_msg = f"無法讀取暫存檔案：{str(e)}"
-                print(f"錯誤：{error_msg}")  # 調試信息
+                logger.error(error_msg)
                 self.status_label.config(text=error_msg)
-                print("=== 暫存列表載入失敗 ===\n")  # 調試信息
                 return False
         else:
-            print(f"提示：暫存檔案不存在，這是正常的（首次使用）")  # 調試信息
+            logger.debug("暫存檔案不存在（首次使用）")
             self.status_label.config(text="暫存檔案不存在（首次使用）")
-            print("=== 暫存列表載入完成 ===\n")  # 調試信息
             return True
 
     def load_text_content(self, image_path):
         """加載與圖片對應的文本內容"""
-        print("\n=== 開始載入文本內容 ===")  # 調試信息
-        print(f"圖片路徑：{image_path}")  # 調試信息
-
         if not image_path:
-            print("錯誤：圖片路徑為空")  # 調試信息
+            logger.error("圖片路徑為空")
             return False
 
         # 更新資料夾路徑
@@ -284,117 +307,112 @@ class ListManager:
         if new_folder != self.current_folder:
             self.set_current_folder(new_folder)
 
+        # 切換圖片時立即寫入上一張圖片尚未保存的編輯（不等待寫入完成）
+        self.autosave.flush()
+        self.report_autosave_errors()
+
         # 設置當前文本路徑
         base_path = os.path.splitext(image_path)[0]
         self.current_txt_path = base_path + '.txt'
-        print(f"文本檔案路徑：{self.current_txt_path}")  # 調試信息
+        logger.debug("載入文本內容：%s", self.current_txt_path)
 
         # 清空左側列表
         self.left_list.listbox.delete(0, tk.END)
 
-        if os.path.exists(self.current_txt_path):
-            try:
-                with open(self.current_txt_path, 'r', encoding='utf-8') as f:
-                    content = f.read().strip()
-                    items = [item.strip()
-                             for item in content.split(',') if item.strip()]
-                    print(f"成功讀取到 {len(items)} 個提示詞")  # 調試信息
-                    for item in items:
-                        self.left_list.listbox.insert(tk.END, item)
-                    print("=== 文本內容載入完成 ===\n")  # 調試信息
-                    return True
-            except Exception as e:
-                error_msg = f"{self.get_text('cant_read_file')}{str(e)}"
-                print(f"錯誤：{error_msg}")  # 調試信息
-                self.left_list.listbox.insert(tk.END, error_msg)
-                print("=== 文本內容載入失敗 ===\n")  # 調試信息
-                return False
+        try:
+            pending = self.autosave.pending(self.current_txt_path)
+            if pending is not None:
+                # 尚未寫入磁碟的編輯
+                items = split_prompts(pending.strip())
+            else:
+                # 未變更的文本文件直接從索引返回
+                items = get_prompt_index(self.current_folder).get_txt_prompts(
+                    self.current_txt_path)
+        except Exception as e:
+            error_msg = f"{self.get_text('cant_read_file')}{str(e)}"
+            logger.error(error_msg)
+            self.left_list.listbox.insert(tk.END, error_msg)
+            return False
+
+        if items is not None:
+            logger.debug("讀取到 %d 個提示詞：%s", len(items), items)
+            self.left_list.listbox.replace(items)
+            return True
         else:
-            print(f"文本檔案不存在")  # 調試信息
+            logger.debug("文本檔案不存在")
             self.left_list.listbox.insert(tk.END, self.get_text("no_txt_file"))
-            print("=== 文本內容載入完成 ===\n")  # 調試信息
             return False
 
     def save_text_content(self):
-        """保存文本內容到文件"""
-        print("\n=== 開始保存文本內容 ===")
-        print(f"當前文本路徑：{self.current_txt_path}")
+        """保存文本內容與暫存列表：立即交給背景執行緒寫入，不阻塞界面"""
+        logger.debug("保存文本內容：%s", self.current_txt_path)
 
         if not self.current_txt_path:
-            print("錯誤：當前文本路徑為空")
+            logger.error("當前文本路徑為空")
             self.status_label.config(text="錯誤：未選擇文本文件")
             return False
 
-        try:
-            # 獲取左側列表的所有項目
-            items = self.left_list.listbox.get(0, tk.END)
-            content = ','.join(items)
-            print(f"準備保存的內容：{content}")
-
-            # 保存文本內容
-            with open(self.current_txt_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+        self.mark_text_dirty()
+        self.save_temp_list()
+        self.autosave.flush()
 
-            # 保存暫存列表
-            self.save_temp_list()
+        # 以保存的提示詞增量更新資料夾的標籤統計
+        if hasattr(self, 'image_viewer'):
+            image_path = self.image_viewer.image_handler.get_current_image_path()
+            if image_path and os.path.splitext(image_path)[0] + '.txt' == self.current_txt_path:
+                self.image_viewer.on_tags_saved(image_path, self.current_prompts())
 
-            success_msg = "保存成功"
-            print(f"成功：{success_msg}")
-            self.status_label.config(text=success_msg)
-            return True
-        except Exception as e:
-            error_msg = f"保存失敗：{str(e)}"
-            print(f"錯誤：{error_msg}")
-            self.status_label.config(text=error_msg)
-            return False
+        success_msg = "保存成功"
+        self.status_label.config(text=success_msg)
+        self.report_autosave_errors()
+        return True
 
     def save_temp_list(self):
         """保存暫存列表到文件"""
-        print("\n=== 開始保存暫存列表 ===")  # 調試信息
-        print(f"當前資料夾路徑：'{self.current_folder}'")  # 調試信息
-
         if not self.current_folder:
-            print("錯誤：未設置當前資料夾路徑")  # 調試信息
+            logger.error("未設置當前資料夾路徑")
             self.status_label.config(text="錯誤：未設置保存目錄")
-            print("=== 暫存列表保存失敗 ===\n")  # 調試信息
             return False
 
-        if not os.path.exists(self.current_folder):
-            try:
-                os.makedirs(self.current_folder)
-                print(f"創建目錄：{self.current_folder}")  # 調試信息
-            except Exception as e:
-                error_msg = f"無法創建目錄：{str(e)}"
-                print(f"錯誤：{error_msg}")  # 調試信息
-                self.status_label.config(text=error_msg)
-                print("=== 暫存列表保存失敗 ===\n")  # 調試信息
-                return False
-
-        temp_path = os.path.join(self.current_folder, 'temp.txt')
-        print(f"暫存檔案完整路徑：'{temp_path}'")  # 調試信息
+        self.mark_temp_dirty()
+        return True
 
-        try:
-            items = [self.right_list.listbox.get(
-                i) for i in range(self.right_list.listbox.size())]
-            print(f"準備保存 {len(items)} 個提示詞")  # 調試信息
-            print(f"提示詞列表：{items}")  # 調試信息
-
-            content = ', '.join(items)
-            with open(temp_path, 'w', encoding='utf-8') as f:
-                f.write(content)
-
-            success_msg = "暫存列表保存成功"
-            print(f"成功：{success_msg}")  # 調試信息
-            self.status_label.config(text=success_msg)
-            print("=== 暫存列表保存完成 ===\n")  # 調試信息
-            return True
+    def current_prompts(self):
+        """返回左側列表中的提示詞（不包含「文本檔案不存在」的提示）"""
+        placeholder = self.get_text("no_txt_file")
+        return [item for item in self.left_list.model if item != placeholder]
 
-        except Exception as e:
-            error_msg = f"無法保存暫存列表：{str(e)}"
-            print(f"錯誤：{error_msg}")  # 調試信息
-            self.status_label.config(text=error_msg)
-            print("=== 暫存列表保存失敗 ===\n")  # 調試信息
-            return False
+    def mark_text_dirty(self):
+        """提示詞列表已編輯：合併後在背景寫入當前圖片的文本文件"""
+        if not self.current_txt_path:
+            return
+        folder = self.current_folder
+        self.autosave.schedule(
+            self.current_txt_path, ','.join(self.current_prompts()),
+            # 文本已變更，使索引中的舊記錄失效
+            on_written=lambda path: get_prompt_index(folder).invalidate(path))
+
+    def mark_temp_dirty(self):
+        """暫存列表已編輯：合併後在背景寫入資料夾的 temp.txt"""
+        if not self.current_folder:
+            return
+        temp_path = os.path.join(self.current_folder, 'temp.txt')
+        self.autosave.schedule(temp_path, ', '.join(self.right_list.model))
+
+    def report_autosave_errors(self):
+        """在狀態欄顯示背景寫入失敗的文件"""
+        errors = self.autosave.drain_errors()
+        if errors:
+            path, error = errors[-1]
+            self.status_label.config(
+                text=f"保存失敗：{os.path.basename(path)}：{error}")
+
+    def close_autosave(self):
+        """寫入所有尚未保存的編輯（退出時調用）"""
+        if not self.autosave.close(self.AUTOSAVE_EXIT_TIMEOUT):
+            logger.warning("部分編輯未能在退出前寫入")
+        for path, error in self.autosave.drain_errors():
+            logger.error("保存失敗：%s：%s", path, error)
 
     def update_texts(self):
         """更新界面文字"""
@@ -406,6 +424,8 @@ class ListManager:
         self.add_to_left_button.config(text=self.get_text("add_to_prompts"))
         self.add_to_right_button.config(text=self.get_text("add_to_temp"))
         self.gemini_button.config(text=self.get_text("get_suggestions"))
+        self.batch_gemini_button.config(
+            text=self.get_text("batch_suggestions"))
 
         # 更新右鍵選單
         self.context_menu.entryconfigure(
@@ -415,10 +435,9 @@ class ListManager:
         """添加提示詞到左側列表"""
         prompt = self.prompt_var.get().strip()
         if prompt:
-            # 檢查是否已存在
-            existing_items = self.left_list.listbox.get(0, tk.END)
-            if prompt not in existing_items:
-                self.left_list.listbox.insert(tk.END, prompt)
+            # 已存在時不會重複添加
+            if self.left_list.listbox.add(prompt):
+                self.mark_text_dirty()
                 self.prompt_var.set("")  # 清空輸入框
                 self.status_label.config(text="提示詞已添加到提示詞區域")
             else:
@@ -428,10 +447,9 @@ class ListManager:
         """添加提示詞到右側列表"""
         prompt = self.prompt_var.get().strip()
         if prompt:
-            # 檢查是否已存在
-            existing_items = self.right_list.listbox.get(0, tk.END)
-            if prompt not in existing_items:
-                self.right_list.listbox.insert(tk.END, prompt)
+            # 已存在時不會重複添加
+            if self.right_list.listbox.add(prompt):
+                self.mark_temp_dirty()
                 self.prompt_var.set("")  # 清空輸入框
                 self.status_label.config(text="提示詞已添加到暫存區域")
             else:
@@ -448,10 +466,9 @@ class ListManager:
         if selection:
             index = selection[0]
             item = self.left_list.listbox.get(index)
-            # 檢查是否已存在於右側列表
-            existing_items = self.right_list.listbox.get(0, tk.END)
-            if item not in existing_items:
-                self.right_list.listbox.insert(tk.END, item)
+            # 已存在於右側列表時不會重複添加
+            if self.right_list.listbox.add(item):
+                self.mark_temp_dirty()
                 self.status_label.config(text=f"已添加到暫存列表：{item}")
 
     def on_right_double_click(self, event):
@@ -460,10 +477,9 @@ class ListManager:
         if selection:
             index = selection[0]
             item = self.right_list.listbox.get(index)
-            # 檢查是否已存在於左側列表
-            existing_items = self.left_list.listbox.get(0, tk.END)
-            if item not in existing_items:
-                self.left_list.listbox.insert(tk.END, item)
+            # 已存在於左側列表時不會重複添加
+            if self.left_list.listbox.add(item):
+                self.mark_text_dirty()
                 self.status_label.config(text=f"已添加到提示詞列表：{item}")
 
     def load_favorites(self):
@@ -478,12 +494,11 @@ class ListManager:
                     content = f.read().strip()
                     self.favorite_list = [
                         item.strip() for item in content.split(',') if item.strip()]
-                    self.favorite_list_frame.listbox.delete(0, tk.END)
-                    for item in self.favorite_list:
-                        self.favorite_list_frame.listbox.insert(tk.END, item)
+                    self.favorite_list_frame.listbox.replace(
+                        self.favorite_list)
                 return True
             except Exception as e:
-                print(f"加載收藏列表失敗：{str(e)}")
+                logger.error("加載收藏列表失敗：%s", e)
                 return False
         return True
 
@@ -498,13 +513,16 @@ class ListManager:
                 f.write(','.join(self.favorite_list))
             return True
         except Exception as e:
-            print(f"保存收藏列表失敗：{str(e)}")
+            logger.error("保存收藏列表失敗：%s", e)
             return False
 
     def show_context_menu(self, event):
         """直接刪除選中的項目"""
-        # 獲取被點擊的列表
-        clicked_list = event.widget
+        # 獲取被點擊的列表（事件來自只含可見行的底層列表框）
+        if event.widget == self.left_list.listbox.widget:
+            clicked_list = self.left_list.listbox
+        else:
+            clicked_list = self.right_list.listbox
         # 確保有選中的項目
         if clicked_list.curselection():
             index = clicked_list.curselection()[0]
@@ -512,8 +530,10 @@ class ListManager:
             clicked_list.delete(index)
             # 更新狀態標籤
             if clicked_list == self.left_list.listbox:
+                self.mark_text_dirty()
                 self.status_label.config(text=f"已從提示詞列表移除：{item}")
             else:
+                self.mark_temp_dirty()
                 self.status_label.config(text=f"已從暫存列表移除：{item}")
 
     def delete_selected_item(self):
@@ -526,69 +546,177 @@ class ListManager:
                 self.current_selected_list.delete(index)
                 # 更新狀態標籤
                 if self.current_selected_list == self.left_list.listbox:
+                    self.mark_text_dirty()
                     self.status_label.config(text=f"已從提示詞列表移除：{item}")
                 else:
+                    self.mark_temp_dirty()
                     self.status_label.config(text=f"已從暫存列表移除：{item}")
 
-    def get_gemini_suggestions(self):
-        """從 Gemini 獲取提示詞建議"""
+    def _preload_gemini(self):
+        """在背景執行緒中載入 Gemini 相關模組，第一次點擊按鈕時不需要等待"""
+        def preload():
+            try:
+                importlib.import_module('utils.gemini_interface')
+                importlib.import_module('google.genai')
+            except ImportError as e:
+                logger.error("Error loading Gemini modules: %s", e)
+
+        threading.Thread(target=preload, name='gemini-preload', daemon=True).start()
+
+    def _ensure_gemini(self) -> bool:
+        """確保 Gemini 接口已初始化（第一次調用時才載入 google-genai）"""
+        if not self.gemini:
+            api_key = os.getenv('GEMINI_API_KEY')
+            if not api_key:
+                self.status_label.config(text=self.get_text("no_api_key"))
+                return False
+            try:
+                from utils.gemini_interface import GeminiInterface
+                self.gemini = GeminiInterface(
+                    api_key, cache=SuggestionCache(),
+                    upload_settings=UploadSettings.from_env(),
+                    rate_limiter=RateLimiter.from_env())
+            except Exception as e:
+                logger.error("Error initializing Gemini interface: %s", e)
+                self.status_label.config(
+                    text=self.get_text("suggestion_error"))
+                return False
+        return True
+
+    def get_gemini_suggestions(self, use_cache=True):
+        """
+        從 Gemini 獲取提示詞建議（在背景請求，不阻塞界面）
+
+        Args:
+            use_cache (bool): 是否使用快取的結果，False 時重新請求
+        """
         try:
             # 檢查是否已初始化 Gemini 接口
-            if not self.gemini:
-                api_key = os.getenv('GEMINI_API_KEY')
-                if not api_key:
-                    self.status_label.config(text=self.get_text("no_api_key"))
-                    return
-                try:
-                    self.gemini = GeminiInterface(api_key)
-                except Exception as e:
-                    print(f"Error initializing Gemini interface: {str(e)}")
-                    self.status_label.config(
-                        text=self.get_text("suggestion_error"))
-                    return
+            if not self._ensure_gemini():
+                return
 
             # 檢查是否有選擇圖片
-            if not hasattr(self, 'image_viewer') or not self.image_viewer.image_handler.current_image:
+            current_image_path = None
+            if hasattr(self, 'image_viewer'):
+                current_image_path = self.image_viewer.image_handler.get_current_image_path()
+            if not current_image_path:
                 self.status_label.config(
                     text=self.get_text("no_image_selected"))
                 return
 
-            # 獲取當前圖片路徑
-            current_image_path = self.image_viewer.image_handler.image_files[
-                self.image_viewer.image_handler.current_index]
-
-            # 打開當前圖片
-            with Image.open(current_image_path) as img:
-                # 獲取當前暫存列表中的提示詞
-                temp_prompts = list(self.right_list.listbox.get(0, tk.END))
-
-                # 獲取建議
-                suggestions = self.gemini.get_prompt_suggestions(
-                    img, temp_prompts)
-
-                if suggestions:
-                    # 獲取當前左側列表中的所有項目
-                    existing_items = self.left_list.listbox.get(0, tk.END)
-
-                    # 添加建議到提示詞列表
-                    added_count = 0
-                    for suggestion in suggestions:
-                        # 確保建議不為空且不在現有列表中
-                        if suggestion and suggestion not in existing_items:
-                            self.left_list.listbox.insert(tk.END, suggestion)
-                            added_count += 1
-
-                    # 更新狀態標籤
-                    if added_count > 0:
-                        self.status_label.config(
-                            text=f"{self.get_text('suggestions_added')} ({added_count})")
-                    else:
-                        self.status_label.config(
-                            text=self.get_text("no_new_suggestions"))
-                else:
-                    self.status_label.config(
-                        text=self.get_text("no_suggestions"))
+            # 批次請求已取得的結果直接使用
+            if use_cache and current_image_path in self.suggestion_results:
+                self.apply_suggestions(
+                    self.suggestion_results.pop(current_image_path))
+                return
+
+            # 獲取當前暫存列表中的提示詞
+            temp_prompts = self.right_list.model.items()
+
+            future = self.async_runner.submit(
+                self.gemini.aget_prompt_suggestions_for_path(current_image_path, temp_prompts, use_cache))
+            future.add_done_callback(
+                lambda f: self._queue_suggestion_result(current_image_path, f))
+            self._start_suggestion_requests(1)
 
         except Exception as e:
-            print(f"Error getting Gemini suggestions: {str(e)}")
+            logger.error("Error getting Gemini suggestions: %s", e)
             self.status_label.config(text=self.get_text("suggestion_error"))
+
+    def on_gemini_shift_click(self, event):
+        """Shift + 點擊獲取建議按鈕：略過快取重新請求"""
+        self.get_gemini_suggestions(use_cache=False)
+        return 'break'
+
+    def get_batch_gemini_suggestions(self):
+        """為接下來的多張圖片（篩選時為符合的圖片）並行請求建議"""
+        if not self._ensure_gemini():
+            return
+        if not hasattr(self, 'image_viewer') or not self.image_viewer.image_handler.get_total_images():
+            self.status_label.config(text=self.get_text("no_image_selected"))
+            return
+
+        handler = self.image_viewer.image_handler
+        if handler.filter_paths is not None:
+            candidates = handler.filter_paths
+        else:
+            candidates = handler.image_files[max(handler.current_index, 0):]
+        image_paths = [path for path in candidates
+                       if path not in self.suggestion_results][:self.BATCH_SUGGESTION_LIMIT]
+        if not image_paths:
+            return
+
+        temp_prompts = self.right_list.model.items()
+        future = self.async_runner.submit(self.gemini.batch_prompt_suggestions(
+            image_paths, temp_prompts,
+            on_result=lambda path, suggestions: self.suggestion_queue.put((path, suggestions))))
+        future.add_done_callback(self._log_batch_error)
+        self._start_suggestion_requests(len(image_paths))
+
+    def _queue_suggestion_result(self, image_path, future):
+        """在背景執行緒中將單張圖片的結果放入佇列"""
+        try:
+            suggestions = future.result()
+        except Exception as e:
+            logger.error("Error getting Gemini suggestions: %s", e)
+            suggestions = None
+        self.suggestion_queue.put((image_path, suggestions))
+
+    def _log_batch_error(self, future):
+        """批次請求意外中止時記錄錯誤"""
+        if not future.cancelled() and future.exception() is not None:
+            logger.error("Error getting batch Gemini suggestions: %s", future.exception())
+
+    def _start_suggestion_requests(self, count):
+        """記錄新提交的請求數，並在需要時開始輪詢結果"""
+        polling = self.pending_suggestions > 0
+        self.pending_suggestions += count
+        self.status_label.config(
+            text=f"{self.get_text('suggestions_pending')} ({self.pending_suggestions})")
+        if not polling:
+            self.frame.after(self.SUGGESTION_POLL_MS, self._poll_suggestions)
+
+    def _poll_suggestions(self):
+        """將背景完成的建議交給界面：當前圖片直接加入列表，其他圖片暫存"""
+        current_image_path = None
+        if hasattr(self, 'image_viewer'):
+            current_image_path = self.image_viewer.image_handler.get_current_image_path()
+
+        while True:
+            try:
+                image_path, suggestions = self.suggestion_queue.get_nowait()
+            except queue.Empty:
+                break
+            self.pending_suggestions = max(self.pending_suggestions - 1, 0)
+            if suggestions is None:
+                self.status_label.config(
+                    text=self.get_text("suggestion_error"))
+            elif image_path == current_image_path:
+                self.apply_suggestions(suggestions)
+            else:
+                self.suggestion_results[image_path] = suggestions
+                self.status_label.config(
+                    text=f"{self.get_text('suggestions_ready')}: {len(self.suggestion_results)}, "
+                         f"{self.get_text('suggestions_pending')}: {self.pending_suggestions}")
+
+        if self.pending_suggestions > 0:
+            self.frame.after(self.SUGGESTION_POLL_MS, self._poll_suggestions)
+
+    def apply_suggestions(self, suggestions):
+        """將建議加入提示詞列表"""
+        if suggestions:
+            # 添加建議到提示詞列表，模型會略過已存在的項目
+            added_count = sum(1 for suggestion in suggestions
+                              if suggestion and self.left_list.listbox.add(suggestion))
+
+            # 更新狀態標籤
+            if added_count > 0:
+                self.mark_text_dirty()
+                self.status_label.config(
+                    text=f"{self.get_text('suggestions_added')} ({added_count})")
+            else:
+                self.status_label.config(
+                    text=self.get_text("no_new_suggestions"))
+        else:
+            self.status_label.config(
+                text=self.get_text("no_suggestions"))
@@ -5,6 +5,9 @@ import os
 from .list_manager import ListManager
 from .image_viewer import ImageViewer
 from utils.translations import TranslationManager
+from utils.tracing import get_logger
+
+logger = get_logger(__name__)
 
 
 class MainWindow:
@@ -47,40 +50,34 @@ class MainWindow:
 
     def connect_components(self) -> None:
         """連接組件之間的功能"""
-        print("正在連接組件...")  # 調試信息
-
         # 將列表管理器的方法連接到圖片查看器
         self.image_viewer.load_text_content = self.list_manager.load_text_content
         self.image_viewer.save_text_content = self.list_manager.save_text_content
         # 添加相互引用
         self.image_viewer.list_manager = self.list_manager
         self.list_manager.image_viewer = self.image_viewer
-        print("已連接組件之間的相互引用")  # 調試信息
 
         # 保存原始的 select_folder 方法
         original_select_folder = self.image_viewer.select_folder
 
         # 創建新的 select_folder 方法
         def new_select_folder():
-            print("\n=== 開始選擇資料夾 ===")  # 調試信息
             folder_path = original_select_folder()
             if folder_path:
-                print(f"資料夾選擇成功：{folder_path}")  # 調試信息
-
                 # 設置資料夾路徑（這會自動載入暫存列表）
                 self.list_manager.set_current_folder(folder_path)
 
                 # 強制更新界面
                 self.list_manager.frame.update()
-                print("=== 資料夾選擇完成 ===\n")  # 調試信息
             return folder_path
 
         # 替換 select_folder 方法
         self.image_viewer.select_folder = new_select_folder
 
-        # 設置退出功能
+        # 設置退出功能（包括關閉窗口），退出前寫入尚未保存的編輯
         self.image_viewer.on_exit = self.on_exit
-        print("組件連接完成")  # 調試信息
+        self.root.protocol("WM_DELETE_WINDOW", self.on_exit)
+        logger.debug("組件連接完成")
 
     def create_main_frame(self):
         """創建主框架"""
@@ -150,6 +147,16 @@ class MainWindow:
 
     def on_exit(self):
         """退出程序"""
+        # 寫入尚未保存的提示詞與暫存列表
+        self.list_manager.close_autosave()
+        # 停止背景預取
+        self.image_viewer.image_handler.prefetcher.shutdown()
+        # 停止監視資料夾
+        self.image_viewer.stop_folder_watch()
+        # 停止縮略圖生成進程
+        self.image_viewer.close_thumbnail_grid()
+        # 停止背景的 Gemini 請求
+        self.list_manager.async_runner.shutdown()
         self.root.quit()
 
     def run(self):
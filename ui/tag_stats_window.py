@@ -0,0 +1,162 @@
+from typing import TYPE_CHECKING, List, Optional, Tuple
+import threading
+import tkinter as tk
+from tkinter import ttk
+
+if TYPE_CHECKING:
+    from .image_viewer import ImageViewer
+
+
+class TagStatsWindow:
+    """
+    資料夾標籤統計窗口
+
+    左側列出資料夾中出現最多的標籤，選中一個標籤時右側列出與它共現最多的標籤。
+    統計在第一次打開時於背景建立，之後保存 txt 時由 ImageViewer.on_tags_saved() 增量更新並刷新。
+    """
+
+    # 列出的標籤數
+    TOP_TAGS = 200
+    # 列出的共現標籤數
+    TOP_PARTNERS = 100
+    # 等待背景統計完成的輪詢間隔（毫秒）
+    POLL_MS = 50
+
+    def __init__(self, parent: tk.Misc, viewer: 'ImageViewer') -> None:
+        """
+        初始化統計窗口
+
+        Args:
+            parent (tk.Misc): 父窗口
+            viewer (ImageViewer): 主窗口的圖片查看器，提供圖片列表與標籤統計
+        """
+        self.viewer = viewer
+        self.handler = viewer.image_handler
+        self.tags: List[str] = []
+        self.selected_tag: Optional[str] = None
+
+        self.window = tk.Toplevel(parent)
+        self.window.title(viewer.get_text("tag_stats"))
+        self.window.geometry("560x480")
+        self.window.grid_rowconfigure(1, weight=1)
+        self.window.grid_columnconfigure(0, weight=1)
+        self.window.grid_columnconfigure(2, weight=1)
+
+        self.tags_label = ttk.Label(self.window, text=viewer.get_text("tag_stats"))
+        self.tags_label.grid(row=0, column=0, columnspan=2, sticky=tk.W)
+        self.partners_label = ttk.Label(
+            self.window, text=viewer.get_text("tag_stats_cooccurring"))
+        self.partners_label.grid(row=0, column=2, columnspan=2, sticky=tk.W)
+
+        self.tags_listbox = self._create_listbox(0)
+        self.partners_listbox = self._create_listbox(2)
+        self.tags_listbox.bind('<<ListboxSelect>>', self.on_tag_select)
+
+        self.status_label = ttk.Label(self.window)
+        self.status_label.grid(row=2, column=0, columnspan=4, sticky=(tk.W, tk.E))
+
+        if self.handler.is_tag_stats_current():
+            self.refresh()
+        else:
+            self.build()
+
+    def _create_listbox(self, column: int) -> tk.Listbox:
+        listbox = tk.Listbox(self.window, exportselection=False)
+        listbox.grid(row=1, column=column, sticky=(tk.W, tk.E, tk.N, tk.S))
+        scrollbar = ttk.Scrollbar(self.window, command=listbox.yview)
+        scrollbar.grid(row=1, column=column + 1, sticky=(tk.N, tk.S))
+        listbox.config(yscrollcommand=scrollbar.set)
+        return listbox
+
+    def build(self) -> None:
+        """在背景統計目前的圖片列表，完成後刷新"""
+        self.status_label.config(text=self.viewer.get_text("tag_stats_building"))
+        builder = threading.Thread(target=self.handler.build_tag_stats, daemon=True)
+        builder.start()
+        self._wait_for_build(builder)
+
+    def _wait_for_build(self, builder: threading.Thread) -> None:
+        if not self.is_open():
+            return
+        if builder.is_alive():
+            self.window.after(self.POLL_MS, self._wait_for_build, builder)
+        else:
+            self.refresh()
+
+    def refresh(self) -> None:
+        """以目前的統計重新填入列表，保留選中的標籤"""
+        if not self.is_open() or self.handler.tag_stats is None:
+            return
+        stats = self.handler.tag_stats
+        top = stats.top_tags(self.TOP_TAGS)
+        self.tags = [tag for tag, _ in top]
+        self.tags_listbox.delete(0, tk.END)
+        for tag, count in top:
+            self.tags_listbox.insert(tk.END, f"{tag} ({count})")
+        if self.selected_tag in self.tags:
+            index = self.tags.index(self.selected_tag)
+            self.tags_listbox.selection_set(index)
+            self.tags_listbox.see(index)
+        self._update_status()
+        self.show_partners()
+
+    def on_tag_select(self, event: tk.Event) -> None:
+        """選中標籤時列出與它共現的標籤"""
+        selection = self.tags_listbox.curselection()
+        if selection:
+            self.selected_tag = self.tags[selection[0]]
+            self.show_partners()
+
+    def show_partners(self) -> None:
+        """列出與選中標籤共現最多的標籤；共現行尚未建立時在背景計算，不阻塞界面"""
+        self.partners_listbox.delete(0, tk.END)
+        stats = self.handler.tag_stats
+        if self.selected_tag is None or stats is None:
+            return
+        tag = self.selected_tag
+        if stats.has_cooccurrence(tag):
+            self._fill_partners(stats.cooccurring(tag, self.TOP_PARTNERS))
+            return
+
+        self.status_label.config(text=self.viewer.get_text("tag_stats_building"))
+        result: List[List[Tuple[str, int]]] = []
+        worker = threading.Thread(
+            target=lambda: result.append(stats.cooccurring(tag, self.TOP_PARTNERS)),
+            daemon=True)
+        worker.start()
+        self._wait_for_partners(worker, tag, result)
+
+    def _wait_for_partners(self, worker: threading.Thread, tag: str,
+                           result: List[List[Tuple[str, int]]]) -> None:
+        if not self.is_open():
+            return
+        if worker.is_alive():
+            self.window.after(self.POLL_MS, self._wait_for_partners, worker, tag, result)
+            return
+        if tag == self.selected_tag and result:
+            self._fill_partners(result[0])
+        self._update_status()
+
+    def _fill_partners(self, partners: List[Tuple[str, int]]) -> None:
+        self.partners_listbox.delete(0, tk.END)
+        for tag, count in partners:
+            self.partners_listbox.insert(tk.END, f"{tag} ({count})")
+
+    def _update_status(self) -> None:
+        stats = self.handler.tag_stats
+        if stats is not None:
+            self.status_label.config(
+                text=f"{stats.image_count} {self.viewer.get_text('thumbnails_images')}, "
+                     f"{stats.tag_count} {self.viewer.get_text('tag_stats_tags')}")
+
+    def is_open(self) -> bool:
+        """窗口是否仍然存在"""
+        try:
+            return bool(self.window.winfo_exists())
+        except tk.TclError:
+            return False
+
+    def close(self) -> None:
+        """關閉窗口"""
+        if self.is_open():
+            self.window.destroy()
@@ -0,0 +1,258 @@
+from typing import TYPE_CHECKING, List, Optional
+from collections import OrderedDict
+import io
+import math
+import tkinter as tk
+from tkinter import ttk
+from PIL import Image, ImageTk
+from utils.thumbnail_store import (THUMBNAIL_SIZE, ThumbnailGenerator, ThumbnailStore,
+                                   get_thumbnail_store)
+
+if TYPE_CHECKING:
+    from .image_viewer import ImageViewer
+
+
+class ThumbnailGrid:
+    """
+    可滾動的縮略圖網格窗口
+
+    只為可見的行建立畫布項目；縮略圖先從資料夾的縮略圖資料庫讀取，
+    缺少的交給進程池生成（可見的優先），其餘圖片在背景依序補齊。
+    點擊縮略圖會在主窗口中顯示該圖片。
+    """
+
+    # 每個格子的邊距（像素）
+    CELL_PADDING = 6
+    # 輪詢生成結果的間隔（毫秒）
+    POLL_MS = 50
+    # 背景補齊時每次檢查的圖片數
+    FILL_CHUNK = 256
+    # 保留在記憶體中的 PhotoImage 數
+    PHOTO_CACHE_SIZE = 600
+
+    def __init__(self, parent: tk.Misc, viewer: 'ImageViewer') -> None:
+        """
+        初始化縮略圖網格
+
+        Args:
+            parent (tk.Misc): 父窗口
+            viewer (ImageViewer): 主窗口的圖片查看器，提供圖片列表並負責顯示選中的圖片
+        """
+        self.viewer = viewer
+        self.handler = viewer.image_handler
+        self.cell_size = THUMBNAIL_SIZE + 2 * self.CELL_PADDING
+        self.top_row = 0
+        self.columns = 1
+        self.visible_rows = 1
+
+        self.folder: Optional[str] = None
+        self.store: Optional[ThumbnailStore] = None
+        self.generator = ThumbnailGenerator()
+        self.photos: 'OrderedDict[str, ImageTk.PhotoImage]' = OrderedDict()
+        self.fill_position = 0
+        self.polling = False
+
+        self.window = tk.Toplevel(parent)
+        self.window.title(viewer.get_text("thumbnails"))
+        self.window.geometry("900x640")
+        self.window.grid_rowconfigure(0, weight=1)
+        self.window.grid_columnconfigure(0, weight=1)
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        self.canvas = tk.Canvas(self.window, background='white', highlightthickness=0)
+        self.canvas.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.scrollbar = ttk.Scrollbar(self.window, command=self.yview)
+        self.scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+
+        self.status_label = ttk.Label(self.window)
+        self.status_label.grid(row=1, column=0, columnspan=2, sticky=(tk.W, tk.E))
+
+        self.canvas.bind('<Configure>', self.on_configure)
+        self.canvas.bind('<Button-1>', self.on_click)
+        self.canvas.bind('<MouseWheel>', lambda e: self.scroll_rows(-1 if e.delta > 0 else 1))
+        self.canvas.bind('<Button-4>', lambda e: self.scroll_rows(-1))
+        self.canvas.bind('<Button-5>', lambda e: self.scroll_rows(1))
+        self.window.bind('<Prior>', lambda e: self.scroll_rows(-self.visible_rows))
+        self.window.bind('<Next>', lambda e: self.scroll_rows(self.visible_rows))
+
+        self.scroll_to_current()
+
+    def image_paths(self) -> List[str]:
+        """返回要顯示的圖片：篩選時為符合條件的圖片，否則為全部圖片"""
+        if self.handler.filter_paths is not None:
+            return self.handler.filter_paths
+        return self.handler.image_files
+
+    def _sync_folder(self) -> None:
+        """主窗口切換了資料夾時，改用新資料夾的縮略圖資料庫"""
+        folder = self.viewer.current_folder
+        if folder and folder != self.folder:
+            self.folder = folder
+            self.store = get_thumbnail_store(folder)
+            self.generator.shutdown()
+            self.photos.clear()
+            self.fill_position = 0
+            self.top_row = 0
+
+    def on_configure(self, event: tk.Event) -> None:
+        """窗口大小改變時重新計算列數與可見行數"""
+        first_visible = self.top_row * self.columns
+        self.columns = max(1, event.width // self.cell_size)
+        self.visible_rows = max(1, math.ceil(event.height / self.cell_size))
+        self.top_row = first_visible // self.columns
+        self.render()
+
+    def yview(self, *args) -> None:
+        """處理滾動條的 moveto / scroll 命令"""
+        total_rows = self._total_rows()
+        if args and args[0] == 'moveto':
+            self.top_row = int(float(args[1]) * total_rows)
+            self.render()
+        elif args and args[0] == 'scroll':
+            step = self.visible_rows if args[2] == 'pages' else 1
+            self.scroll_rows(int(args[1]) * step)
+
+    def scroll_rows(self, rows: int) -> None:
+        self.top_row += rows
+        self.render()
+
+    def scroll_to_current(self) -> None:
+        """滾動到主窗口當前顯示的圖片"""
+        current_path = self.handler.get_current_image_path()
+        paths = self.image_paths()
+        if current_path in paths:
+            self.top_row = paths.index(current_path) // self.columns
+        self.render()
+
+    def _total_rows(self) -> int:
+        return math.ceil(len(self.image_paths()) / self.columns)
+
+    def _photo(self, path: str, data: bytes) -> ImageTk.PhotoImage:
+        """由 JPEG 位元組建立 PhotoImage 並放入快取"""
+        with Image.open(io.BytesIO(data)) as img:
+            photo = ImageTk.PhotoImage(img)
+        self.photos[path] = photo
+        while len(self.photos) > self.PHOTO_CACHE_SIZE:
+            self.photos.popitem(last=False)
+        return photo
+
+    def _load_visible(self, paths: List[str]) -> None:
+        """為可見的圖片讀取縮略圖，資料庫中沒有的交給進程池優先生成"""
+        missing = [path for path in paths if path not in self.photos]
+        if not missing or self.store is None:
+            return
+        stored = self.store.get_many(missing)
+        for path, data in stored.items():
+            self._photo(path, data)
+        self.generator.request([path for path in missing if path not in stored], urgent=True)
+
+    def render(self) -> None:
+        """重繪可見的行"""
+        self._sync_folder()
+        paths = self.image_paths()
+        total_rows = self._total_rows()
+        self.top_row = max(0, min(self.top_row, total_rows - self.visible_rows + 1))
+        start = self.top_row * self.columns
+        end = min(len(paths), (self.top_row + self.visible_rows) * self.columns)
+        visible = paths[start:end]
+        self._load_visible(visible)
+
+        current_path = self.handler.get_current_image_path()
+        self.canvas.delete('all')
+        for offset, path in enumerate(visible):
+            row, column = divmod(offset, self.columns)
+            x = column * self.cell_size + self.cell_size // 2
+            y = row * self.cell_size + self.cell_size // 2
+            photo = self.photos.get(path)
+            if photo is not None:
+                self.photos.move_to_end(path)
+                self.canvas.create_image(x, y, image=photo)
+            else:
+                half = THUMBNAIL_SIZE // 2
+                self.canvas.create_rectangle(x - half, y - half, x + half, y + half,
+                                             outline='#cccccc', fill='#f0f0f0')
+            if path == current_path:
+                half = self.cell_size // 2 - 2
+                self.canvas.create_rectangle(x - half, y - half, x + half, y + half,
+                                             outline='#3874d8', width=3)
+
+        if total_rows:
+            self.scrollbar.set(self.top_row / total_rows,
+                               min(1.0, (self.top_row + self.visible_rows) / total_rows))
+        else:
+            self.scrollbar.set(0, 1)
+        self._update_status()
+        self._start_polling()
+
+    def _update_status(self) -> None:
+        pending = len(self.generator.queue) + len(self.generator.pending) * self.generator.batch_size
+        text = f"{len(self.image_paths())} {self.viewer.get_text('thumbnails_images')}"
+        if pending:
+            text += f", {self.viewer.get_text('thumbnails_generating')} {pending}"
+        self.status_label.config(text=text)
+
+    def _start_polling(self) -> None:
+        if not self.polling:
+            self.polling = True
+            self.window.after(self.POLL_MS, self._poll)
+
+    def _fill_background(self) -> None:
+        """進程池有空閒時，檢查下一段圖片並排入缺少的縮略圖"""
+        paths = self.image_paths()
+        if self.store is None or self.generator.queue or self.fill_position >= len(paths):
+            return
+        chunk = paths[self.fill_position:self.fill_position + self.FILL_CHUNK]
+        self.fill_position += len(chunk)
+        stored = self.store.get_many(chunk)
+        self.generator.request([path for path in chunk if path not in stored])
+
+    def _poll(self) -> None:
+        """保存生成完成的縮略圖，可見的圖片完成時重繪"""
+        self.polling = False
+        if not self.is_open():
+            return
+        records = self.generator.collect()
+        if records and self.store is not None:
+            self.store.put_many(records)
+            paths = self.image_paths()
+            start = self.top_row * self.columns
+            visible = set(paths[start:start + self.visible_rows * self.columns])
+            redraw = False
+            for path, _, _, data in records:
+                if path in visible:
+                    self._photo(path, data)
+                    redraw = True
+            if redraw:
+                self.render()
+                return
+        self._fill_background()
+        self._update_status()
+        if not self.generator.is_idle() or self.fill_position < len(self.image_paths()):
+            self._start_polling()
+
+    def on_click(self, event: tk.Event) -> None:
+        """在主窗口中顯示被點擊的圖片"""
+        column = event.x // self.cell_size
+        if column >= self.columns:
+            return
+        index = (self.top_row + event.y // self.cell_size) * self.columns + column
+        paths = self.image_paths()
+        if index < len(paths):
+            image_index = self.handler.find_index(paths[index])
+            if image_index is not None:
+                self.viewer.show_image(image_index)
+                self.render()
+
+    def is_open(self) -> bool:
+        """窗口是否仍然存在"""
+        try:
+            return bool(self.window.winfo_exists())
+        except tk.TclError:
+            return False
+
+    def close(self) -> None:
+        """關閉窗口並停止生成縮略圖"""
+        self.generator.shutdown()
+        self.photos.clear()
+        if self.is_open():
+            self.window.destroy()
@@ -1,6 +1,290 @@
-from typing import Callable, Optional
+from typing import Callable, Iterable, List, Optional, Tuple
+import bisect
 import tkinter as tk
+from tkinter import font as tkfont
 from tkinter import ttk
+from utils.prompt_list import PromptListModel
+
+
+class VirtualListbox:
+    """
+    只渲染可見行的列表框
+
+    所有項目保存在 Python 端的 PromptListModel 中（列表的唯一真實狀態），
+    底層的 tk.Listbox 只放當前視窗內的幾十行，滾動、增刪與篩選都只需要重新填入
+    可見的行（一次 Tcl 調用），與列表總長度無關。
+
+    提供 tk.Listbox 常用方法的相容介面（insert、delete、get、size、curselection、
+    see、bind），索引一律指向完整列表而非可見行；模型不含重複項目，
+    插入已存在的項目會被忽略。
+    """
+
+    def __init__(self, parent, scrollbar: ttk.Scrollbar, **options) -> None:
+        """
+        初始化列表框
+
+        Args:
+            parent: 父容器
+            scrollbar (ttk.Scrollbar): 由本列表控制的垂直滾動條
+            **options: 傳給 tk.Listbox 的其他選項
+        """
+        self.model = PromptListModel()
+        self.filter_text = ''
+        # 篩選時可見項目在完整列表中的索引，None 表示需要重新計算
+        self._view: Optional[List[int]] = None
+        self.offset = 0
+        self.selected: Optional[int] = None
+
+        self.scrollbar = scrollbar
+        self.widget = tk.Listbox(parent, **options)
+        self.visible_rows = int(self.widget.cget('height'))
+        self.scrollbar.config(command=self.yview)
+
+        self.widget.bind('<Configure>', self._on_configure)
+        self.widget.bind('<<ListboxSelect>>', self._on_select)
+        self.widget.bind('<MouseWheel>', self._on_mousewheel)
+        self.widget.bind('<Button-4>', lambda e: self._scroll_by(-3))
+        self.widget.bind('<Button-5>', lambda e: self._scroll_by(3))
+        self.widget.bind('<Up>', lambda e: self._move_selection(-1))
+        self.widget.bind('<Down>', lambda e: self._move_selection(1))
+
+    # ---- tk.Listbox 相容介面 ----
+
+    def grid(self, **kwargs) -> None:
+        self.widget.grid(**kwargs)
+
+    def bind(self, sequence: str, func: Callable, add: Optional[str] = None):
+        return self.widget.bind(sequence, func, add)
+
+    def update(self) -> None:
+        self.widget.update()
+
+    def size(self) -> int:
+        return len(self.model)
+
+    def __contains__(self, item: object) -> bool:
+        return item in self.model
+
+    def items(self) -> List[str]:
+        """返回所有項目（不受篩選影響）"""
+        return self.model.items()
+
+    def _index(self, index, default: int) -> int:
+        """將 tk.END 或整數索引轉換為列表索引"""
+        if index == tk.END:
+            return default
+        return int(index)
+
+    def get(self, first, last=None):
+        """
+        獲取項目
+
+        Args:
+            first: 起始索引
+            last: 結束索引（包含），tk.END 表示到最後；省略時只返回 first 一項
+
+        Returns:
+            單一項目，或項目的元組
+        """
+        if last is None:
+            return self.model[self._index(first, len(self.model) - 1)]
+        return tuple(self.model[self._index(first, 0):self._index(last, len(self.model) - 1) + 1])
+
+    def insert(self, index, *items: str) -> None:
+        """在索引處插入一個或多個項目（已存在的項目會被略過）"""
+        position = self._index(index, len(self.model))
+        inserted = 0
+        for item in items:
+            if self.model.insert(position + inserted, item):
+                inserted += 1
+        if not inserted:
+            return
+        if self.selected is not None and self.selected >= position:
+            self.selected += inserted
+        self._invalidate()
+
+    def add(self, item: str) -> bool:
+        """
+        在末尾添加項目
+
+        Args:
+            item (str): 提示詞
+
+        Returns:
+            bool: 是否添加（已存在時返回 False）
+        """
+        if not self.model.add(item):
+            return False
+        self._invalidate()
+        return True
+
+    def delete(self, first, last=None) -> None:
+        """刪除索引範圍內（包含兩端）的項目"""
+        start = self._index(first, len(self.model) - 1)
+        end = start if last is None else self._index(last, len(self.model) - 1)
+        if end < start:
+            return
+        self.model.delete(start, end)
+        if self.selected is not None:
+            if start <= self.selected <= end:
+                self.selected = None
+            elif self.selected > end:
+                self.selected -= end - start + 1
+        self._invalidate()
+
+    def curselection(self) -> Tuple[int, ...]:
+        """返回選中項目在完整列表中的索引"""
+        rows = self.widget.curselection()
+        if rows:
+            self.selected = self._view_to_item(self.offset + rows[0])
+        return () if self.selected is None else (self.selected,)
+
+    def selection_set(self, index) -> None:
+        self.selected = self._index(index, len(self.model) - 1)
+        self._render()
+
+    def selection_clear(self, first=0, last=None) -> None:
+        self.selected = None
+        self._render()
+
+    def see(self, index) -> None:
+        """滾動使指定項目可見"""
+        item = self._index(index, len(self.model) - 1)
+        view = self._view_indices()
+        position = item if view is None else self._view_position(item)
+        if position is None:
+            return
+        if position < self.offset:
+            self.offset = position
+        elif position >= self.offset + self.visible_rows:
+            self.offset = position - self.visible_rows + 1
+        self._render()
+
+    def yview(self, *args) -> None:
+        """處理滾動條的 moveto / scroll 命令"""
+        if not args:
+            return
+        if args[0] == 'moveto':
+            self.offset = int(float(args[1]) * self._view_length())
+        elif args[0] == 'scroll':
+            amount = int(args[1])
+            step = self.visible_rows - 1 if args[2] == 'pages' else 1
+            self.offset += amount * max(step, 1)
+        self._render()
+
+    # ---- 批次操作與篩選 ----
+
+    def replace(self, items: Iterable[str]) -> None:
+        """以新的項目取代整個列表（只渲染可見行）"""
+        self.model.replace(items)
+        self.selected = None
+        self.offset = 0
+        self._invalidate()
+
+    def set_filter(self, text: str) -> None:
+        """
+        只顯示包含指定文字（不分大小寫）的項目，空字串表示顯示全部
+
+        Args:
+            text (str): 篩選文字
+        """
+        self.filter_text = text.strip().lower()
+        self.offset = 0
+        self._invalidate()
+
+    # ---- 內部實作 ----
+
+    def _invalidate(self) -> None:
+        """項目或篩選條件改變後重新計算篩選結果並重繪"""
+        self._view = None
+        self._render()
+
+    def _view_indices(self) -> Optional[List[int]]:
+        """篩選時返回可見項目的索引，沒有篩選時返回 None"""
+        if not self.filter_text:
+            return None
+        if self._view is None:
+            needle = self.filter_text
+            self._view = [i for i, item in enumerate(self.model)
+                          if needle in item.lower()]
+        return self._view
+
+    def _view_length(self) -> int:
+        view = self._view_indices()
+        return len(self.model) if view is None else len(view)
+
+    def _view_to_item(self, position: int) -> Optional[int]:
+        """將篩選後的位置轉換為完整列表的索引"""
+        view = self._view_indices()
+        if view is None:
+            return position if position < len(self.model) else None
+        return view[position] if position < len(view) else None
+
+    def _view_position(self, item: int) -> Optional[int]:
+        """將完整列表的索引轉換為篩選後的位置，項目被篩掉時返回 None"""
+        view = self._view_indices()
+        if view is None:
+            return item
+        position = bisect.bisect_left(view, item)
+        return position if position < len(view) and view[position] == item else None
+
+    def _render(self) -> None:
+        """以一次調用填入可見的行，並同步選取狀態與滾動條"""
+        view = self._view_indices()
+        total = self._view_length()
+        self.offset = max(0, min(self.offset, total - self.visible_rows))
+        end = min(self.offset + self.visible_rows, total)
+        if view is None:
+            rows = self.model[self.offset:end]
+        else:
+            rows = [self.model[i] for i in view[self.offset:end]]
+
+        self.widget.delete(0, tk.END)
+        if rows:
+            self.widget.insert(0, *rows)
+        if self.selected is not None:
+            position = self._view_position(self.selected)
+            if position is not None and self.offset <= position < end:
+                self.widget.selection_set(position - self.offset)
+
+        if total:
+            self.scrollbar.set(self.offset / total, end / total)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def _on_configure(self, event) -> None:
+        """依據列表框高度計算可見行數"""
+        line_height = tkfont.Font(font=self.widget.cget('font')).metrics('linespace')
+        padding = 2 * (int(self.widget.cget('borderwidth')) +
+                       int(self.widget.cget('highlightthickness')))
+        rows = max(1, (event.height - padding) // max(line_height, 1))
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self._render()
+
+    def _on_select(self, event) -> None:
+        self.curselection()
+
+    def _on_mousewheel(self, event):
+        self._scroll_by(-3 if event.delta > 0 else 3)
+        return 'break'
+
+    def _scroll_by(self, rows: int):
+        self.offset += rows
+        self._render()
+        return 'break'
+
+    def _move_selection(self, step: int):
+        """以方向鍵移動選取，必要時滾動"""
+        total = self._view_length()
+        if not total:
+            return 'break'
+        position = self._view_position(self.selected) if self.selected is not None else None
+        position = 0 if position is None else max(0, min(position + step, total - 1))
+        self.selected = self._view_to_item(position)
+        self.see(self.selected)
+        self.widget.event_generate('<<ListboxSelect>>')
+        return 'break'
 
 
 class ListFrame:
@@ -42,13 +326,21 @@ class ListFrame:
         )
         self.title_label.grid(row=0, column=0, sticky=tk.W)
 
+        # 篩選輸入框：只顯示包含輸入文字的提示詞
+        self.filter_var = tk.StringVar()
+        self.filter_var.trace_add(
+            'write', lambda *args: self.listbox.set_filter(self.filter_var.get()))
+        self.filter_entry = ttk.Entry(
+            self.header_frame, textvariable=self.filter_var, width=12)
+        self.filter_entry.grid(row=0, column=1, sticky=tk.E, padx=(5, 5))
+
         # 刪除按鈕
         self.delete_button = ttk.Button(
             self.header_frame,
             text=self.get_text("delete"),
             command=self.delete_callback
         )
-        self.delete_button.grid(row=0, column=1, sticky=tk.E)
+        self.delete_button.grid(row=0, column=2, sticky=tk.E)
 
     def create_list_area(self):
         """創建列表區域"""
@@ -62,17 +354,16 @@ class ListFrame:
         self.scrollbar = ttk.Scrollbar(self.list_frame)
         self.scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
 
-        # 創建列表框
-        self.listbox = tk.Listbox(
+        # 創建列表框（只渲染可見行，滾動條由列表框控制）
+        self.listbox = VirtualListbox(
             self.list_frame,
-            yscrollcommand=self.scrollbar.set,
+            self.scrollbar,
             selectmode=tk.SINGLE,
             exportselection=False
         )
         self.listbox.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
-
-        # 配置滾動條
-        self.scrollbar.config(command=self.listbox.yview)
+        # 列表內容的唯一真實狀態，保存與序列化都從這裡讀取
+        self.model = self.listbox.model
 
     def grid(self, **kwargs):
         """網格布局方法"""
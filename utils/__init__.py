@@ -3,4 +3,26 @@
 包含：
 - translations.py: 多語言支持
 - image_handler.py: 圖片處理
+- image_utils.py: 圖片提示詞讀取
+- metadata_reader.py: 僅讀取檔頭的 PNG / JPEG 元數據解析（批次模式以 mmap 掃描）
+- prompt_index.py: 資料夾級別的 SQLite 提示詞索引
+- image_prefetcher.py: 背景預取與解碼前後的圖片
+- display_cache.py: 按位元組數限制的顯示圖片 LRU 快取
+- folder_scanner.py: 以 os.scandir 在背景串流掃描資料夾
+- batch_extract.py: 無界面的多進程批次提示詞提取與 txt 寫回
+- file_utils.py: 原子寫入、mmap 讀取等文件工具
+- tag_index.py: 提示詞倒排索引與 AND / OR / NOT 查詢
+- tag_stats.py: 資料夾標籤的出現次數、共現次數與圖片集合統計，保存 txt 時增量更新
+- async_runner.py: 在背景執行緒中運行 asyncio 事件循環
+- suggestion_cache.py: Gemini 建議的內容定址持久化快取
+- upload_payload.py: 上傳給 Gemini 前縮小並重新編碼圖片
+- rate_limiter.py: Gemini 請求的 RPM / TPM 令牌桶限流與退避重試
+- prompt_list.py: 有序且不重複的提示詞列表模型（列表控件的真實狀態）
+- thumbnail_store.py: 縮略圖的 SQLite 持久化儲存與多進程生成
+- folder_watcher.py: 以 inotify（或輪詢）監視資料夾中圖片的新增與刪除
+- write_behind.py: 防抖合併、背景原子寫入的文本文件自動保存
+- tracing.py: 分級日誌與可匯出為 JSON / Chrome trace 的耗時區段追蹤
+- prompt_formats.py: 可擴充的元數據格式登錄表（A1111、ComfyUI、NovelAI、InvokeAI），按特徵檢查的順序識別並解析提示詞
+- generation_params.py: 結構化的生成參數（slots dataclass）與列式表格，可匯出為 CSV / Parquet / Arrow
+- prompt_tokenizer.py: 理解 A1111 權重語法（括號、[a|b]、<lora:...>、BREAK）的提示詞分詞器，提供正規化標籤、權重與層數
 """
@@ -0,0 +1,54 @@
+from typing import TYPE_CHECKING, Any, Coroutine, Optional
+import concurrent.futures
+import threading
+
+if TYPE_CHECKING:
+    import asyncio
+
+
+class AsyncRunner:
+    """
+    在背景執行緒中運行 asyncio 事件循環
+
+    Tk 的主循環不能被 await 阻塞，界面代碼以 submit() 提交協程，
+    得到 concurrent.futures.Future 後以 after() 輪詢或從佇列取回結果。
+    asyncio 在第一次提交時才載入，不影響程式啟動時間。
+    """
+
+    def __init__(self) -> None:
+        self.loop: Optional['asyncio.AbstractEventLoop'] = None
+        self.thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self) -> 'asyncio.AbstractEventLoop':
+        """首次使用時啟動事件循環執行緒"""
+        import asyncio
+        with self._lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                self.thread = threading.Thread(
+                    target=self.loop.run_forever, name='asyncio', daemon=True)
+                self.thread.start()
+            return self.loop
+
+    def submit(self, coro: Coroutine[Any, Any, Any]) -> concurrent.futures.Future:
+        """
+        在背景事件循環中執行協程
+
+        Args:
+            coro (Coroutine): 要執行的協程
+
+        Returns:
+            concurrent.futures.Future: 可在其他執行緒中查詢的結果
+        """
+        import asyncio
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_started())
+
+    def shutdown(self) -> None:
+        """停止事件循環"""
+        with self._lock:
+            if self.loop is not None:
+                self.loop.call_soon_threadsafe(self.loop.stop)
+                self.thread.join(timeout=1)
+                self.loop = None
+                self.thread = None
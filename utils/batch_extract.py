@@ -0,0 +1,346 @@
+"""
+無界面的批次提示詞處理
+
+遍歷整個資料夾樹，以多進程並行讀取圖片元數據與同名 txt 文件的提示詞
+（兩者都以 mmap 讀取，見 utils.metadata_reader）：
+- extract：結果以 JSONL 或 CSV 串流輸出
+- write-sidecars：將合併後的提示詞以原子方式寫回同名 txt 文件
+- params：完整的生成參數（反向提示詞、種子、採樣器、LoRA 等）累積為列式表格，
+  匯出為 CSV、Parquet 或 Arrow
+三者都會回報每秒處理的檔案數。
+"""
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+from utils.file_utils import atomic_write_text, read_text_if_exists
+from utils.folder_scanner import is_image_file
+from utils.generation_params import (
+    TABLE_FORMATS, GenerationParams, GenerationTable, extract_generation_params,
+)
+from utils.image_utils import (
+    get_image_prompts, get_txt_path, merge_prompts, read_image_info, read_txt_prompts,
+)
+from utils.tracing import get_logger
+
+logger = get_logger(__name__)
+
+
+OUTPUT_FORMATS = ('jsonl', 'csv')
+CSV_FIELDS = ['path', 'image_prompts', 'txt_prompts', 'prompts']
+
+# write_sidecar 的結果狀態
+SIDECAR_WRITTEN = 'written'
+SIDECAR_UNCHANGED = 'unchanged'
+SIDECAR_EMPTY = 'empty'
+SIDECAR_ERROR = 'error'
+
+
+def iter_image_paths(root: str, recursive: bool = True) -> Iterator[str]:
+    """
+    遍歷資料夾（樹）中的圖片，同一資料夾內按文件名排序
+
+    Args:
+        root (str): 根資料夾
+        recursive (bool): 是否遞迴進入子資料夾
+
+    Yields:
+        str: 圖片路徑
+    """
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for file in sorted(filenames):
+            if is_image_file(file):
+                yield os.path.join(dirpath, file)
+        if not recursive:
+            break
+
+
+def extract_prompts(image_path: str) -> Dict[str, Any]:
+    """
+    讀取單張圖片的提示詞，並與同名 txt 文件合併（在工作進程中執行）
+
+    Args:
+        image_path (str): 圖片路徑
+
+    Returns:
+        Dict[str, Any]: 包含 path、image_prompts、txt_prompts、prompts 的記錄，
+        txt 文件不存在時 txt_prompts 為 None
+    """
+    image_prompts = get_image_prompts(image_path, use_mmap=True)
+    txt_prompts: Optional[List[str]] = None
+    txt_path = get_txt_path(image_path)
+    try:
+        txt_prompts = read_txt_prompts(txt_path, use_mmap=True)
+    except FileNotFoundError:
+        pass
+    except (OSError, UnicodeDecodeError) as e:
+        logger.warning("無法讀取文本文件 %s：%s", txt_path, e)
+    return {
+        'path': image_path,
+        'image_prompts': image_prompts,
+        'txt_prompts': txt_prompts,
+        'prompts': merge_prompts(image_prompts, txt_prompts or []),
+    }
+
+
+def write_sidecar(image_path: str) -> str:
+    """
+    將圖片元數據與同名 txt 文件的提示詞合併後寫回 txt（在工作進程中執行）
+
+    合併規則與界面中按下保存時相同；內容沒有變化時不會寫入。
+
+    Args:
+        image_path (str): 圖片路徑
+
+    Returns:
+        str: SIDECAR_WRITTEN、SIDECAR_UNCHANGED、SIDECAR_EMPTY 或 SIDECAR_ERROR
+    """
+    txt_path = get_txt_path(image_path)
+    try:
+        record = extract_prompts(image_path)
+        if not record['prompts']:
+            return SIDECAR_EMPTY
+        content = ','.join(record['prompts'])
+        if read_text_if_exists(txt_path) == content:
+            return SIDECAR_UNCHANGED
+        atomic_write_text(txt_path, content)
+        return SIDECAR_WRITTEN
+    except (OSError, UnicodeDecodeError) as e:
+        logger.error("無法寫入文本文件 %s：%s", txt_path, e)
+        return SIDECAR_ERROR
+
+
+def extract_params(image_path: str) -> Tuple[str, GenerationParams]:
+    """
+    讀取單張圖片的生成參數（在工作進程中執行）
+
+    Args:
+        image_path (str): 圖片路徑
+
+    Returns:
+        Tuple[str, GenerationParams]: （圖片路徑, 生成參數），無法讀取時為空的參數
+    """
+    try:
+        return image_path, extract_generation_params(read_image_info(image_path, use_mmap=True))
+    except Exception as e:
+        logger.warning("讀取生成參數時發生錯誤 %s：%s", image_path, e)
+        return image_path, GenerationParams()
+
+
+def iter_results(paths: Iterable[str], func, workers: int,
+                 chunksize: int) -> Iterator[Any]:
+    """
+    以進程池並行執行 func，結果按完成順序串流返回
+
+    Args:
+        paths (Iterable[str]): 輸入路徑
+        func: 在工作進程中執行的頂層函數
+        workers (int): 工作進程數，1 表示在當前進程中執行
+        chunksize (int): 每次分派給工作進程的路徑數
+
+    Yields:
+        Any: func 的返回值
+    """
+    if workers <= 1:
+        yield from map(func, paths)
+        return
+    with multiprocessing.Pool(processes=workers) as pool:
+        yield from pool.imap_unordered(func, paths, chunksize=chunksize)
+
+
+class RecordWriter:
+    """將提取結果寫成 JSONL 或 CSV"""
+
+    def __init__(self, stream: TextIO, fmt: str) -> None:
+        """
+        初始化輸出器
+
+        Args:
+            stream (TextIO): 輸出流
+            fmt (str): 'jsonl' 或 'csv'
+        """
+        self.stream = stream
+        self.fmt = fmt
+        if fmt == 'csv':
+            self.csv_writer = csv.DictWriter(stream, fieldnames=CSV_FIELDS)
+            self.csv_writer.writeheader()
+
+    def write(self, record: Dict[str, Any]) -> None:
+        """寫入一條記錄"""
+        if self.fmt == 'jsonl':
+            self.stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+        else:
+            self.csv_writer.writerow({
+                key: value if isinstance(value, str) else
+                ('' if value is None else ', '.join(value))
+                for key, value in record.items()
+            })
+
+
+class ThroughputReporter:
+    """定期向 stderr 回報處理速度（檔案/秒）"""
+
+    def __init__(self, label: str, interval: float = 5.0,
+                 stream: TextIO = sys.stderr) -> None:
+        self.label = label
+        self.interval = interval
+        self.stream = stream
+        self.count = 0
+        self.start = time.perf_counter()
+        self._last_report = self.start
+
+    def tick(self, n: int = 1) -> None:
+        """記錄已處理的檔案數，間隔到達時輸出進度"""
+        self.count += n
+        now = time.perf_counter()
+        if now - self._last_report >= self.interval:
+            self._last_report = now
+            self.report(final=False)
+
+    def rate(self) -> float:
+        """目前的平均處理速度"""
+        elapsed = time.perf_counter() - self.start
+        return self.count / elapsed if elapsed > 0 else 0.0
+
+    def report(self, final: bool = True) -> None:
+        """輸出處理速度"""
+        elapsed = time.perf_counter() - self.start
+        prefix = "完成" if final else "進度"
+        print(f"{prefix}：{self.label} {self.count} 個檔案，"
+              f"{elapsed:.1f} 秒，{self.rate():.1f} 檔案/秒",
+              file=self.stream, flush=True)
+
+
+def run_extract(root: str, output: Optional[str] = None, fmt: str = 'jsonl',
+                workers: Optional[int] = None, chunksize: int = 64,
+                recursive: bool = True) -> int:
+    """
+    批次提取資料夾樹中所有圖片的提示詞
+
+    Args:
+        root (str): 根資料夾
+        output (Optional[str]): 輸出文件路徑，None 或 '-' 表示標準輸出
+        fmt (str): 'jsonl' 或 'csv'
+        workers (Optional[int]): 工作進程數，預設為 CPU 核心數
+        chunksize (int): 每次分派給工作進程的路徑數
+        recursive (bool): 是否遞迴進入子資料夾
+
+    Returns:
+        int: 處理的圖片數
+    """
+    workers = workers or os.cpu_count() or 1
+    reporter = ThroughputReporter("提取")
+
+    stream = sys.stdout if output in (None, '-') else open(
+        output, 'w', encoding='utf-8', newline='')
+    try:
+        writer = RecordWriter(stream, fmt)
+        paths = iter_image_paths(root, recursive)
+        for record in iter_results(paths, extract_prompts, workers, chunksize):
+            writer.write(record)
+            reporter.tick()
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+
+    reporter.report()
+    return reporter.count
+
+
+def run_write_sidecars(root: str, workers: Optional[int] = None,
+                       chunksize: int = 64, recursive: bool = True) -> Dict[str, int]:
+    """
+    批次將資料夾樹中每張圖片的合併提示詞寫入同名 txt 文件
+
+    Args:
+        root (str): 根資料夾
+        workers (Optional[int]): 工作進程數，預設為 CPU 核心數
+        chunksize (int): 每次分派給工作進程的路徑數
+        recursive (bool): 是否遞迴進入子資料夾
+
+    Returns:
+        Dict[str, int]: 各狀態的檔案數
+    """
+    workers = workers or os.cpu_count() or 1
+    reporter = ThroughputReporter("寫入")
+    counts = {SIDECAR_WRITTEN: 0, SIDECAR_UNCHANGED: 0,
+              SIDECAR_EMPTY: 0, SIDECAR_ERROR: 0}
+
+    paths = iter_image_paths(root, recursive)
+    for status in iter_results(paths, write_sidecar, workers, chunksize):
+        counts[status] += 1
+        reporter.tick()
+
+    reporter.report()
+    print(f"已寫入 {counts[SIDECAR_WRITTEN]}，未變更 {counts[SIDECAR_UNCHANGED]}，"
+          f"無提示詞 {counts[SIDECAR_EMPTY]}，失敗 {counts[SIDECAR_ERROR]}",
+          file=sys.stderr)
+    return counts
+
+
+def run_export_params(root: str, output: str, fmt: str = 'csv',
+                      workers: Optional[int] = None, chunksize: int = 64,
+                      recursive: bool = True) -> GenerationTable:
+    """
+    批次讀取資料夾樹中所有圖片的生成參數，並匯出為列式表格
+
+    Args:
+        root (str): 根資料夾
+        output (str): 輸出文件路徑
+        fmt (str): 'csv'、'parquet' 或 'arrow'，後兩者需要 pyarrow
+        workers (Optional[int]): 工作進程數，預設為 CPU 核心數
+        chunksize (int): 每次分派給工作進程的路徑數
+        recursive (bool): 是否遞迴進入子資料夾
+
+    Returns:
+        GenerationTable: 累積的表格
+    """
+    if fmt != 'csv':
+        # 在掃描前確認可選依賴，避免處理完整個資料夾樹後才失敗
+        import pyarrow  # noqa: F401
+
+    workers = workers or os.cpu_count() or 1
+    reporter = ThroughputReporter("讀取參數")
+    table = GenerationTable()
+
+    paths = iter_image_paths(root, recursive)
+    for path, params in iter_results(paths, extract_params, workers, chunksize):
+        table.append(path, params)
+        reporter.tick()
+
+    reporter.report()
+    table.export(output, fmt)
+    print(f"已匯出 {len(table)} 行到 {output}", file=sys.stderr)
+    return table
+
+
+def add_common_arguments(parser) -> None:
+    """添加批次命令共用的參數"""
+    parser.add_argument('folder', help="要掃描的根資料夾")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="工作進程數（預設為 CPU 核心數）")
+    parser.add_argument('--chunksize', type=int, default=64,
+                        help="每次分派給工作進程的檔案數")
+    parser.add_argument('--no-recursive', action='store_true',
+                        help="不進入子資料夾")
+
+
+def add_extract_arguments(parser) -> None:
+    """為 extract 子命令添加參數"""
+    add_common_arguments(parser)
+    parser.add_argument('-o', '--output', default='-',
+                        help="輸出文件路徑（預設為標準輸出）")
+    parser.add_argument('-f', '--format', choices=OUTPUT_FORMATS, default='jsonl',
+                        help="輸出格式")
+
+
+def add_params_arguments(parser) -> None:
+    """為 params 子命令添加參數"""
+    add_common_arguments(parser)
+    parser.add_argument('-o', '--output', required=True, help="輸出文件路徑")
+    parser.add_argument('-f', '--format', choices=TABLE_FORMATS, default='csv',
+                        help="輸出格式（parquet / arrow 需要安裝 pyarrow）")
@@ -0,0 +1,113 @@
+from typing import Dict, Hashable, Optional, Tuple
+from collections import OrderedDict
+import os
+import threading
+from PIL import Image
+
+
+class DisplayImageCache:
+    """
+    按位元組數限制容量的顯示圖片 LRU 快取
+
+    保存已合成到白色背景上的顯示圖片，鍵為（路徑, mtime, 顯示寬度, 顯示高度），
+    超過容量時淘汰最久未使用的圖片，並記錄命中、未命中與淘汰次數。
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024) -> None:
+        """
+        初始化快取
+
+        Args:
+            max_bytes (int): 快取中所有圖片像素數據的總位元組上限
+        """
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: 'OrderedDict[Hashable, Tuple[Image.Image, int]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(image_path: str, width: int, height: int) -> Optional[Tuple[str, int, int, int]]:
+        """
+        生成快取鍵，檔案被修改後 mtime 改變，舊的快取自然失效
+
+        Args:
+            image_path (str): 圖片路徑
+            width (int): 顯示寬度
+            height (int): 顯示高度
+
+        Returns:
+            Optional[Tuple[str, int, int, int]]: 快取鍵，檔案不存在時返回 None
+        """
+        try:
+            mtime_ns = os.stat(image_path).st_mtime_ns
+        except OSError:
+            return None
+        return (image_path, mtime_ns, width, height)
+
+    @staticmethod
+    def image_size(image: Image.Image) -> int:
+        """估算圖片像素數據佔用的位元組數"""
+        return image.width * image.height * len(image.getbands())
+
+    def get(self, key: Hashable, record_miss: bool = True) -> Optional[Image.Image]:
+        """
+        查詢快取
+
+        Args:
+            key (Hashable): 快取鍵
+            record_miss (bool): 未命中時是否計入未命中次數（僅試探時傳入 False）
+
+        Returns:
+            Optional[Image.Image]: 快取的顯示圖片，未命中時返回 None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if record_miss:
+                    self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, image: Image.Image) -> None:
+        """
+        寫入快取，超過容量時淘汰最久未使用的圖片
+
+        Args:
+            key (Hashable): 快取鍵
+            image (Image.Image): 顯示圖片
+        """
+        size = self.image_size(image)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+            self._entries[key] = (image, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        """返回命中、未命中、淘汰次數以及目前的條目數與位元組數"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+            }
+
+    def clear(self) -> None:
+        """清空快取（計數器保留）"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
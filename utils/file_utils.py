@@ -0,0 +1,93 @@
+from typing import Optional
+import mmap
+import os
+import tempfile
+
+
+def _current_umask() -> int:
+    """讀取當前進程的 umask（只能以設置再還原的方式取得）"""
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# 新文件的預設權限，與直接 open() 建立的文件一致
+_DEFAULT_FILE_MODE = 0o666 & ~_current_umask()
+
+
+def atomic_write_text(path: str, content: str, encoding: str = 'utf-8') -> None:
+    """
+    以原子方式寫入文本文件：先寫入同目錄的臨時文件，再以 os.replace 取代目標
+
+    寫入過程中崩潰或斷電時，目標文件要麼是舊內容，要麼是完整的新內容。
+
+    Args:
+        path (str): 目標文件路徑
+        content (str): 文件內容
+        encoding (str): 文字編碼
+    """
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(
+        prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=folder)
+    try:
+        with os.fdopen(fd, 'w', encoding=encoding, newline='') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp 建立的文件權限為 0600，改為與原文件（或新建文件）一致
+        try:
+            mode = os.stat(path).st_mode & 0o7777
+        except FileNotFoundError:
+            mode = _DEFAULT_FILE_MODE
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def read_text_if_exists(path: str, encoding: str = 'utf-8') -> Optional[str]:
+    """
+    讀取文本文件，文件不存在時返回 None
+
+    Args:
+        path (str): 文件路徑
+        encoding (str): 文字編碼
+
+    Returns:
+        Optional[str]: 文件內容
+    """
+    try:
+        with open(path, 'r', encoding=encoding, newline='') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def read_text_mapped(path: str, encoding: str = 'utf-8') -> str:
+    """
+    以 mmap 讀取整個文本文件並解碼（批次掃描時使用）
+
+    直接從映射的記憶體解碼為字符串，不經過緩衝讀取與中間的 bytes 複本。
+
+    Args:
+        path (str): 文件路徑
+        encoding (str): 文字編碼
+
+    Returns:
+        str: 文件內容（不轉換換行符）
+
+    Raises:
+        FileNotFoundError: 文件不存在
+    """
+    with open(path, 'rb', buffering=0) as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # 空文件無法映射
+            return ''
+    with mapped:
+        return str(mapped, encoding)
@@ -0,0 +1,112 @@
+from typing import Iterator, List, Optional
+import os
+import queue
+import threading
+from utils.tracing import get_logger
+
+logger = get_logger(__name__)
+
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp')
+
+
+def is_image_file(file_name: str) -> bool:
+    """判斷檔名是否為支援的圖片格式"""
+    return file_name.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def iter_image_batches(folder_path: str, first_batch: int = 64,
+                       max_batch: int = 4096) -> Iterator[List[str]]:
+    """
+    以 os.scandir 串流掃描資料夾，分批產生圖片路徑
+
+    DirEntry.is_file() 使用目錄項自帶的類型資訊，大多數平台上不需要額外的 stat 呼叫。
+    第一批很小以便盡快顯示第一張圖片，之後每批加倍以減少界面更新次數。
+
+    Args:
+        folder_path (str): 資料夾路徑
+        first_batch (int): 第一批的大小
+        max_batch (int): 每批的最大大小
+
+    Yields:
+        List[str]: 一批圖片路徑（未排序）
+    """
+    batch: List[str] = []
+    batch_size = first_batch
+    with os.scandir(folder_path) as entries:
+        for entry in entries:
+            if not is_image_file(entry.name):
+                continue
+            try:
+                if not entry.is_file():
+                    continue
+            except OSError:
+                continue
+            batch.append(entry.path)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+                batch_size = min(batch_size * 2, max_batch)
+    if batch:
+        yield batch
+
+
+class FolderScanner:
+    """
+    在背景執行緒中掃描資料夾，界面執行緒以 drain() 不阻塞地取得已找到的圖片
+    """
+
+    def __init__(self, folder_path: str) -> None:
+        """
+        初始化掃描器
+
+        Args:
+            folder_path (str): 要掃描的資料夾路徑
+        """
+        self.folder_path = folder_path
+        self.done = False
+        self.error: Optional[Exception] = None
+        self._batches: 'queue.Queue[List[str]]' = queue.Queue()
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name='folder-scanner', daemon=True)
+
+    def start(self) -> 'FolderScanner':
+        """開始背景掃描"""
+        self._thread.start()
+        return self
+
+    def cancel(self) -> None:
+        """取消掃描（例如用戶選擇了另一個資料夾）"""
+        self._cancelled.set()
+
+    def _run(self) -> None:
+        """背景執行緒：逐批放入佇列"""
+        try:
+            for batch in iter_image_batches(self.folder_path):
+                if self._cancelled.is_set():
+                    break
+                self._batches.put(batch)
+        except OSError as e:
+            logger.error("掃描資料夾時發生錯誤：%s", e)
+            self.error = e
+        finally:
+            self.done = True
+
+    def drain(self) -> List[List[str]]:
+        """
+        取出目前已找到的所有批次（不阻塞）
+
+        Returns:
+            List[List[str]]: 尚未取出的批次
+        """
+        batches = []
+        while True:
+            try:
+                batches.append(self._batches.get_nowait())
+            except queue.Empty:
+                return batches
+
+    def is_finished(self) -> bool:
+        """掃描已結束且所有批次都已取出"""
+        return self.done and self._batches.empty()
@@ -0,0 +1,255 @@
+"""
+監視資料夾中圖片的新增與刪除
+
+Linux 上以 ctypes 直接調用 inotify，由核心推送事件，不需要重新掃描資料夾；
+其他平台（或 inotify 不可用時）退回輪詢：只在資料夾的 mtime 改變時才重新列出目錄。
+重新命名以「刪除舊路徑 + 新增新路徑」兩個事件表示。
+"""
+from typing import Dict, List, NamedTuple, Optional, Set
+from abc import ABC, abstractmethod
+import ctypes
+import ctypes.util
+import os
+import queue
+import select
+import struct
+import sys
+import threading
+from utils.folder_scanner import is_image_file
+from utils.tracing import get_logger
+
+logger = get_logger(__name__)
+
+
+# 事件類型
+ADDED = 'added'
+REMOVED = 'removed'
+# 事件遺失（例如 inotify 佇列溢出），需要重新掃描整個資料夾
+RESCAN = 'rescan'
+
+# inotify 常量（<sys/inotify.h>）
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+_INOTIFY_EVENT = struct.Struct('iIII')
+_WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+               | IN_DELETE_SELF | IN_MOVE_SELF)
+
+
+class FolderEvent(NamedTuple):
+    """資料夾變動事件"""
+    kind: str
+    path: str
+
+
+class FolderWatcher(ABC):
+    """
+    監視器的共同部分：背景執行緒產生事件，界面執行緒以 drain() 不阻塞地取出
+    """
+
+    def __init__(self, folder_path: str) -> None:
+        """
+        初始化監視器
+
+        Args:
+            folder_path (str): 要監視的資料夾路徑
+        """
+        self.folder_path = folder_path
+        self._events: 'queue.Queue[FolderEvent]' = queue.Queue()
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name='folder-watcher', daemon=True)
+
+    def start(self) -> 'FolderWatcher':
+        """開始監視"""
+        self._thread.start()
+        return self
+
+    def cancel(self) -> None:
+        """停止監視（例如用戶選擇了另一個資料夾）"""
+        self._cancelled.set()
+
+    def _emit(self, kind: str, name: str = '') -> None:
+        self._events.put(FolderEvent(kind, os.path.join(self.folder_path, name)))
+
+    @abstractmethod
+    def _run(self) -> None:
+        """在背景執行緒中監視資料夾並以 _emit() 產生事件，直到 cancel() 被調用"""
+
+    def drain(self) -> List[FolderEvent]:
+        """
+        取出目前累積的所有事件（不阻塞）
+
+        Returns:
+            List[FolderEvent]: 按發生順序排列的事件
+        """
+        events = []
+        while True:
+            try:
+                events.append(self._events.get_nowait())
+            except queue.Empty:
+                return events
+
+
+class InotifyWatcher(FolderWatcher):
+    """以 Linux inotify 監視資料夾，只在檔案寫入完成（close_write）或移入時報告新增"""
+
+    def __init__(self, folder_path: str, timeout: float = 0.5) -> None:
+        """
+        初始化監視器
+
+        Args:
+            folder_path (str): 要監視的資料夾路徑
+            timeout (float): 等待事件的逾時秒數（決定 cancel() 的反應時間）
+
+        Raises:
+            OSError: 系統不支援 inotify 或無法監視該資料夾
+        """
+        super().__init__(folder_path)
+        self.timeout = timeout
+        libc_name = ctypes.util.find_library('c')
+        if not sys.platform.startswith('linux') or libc_name is None:
+            raise OSError("inotify 只在 Linux 上可用")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失敗")
+        wd = libc.inotify_add_watch(self.fd, os.fsencode(folder_path), _WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"無法監視資料夾 {folder_path}")
+
+    def _run(self) -> None:
+        """背景執行緒：讀取並解析 inotify 事件"""
+        try:
+            while not self._cancelled.is_set():
+                readable, _, _ = select.select([self.fd], [], [], self.timeout)
+                if not readable:
+                    continue
+                try:
+                    data = os.read(self.fd, 64 * 1024)
+                except BlockingIOError:
+                    continue
+                if self._dispatch(data):
+                    break
+        except OSError as e:
+            logger.error("監視資料夾時發生錯誤：%s", e)
+        finally:
+            os.close(self.fd)
+
+    def _dispatch(self, data: bytes) -> bool:
+        """
+        解析一次讀取到的事件
+
+        Returns:
+            bool: 資料夾本身被刪除或移走，應停止監視時返回 True
+        """
+        offset = 0
+        while offset < len(data):
+            _, mask, _, length = _INOTIFY_EVENT.unpack_from(data, offset)
+            offset += _INOTIFY_EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                self._emit(RESCAN)
+            elif mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                return True
+            elif mask & IN_ISDIR or not is_image_file(name):
+                continue
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                self._emit(ADDED, name)
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                self._emit(REMOVED, name)
+        return False
+
+
+class PollingWatcher(FolderWatcher):
+    """
+    以輪詢監視資料夾
+
+    資料夾的 mtime 在檔案新增、刪除或重新命名時才會改變，未改變時不列出目錄。
+    新檔案的大小連續兩次輪詢都相同才報告新增，避免讀到仍在寫入的圖片。
+    """
+
+    def __init__(self, folder_path: str, interval: float = 1.0) -> None:
+        """
+        初始化監視器
+
+        Args:
+            folder_path (str): 要監視的資料夾路徑
+            interval (float): 輪詢間隔秒數
+        """
+        super().__init__(folder_path)
+        self.interval = interval
+        self.known: Set[str] = set()
+        # 尚在寫入中的新檔案：檔名 -> 上次看到的大小
+        self.unstable: Dict[str, int] = {}
+        self.folder_mtime_ns: Optional[int] = None
+
+    def _list_images(self) -> Set[str]:
+        with os.scandir(self.folder_path) as entries:
+            return {entry.name for entry in entries if is_image_file(entry.name)}
+
+    def _run(self) -> None:
+        """背景執行緒：定期比較資料夾內容"""
+        try:
+            self.folder_mtime_ns = os.stat(self.folder_path).st_mtime_ns
+            self.known = self._list_images()
+            while not self._cancelled.wait(self.interval):
+                self.poll()
+        except OSError as e:
+            logger.error("監視資料夾時發生錯誤：%s", e)
+
+    def poll(self) -> None:
+        """比較一次資料夾內容並產生事件"""
+        mtime_ns = os.stat(self.folder_path).st_mtime_ns
+        if mtime_ns != self.folder_mtime_ns:
+            self.folder_mtime_ns = mtime_ns
+            names = self._list_images()
+            for name in sorted(self.known - names):
+                self._emit(REMOVED, name)
+            for name in names - self.known - set(self.unstable):
+                self.unstable[name] = -1
+            self.known &= names
+
+        for name, last_size in list(self.unstable.items()):
+            try:
+                size = os.stat(os.path.join(self.folder_path, name)).st_size
+            except OSError:
+                del self.unstable[name]
+                continue
+            if size == last_size:
+                del self.unstable[name]
+                self.known.add(name)
+                self._emit(ADDED, name)
+            else:
+                self.unstable[name] = size
+
+
+def create_folder_watcher(folder_path: str, poll_interval: float = 1.0) -> FolderWatcher:
+    """
+    建立並啟動資料夾監視器：優先使用 inotify，不可用時退回輪詢
+
+    Args:
+        folder_path (str): 要監視的資料夾路徑
+        poll_interval (float): 輪詢模式的間隔秒數
+
+    Returns:
+        FolderWatcher: 已啟動的監視器
+    """
+    try:
+        watcher: FolderWatcher = InotifyWatcher(folder_path)
+    except (OSError, AttributeError):
+        # AttributeError：libc 沒有 inotify 函數
+        watcher = PollingWatcher(folder_path, poll_interval)
+    return watcher.start()
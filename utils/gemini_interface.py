@@ -1,9 +1,16 @@
-from google.genai import types
 from PIL import Image
-from google.genai.types import Tool, GenerateContentConfig, GoogleSearch
+import asyncio
+import itertools
 import os
-from google import genai
-from typing import List, Optional, Dict, Any
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+from utils.suggestion_cache import SuggestionCache, hash_image, hash_image_file, make_cache_key
+from utils.rate_limiter import RateLimiter, RetryPolicy, estimate_tokens, is_retryable, status_code
+from utils.upload_payload import (UploadPayload, UploadPayloadCache, UploadSettings,
+                                  encode_for_upload, open_for_upload)
+from utils.tracing import get_logger, span
+
+logger = get_logger(__name__)
 
 
 class GeminiInterface:
@@ -11,23 +18,109 @@ class GeminiInterface:
     Gemini AI 介面類，用於與 Google 的 Gemini AI 模型進行互動。
     主要功能包括：
     1. 初始化 Gemini API 客戶端
-    2. 同步調用 Gemini API 生成內容
+    2. 同步或非同步調用 Gemini API 生成內容
     3. 基於圖片和現有提示詞生成新的提示詞建議
+    4. 以有上限的並發數批次為多張圖片生成建議
+    5. 以內容定址快取保存建議，相同請求直接返回快取結果
+    6. 上傳前縮小並重新編碼圖片，編碼結果按圖片快取
+    7. 以令牌桶限制 RPM / TPM，並以指數退避重試限流與暫時性錯誤
     """
 
-    def __init__(self, api_key: str) -> None:
+    def __init__(self, api_key: str, client: Any = None, max_concurrency: int = 4,
+                 cache: Optional[SuggestionCache] = None,
+                 upload_settings: Optional[UploadSettings] = UploadSettings(),
+                 rate_limiter: Optional[RateLimiter] = None,
+                 retry_policy: RetryPolicy = RetryPolicy()) -> None:
         """
         初始化 GeminiInterface 類
 
         Args:
             api_key (str): Gemini API 密鑰，用於認證 API 請求
+            client (Any): 自訂的客戶端（測試時傳入替身），預設建立 genai.Client
+            max_concurrency (int): 批次請求時同時進行的最大請求數
+            cache (Optional[SuggestionCache]): 建議快取，None 表示不使用快取
+            upload_settings (Optional[UploadSettings]): 上傳圖片的預處理設定，None 表示上傳原圖
+            rate_limiter (Optional[RateLimiter]): 所有請求共用的限流器，None 表示不限流
+            retry_policy (RetryPolicy): 限流與暫時性錯誤的重試策略
         """
-        self.client = genai.Client(api_key=api_key)
+        if client is None:
+            # google-genai 的依賴很多，只在真正建立客戶端時載入
+            from google import genai
+            client = genai.Client(api_key=api_key)
+        self.client = client
         self.model = "gemini-2.0-flash"  # 使用 Gemini 2.0 Flash 模型
+        self.max_concurrency = max_concurrency
+        self.cache = cache
+        self.upload_settings = upload_settings
+        self.payload_cache = UploadPayloadCache()
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """
+        決定失敗的請求是否重試
+
+        Args:
+            error (Exception): 請求時拋出的錯誤
+            attempt (int): 已失敗的次數減一
+
+        Returns:
+            Optional[float]: 重試前等待的秒數，不應重試時返回 None
+        """
+        if attempt >= self.retry_policy.max_retries or not is_retryable(error):
+            return None
+        delay = self.retry_policy.delay(attempt)
+        if self.rate_limiter is not None and status_code(error) == 429:
+            # 已超出配額，讓排隊中的其他請求也一起等待
+            self.rate_limiter.pause(delay)
+        logger.warning("Gemini API call failed (%s), retrying in %.1fs", error, delay)
+        return delay
+
+    def _record_usage(self, response: Any, estimated_tokens: int) -> None:
+        """以回應中的實際輸入令牌數修正限流器的預約"""
+        usage = getattr(response, 'usage_metadata', None)
+        actual = getattr(usage, 'prompt_token_count', None)
+        if self.rate_limiter is not None and isinstance(actual, int):
+            self.rate_limiter.adjust_tokens(estimated_tokens - actual)
 
     def _gemini_sync(self, model: Any, contents: List[Any], config: Dict[str, Any]) -> Optional[str]:
         """
-        同步調用 Gemini API 生成內容
+        同步調用 Gemini API 生成內容，受限流器控制並在暫時性錯誤時重試
+
+        Args:
+            model (Any): Gemini 模型實例
+            contents (List[Any]): 輸入內容列表，可以包含文字和圖片
+            config (Dict[str, Any]): 生成配置參數
+
+        Returns:
+            Optional[str]: 生成的文字內容，如果發生錯誤則返回 None
+        """
+        tokens = estimate_tokens(contents)
+        for attempt in itertools.count():
+            if self.rate_limiter is not None:
+                time.sleep(self.rate_limiter.reserve(tokens))
+                time.sleep(self.rate_limiter.blocked_for())
+            try:
+                with span('gemini', attempt=attempt):
+                    response = self.client.models.generate_content(model=self.model,
+                                                                   contents=contents,
+                                                                   config=config)
+                break
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+        self._record_usage(response, tokens)
+        try:
+            return response.text
+        except Exception as e:
+            logger.error("Error in Gemini API call: %s", e)
+            return None
+
+    async def _gemini_async(self, model: Any, contents: List[Any], config: Dict[str, Any]) -> Optional[str]:
+        """
+        非同步調用 Gemini API 生成內容（使用 client.aio），受限流器控制並在暫時性錯誤時重試
 
         Args:
             model (Any): Gemini 模型實例
@@ -37,50 +130,288 @@ class GeminiInterface:
         Returns:
             Optional[str]: 生成的文字內容，如果發生錯誤則返回 None
         """
-        response = self.client.models.generate_content(model=self.model,
-                                                       contents=contents,
-                                                       config=config)
+        tokens = estimate_tokens(contents)
+        for attempt in itertools.count():
+            if self.rate_limiter is not None:
+                await asyncio.sleep(self.rate_limiter.reserve(tokens))
+                await asyncio.sleep(self.rate_limiter.blocked_for())
+            try:
+                with span('gemini', attempt=attempt):
+                    response = await self.client.aio.models.generate_content(model=self.model,
+                                                                             contents=contents,
+                                                                             config=config)
+                break
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+        self._record_usage(response, tokens)
         try:
             return response.text
         except Exception as e:
-            print(f"Error in Gemini API call: {e}")
+            logger.error("Error in Gemini API call: %s", e)
             return None
 
-    def get_prompt_suggestions(self, img: Image.Image, temp_prompts: List[str]) -> List[str]:
+    def _build_request(self, temp_prompts: List[str]) -> Tuple[str, Dict[str, Any]]:
+        """
+        準備提示詞與生成參數
+
+        Args:
+            temp_prompts (List[str]): 臨時提示詞列表
+
+        Returns:
+            Tuple[str, Dict[str, Any]]: 提示詞文字與生成配置
+        """
+        # 準備提示詞
+        prompt = f"""請根據以下提示詞生成更多相關的提示詞建議（最多5個）：
+{', '.join(temp_prompts)}
+
+請只返回新的提示詞，每行一個，不要包含任何其他文字。"""
+
+        # 配置生成參數
+        config = {
+            "temperature": 0.7,  # 控制輸出的隨機性
+            "top_p": 0.8,        # 控制輸出的多樣性
+            "top_k": 40,         # 控制每次選擇的範圍
+            "max_output_tokens": 1024,  # 最大輸出長度
+        }
+        return prompt, config
+
+    @staticmethod
+    def _parse_suggestions(response: Optional[str]) -> List[str]:
+        """將模型返回的文字拆分為建議列表，最多返回5個建議"""
+        if not response:
+            return []
+        suggestions = [line.strip()
+                       for line in response.split('\n') if line.strip()]
+        return suggestions[:5]
+
+    def _cache_lookup(self, image_hash: str, temp_prompts: List[str], config: Dict[str, Any],
+                      use_cache: bool) -> Tuple[Optional[str], Optional[List[str]]]:
+        """
+        計算快取鍵並查詢快取
+
+        Returns:
+            Tuple[Optional[str], Optional[List[str]]]: （快取鍵, 命中的建議），
+            未設置快取時鍵為 None；use_cache 為 False 時不查詢，但新結果仍會寫入
+        """
+        if self.cache is None:
+            return None, None
+        key = make_cache_key(image_hash, temp_prompts, self.model, config)
+        return key, self.cache.get(key) if use_cache else None
+
+    def _cache_store(self, key: Optional[str], suggestions: List[str]) -> None:
+        """保存成功取得的建議（空結果可能是錯誤造成的，不保存）"""
+        if key is not None and suggestions:
+            self.cache.put(key, suggestions)
+
+    def _upload_content(self, img: Image.Image, image_hash: Optional[str] = None) -> Any:
+        """
+        將圖片轉為上傳內容：設置了 upload_settings 時縮小並重新編碼，
+        已知圖片雜湊時按圖片快取編碼結果；否則直接傳入圖片
+
+        Args:
+            img (Image.Image): 圖片物件
+            image_hash (Optional[str]): 圖片雜湊，作為編碼結果的快取鍵
+
+        Returns:
+            Any: 傳給 generate_content 的圖片內容
+        """
+        if self.upload_settings is None:
+            return img
+        payload = self._get_cached_payload(image_hash)
+        if payload is None:
+            with span('gemini_upload'):
+                payload = encode_for_upload(img, self.upload_settings)
+            if image_hash is not None:
+                self.payload_cache.put((image_hash, self.upload_settings), payload)
+        return self._payload_part(payload)
+
+    def _get_cached_payload(self, image_hash: Optional[str]) -> Optional[UploadPayload]:
+        """查詢已編碼的上傳內容"""
+        if self.upload_settings is None or image_hash is None:
+            return None
+        return self.payload_cache.get((image_hash, self.upload_settings))
+
+    @staticmethod
+    def _payload_part(payload: UploadPayload) -> Any:
+        """將編碼後的內容包裝為 API 的圖片部分"""
+        from google.genai import types
+        return types.Part.from_bytes(data=payload.data, mime_type=payload.mime_type)
+
+    def get_prompt_suggestions(self, img: Image.Image, temp_prompts: List[str],
+                               use_cache: bool = True) -> List[str]:
         """
         基於當前圖片和臨時提示詞列表生成新的提示詞建議
 
         Args:
             img (Image.Image): 當前圖片物件
             temp_prompts (List[str]): 臨時提示詞列表
+            use_cache (bool): 是否使用快取的結果，False 時重新請求
 
         Returns:
             List[str]: 生成的提示詞建議列表，最多返回5個建議
         """
         try:
-            # 準備提示詞
-            prompt = f"""請根據以下提示詞生成更多相關的提示詞建議（最多5個）：
-{', '.join(temp_prompts)}
+            prompt, config = self._build_request(temp_prompts)
+            image_hash = hash_image(img) if self.cache is not None else None
+            key, cached = self._cache_lookup(
+                image_hash or '', temp_prompts, config, use_cache)
+            if cached is not None:
+                return cached
 
-請只返回新的提示詞，每行一個，不要包含任何其他文字。"""
+            # 調用 API
+            content = self._upload_content(img, image_hash)
+            response = self._gemini_sync(self.model, [prompt, content], config)
+            suggestions = self._parse_suggestions(response)
+            self._cache_store(key, suggestions)
+            return suggestions
+        except Exception as e:
+            logger.error("Error getting prompt suggestions: %s", e)
+            return []
 
-            # 配置生成參數
-            config = {
-                "temperature": 0.7,  # 控制輸出的隨機性
-                "top_p": 0.8,        # 控制輸出的多樣性
-                "top_k": 40,         # 控制每次選擇的範圍
-                "max_output_tokens": 1024,  # 最大輸出長度
-            }
+    async def _agenerate(self, load_content: Callable[[], Any], temp_prompts: List[str],
+                         image_hash: Optional[str], use_cache: bool) -> List[str]:
+        """
+        查詢快取，未命中時準備圖片內容並請求建議
 
-            # 調用 API
-            response = self._gemini_sync(self.model, [prompt, img], config)
+        Args:
+            load_content (Callable[[], Any]): 返回圖片內容的函數，僅在需要請求時於執行緒中調用
+            temp_prompts (List[str]): 臨時提示詞列表
+            image_hash (Optional[str]): 圖片雜湊
+            use_cache (bool): 是否使用快取的結果
+
+        Returns:
+            List[str]: 生成的提示詞建議列表
+        """
+        prompt, config = self._build_request(temp_prompts)
+        key, cached = self._cache_lookup(
+            image_hash or '', temp_prompts, config, use_cache)
+        if cached is not None:
+            return cached
+        content = await asyncio.to_thread(load_content)
+        response = await self._gemini_async(self.model, [prompt, content], config)
+        suggestions = self._parse_suggestions(response)
+        self._cache_store(key, suggestions)
+        return suggestions
+
+    async def aget_prompt_suggestions(self, img: Image.Image, temp_prompts: List[str],
+                                      use_cache: bool = True) -> List[str]:
+        """
+        get_prompt_suggestions 的非同步版本
 
-            if response:
-                # 處理返回結果
-                suggestions = [line.strip()
-                               for line in response.split('\n') if line.strip()]
-                return suggestions[:5]  # 最多返回5個建議
+        Args:
+            img (Image.Image): 當前圖片物件
+            temp_prompts (List[str]): 臨時提示詞列表
+            use_cache (bool): 是否使用快取的結果，False 時重新請求
+
+        Returns:
+            List[str]: 生成的提示詞建議列表，最多返回5個建議
+        """
+        try:
+            image_hash = None
+            if self.cache is not None:
+                image_hash = await asyncio.to_thread(hash_image, img)
+            return await self._agenerate(lambda: self._upload_content(img, image_hash),
+                                         temp_prompts, image_hash, use_cache)
+        except Exception as e:
+            logger.error("Error getting prompt suggestions: %s", e)
             return []
+
+    def _load_upload_content(self, image_path: str, image_hash: Optional[str]) -> Any:
+        """讀取圖片文件並準備上傳內容，編碼結果已快取時不需要解碼圖片"""
+        if self.upload_settings is None:
+            return _load_image(image_path)
+        payload = self._get_cached_payload(image_hash)
+        if payload is not None:
+            return self._payload_part(payload)
+        img = open_for_upload(image_path, self.upload_settings)
+        return self._upload_content(img, image_hash)
+
+    async def aget_prompt_suggestions_for_path(self, image_path: str, temp_prompts: List[str],
+                                               use_cache: bool = True) -> List[str]:
+        """
+        讀取圖片文件並生成建議，圖片在執行緒中解碼與編碼以免阻塞事件循環
+
+        以文件內容雜湊查詢快取，建議或上傳內容已快取時不需要解碼圖片。
+
+        Args:
+            image_path (str): 圖片路徑
+            temp_prompts (List[str]): 臨時提示詞列表
+            use_cache (bool): 是否使用快取的結果，False 時重新請求
+
+        Returns:
+            List[str]: 生成的提示詞建議列表
+        """
+        try:
+            image_hash = None
+            if self.cache is not None or self.upload_settings is not None:
+                image_hash = await asyncio.to_thread(hash_image_file, image_path)
+            return await self._agenerate(lambda: self._load_upload_content(image_path, image_hash),
+                                         temp_prompts, image_hash, use_cache)
         except Exception as e:
-            print(f"Error getting prompt suggestions: {e}")
+            logger.error("Error getting prompt suggestions for %s: %s", image_path, e)
             return []
+
+    async def astream_prompt_suggestions(self, image_paths: Iterable[str], temp_prompts: List[str],
+                                         use_cache: bool = True) -> AsyncIterator[Tuple[str, List[str]]]:
+        """
+        並行為多張圖片請求建議，並按完成順序逐一產生結果
+
+        同時進行的請求數受 max_concurrency 限制。
+
+        Args:
+            image_paths (Iterable[str]): 圖片路徑
+            temp_prompts (List[str]): 臨時提示詞列表
+            use_cache (bool): 是否使用快取的結果
+
+        Yields:
+            Tuple[str, List[str]]: （圖片路徑, 建議列表）
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def request(image_path: str) -> Tuple[str, List[str]]:
+            async with semaphore:
+                suggestions = await self.aget_prompt_suggestions_for_path(
+                    image_path, temp_prompts, use_cache)
+            return image_path, suggestions
+
+        tasks = [asyncio.ensure_future(request(path)) for path in image_paths]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # 呼叫端提前停止時取消剩餘的請求
+            for task in tasks:
+                task.cancel()
+
+    async def batch_prompt_suggestions(self, image_paths: Iterable[str], temp_prompts: List[str],
+                                       on_result: Optional[Callable[[str, List[str]], None]] = None,
+                                       use_cache: bool = True) -> Dict[str, List[str]]:
+        """
+        批次為多張圖片請求建議
+
+        Args:
+            image_paths (Iterable[str]): 圖片路徑
+            temp_prompts (List[str]): 臨時提示詞列表
+            on_result (Optional[Callable[[str, List[str]], None]]): 每完成一張圖片即調用
+            use_cache (bool): 是否使用快取的結果
+
+        Returns:
+            Dict[str, List[str]]: 圖片路徑到建議列表的字典
+        """
+        results: Dict[str, List[str]] = {}
+        async for image_path, suggestions in self.astream_prompt_suggestions(image_paths, temp_prompts,
+                                                                           use_cache):
+            results[image_path] = suggestions
+            if on_result is not None:
+                on_result(image_path, suggestions)
+        return results
+
+
+def _load_image(image_path: str) -> Image.Image:
+    """完整解碼圖片，使其在文件關閉後仍可使用"""
+    with Image.open(image_path) as img:
+        img.load()
+        return img.copy()
@@ -0,0 +1,368 @@
+"""
+結構化的生成參數與列式匯出
+
+GenerationParams 記錄一張圖片完整的生成參數（正向 / 反向提示詞、步數、採樣器、CFG、種子、
+尺寸、模型、模型雜湊與 LoRA），各格式的解析函數以 utils.prompt_formats 識別出的格式名稱登錄。
+
+GenerationTable 以每個欄位一個列表的列式結構累積大量記錄，可匯出為 CSV，
+或在安裝 pyarrow 後匯出為 Parquet / Arrow IPC，之後的統計（例如種子或採樣器的分佈）
+不需要重新打開任何圖片。
+"""
+from dataclasses import dataclass, fields
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import csv
+import json
+import re
+from utils.prompt_formats import (
+    comfyui_sampler_texts, detect_format, extract_prompts_with_format,
+    split_a1111_parameters,
+)
+
+
+TABLE_FORMATS = ('csv', 'parquet', 'arrow')
+
+
+@dataclass(slots=True)
+class GenerationParams:
+    """一張圖片的生成參數，無法取得的欄位為 None"""
+    source_format: Optional[str] = None
+    prompt: str = ''
+    negative_prompt: str = ''
+    steps: Optional[int] = None
+    sampler: Optional[str] = None
+    scheduler: Optional[str] = None
+    cfg_scale: Optional[float] = None
+    seed: Optional[int] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    model: Optional[str] = None
+    model_hash: Optional[str] = None
+    # (名稱, 權重)，權重未知時為 None
+    loras: Tuple[Tuple[str, Optional[float]], ...] = ()
+
+
+PARAM_FIELDS = [field.name for field in fields(GenerationParams)]
+COLUMNS = ['path'] + PARAM_FIELDS
+
+_param_parsers: Dict[str, Callable[[Dict[str, Any], GenerationParams], None]] = {}
+
+
+def register_params_parser(name: str) -> Callable:
+    """
+    為 utils.prompt_formats 中的格式登錄生成參數解析函數的裝飾器
+
+    解析函數接收圖片元數據與已填入 source_format / prompt 的記錄，就地填入其他欄位。
+
+    Args:
+        name (str): 格式名稱（與 register_extractor 的名稱相同）
+
+    Returns:
+        Callable: 裝飾器
+    """
+    def decorator(parse: Callable[[Dict[str, Any], GenerationParams], None]):
+        _param_parsers[name] = parse
+        return parse
+    return decorator
+
+
+def extract_generation_params(info: Dict[str, Any]) -> GenerationParams:
+    """
+    從圖片信息字典中取出生成參數
+
+    Args:
+        info (Dict[str, Any]): 圖片元數據（鍵名與 Pillow 的 img.info 一致）
+
+    Returns:
+        GenerationParams: 生成參數，內容損壞的欄位保持 None
+    """
+    name, prompts = extract_prompts_with_format(info)
+    params = GenerationParams(source_format=name, prompt=', '.join(prompts))
+    parse = _param_parsers.get(name or detect_format(info) or '')
+    if parse is not None:
+        try:
+            parse(info, params)
+        except (ValueError, TypeError, KeyError, AttributeError):
+            pass
+    return params
+
+
+def _to_int(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_seed(value: Any) -> Optional[int]:
+    """種子必須在 uint64 範圍內，-1（隨機）等無效值視為未知"""
+    seed = _to_int(value)
+    return seed if seed is not None and 0 <= seed < 1 << 64 else None
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_str(value: Any) -> Optional[str]:
+    return value if isinstance(value, str) and value else None
+
+
+def _json_object(value: Any) -> Dict[str, Any]:
+    if isinstance(value, str) and value.lstrip()[:1] == '{':
+        data = json.loads(value)
+        if isinstance(data, dict):
+            return data
+    return {}
+
+
+# ---- AUTOMATIC1111 / Forge ----
+
+# 與 A1111 本身相同的設定行解析規則：「鍵: 值」以逗號分隔，值可以是帶引號的 JSON 字串
+_A1111_SETTING = re.compile(r'\s*(\w[\w \-/]+):\s*("(?:\\.|[^\\"])+"|[^,]*)(?:,|$)')
+_LORA_TAG = re.compile(r'<(?:lora|lyco):([^:>]+)(?::([^:>]+))?[^>]*>')
+
+
+def parse_a1111_settings(settings: str) -> Dict[str, str]:
+    """
+    解析 A1111 的設定行
+
+    Args:
+        settings (str): 例如「Steps: 20, Sampler: Euler a, Lora hashes: "a: 1, b: 2"」
+
+    Returns:
+        Dict[str, str]: 鍵 -> 值（引號已去除）
+    """
+    result: Dict[str, str] = {}
+    for key, value in _A1111_SETTING.findall(settings.replace('\n', ', ')):
+        if value[:1] == '"' and value[-1:] == '"':
+            try:
+                value = json.loads(value)
+            except ValueError:
+                value = value[1:-1]
+        result[key.strip()] = value.strip()
+    return result
+
+
+def _a1111_loras(prompt: str, settings: Dict[str, str]) -> Tuple[Tuple[str, Optional[float]], ...]:
+    # <lora:名稱> 省略權重時為 1
+    loras = tuple((name.strip(), _to_float(weight) if weight else 1.0)
+                  for name, weight in _LORA_TAG.findall(prompt))
+    if loras or 'Lora hashes' not in settings:
+        return loras
+    # 提示詞中沒有 <lora:...> 時（例如被擴展移除），從 Lora hashes 取得名稱
+    return tuple((entry.split(':', 1)[0].strip(), None)
+                 for entry in settings['Lora hashes'].split(',') if entry.strip())
+
+
+@register_params_parser('a1111')
+def parse_a1111_params(info: Dict[str, Any], params: GenerationParams) -> None:
+    parameters = info.get('parameters')
+    if not isinstance(parameters, str):
+        parameters = info['UserComment']
+    positive, params.negative_prompt, settings_text = split_a1111_parameters(parameters)
+    settings = parse_a1111_settings(settings_text)
+    params.steps = _to_int(settings.get('Steps'))
+    params.sampler = settings.get('Sampler')
+    params.scheduler = settings.get('Schedule type')
+    params.cfg_scale = _to_float(settings.get('CFG scale'))
+    params.seed = _to_seed(settings.get('Seed'))
+    width, _, height = settings.get('Size', '').partition('x')
+    params.width, params.height = _to_int(width), _to_int(height)
+    params.model = settings.get('Model')
+    params.model_hash = settings.get('Model hash')
+    params.loras = _a1111_loras(positive, settings)
+
+
+# ---- ComfyUI ----
+
+@register_params_parser('comfyui')
+def parse_comfyui_params(info: Dict[str, Any], params: GenerationParams) -> None:
+    graph = _json_object(info['prompt'])
+    params.negative_prompt = ', '.join(text.strip() for text in comfyui_sampler_texts(graph, 'negative'))
+    loras = []
+    for node in graph.values():
+        if not isinstance(node, dict):
+            continue
+        class_type = str(node.get('class_type', ''))
+        inputs = node.get('inputs', {})
+        if 'positive' in inputs and 'negative' in inputs and params.steps is None:
+            # 第一個採樣器；以連線傳入的數值（例如種子節點）保持 None
+            params.seed = _to_seed(inputs.get('seed', inputs.get('noise_seed')))
+            params.steps = _to_int(inputs.get('steps'))
+            params.cfg_scale = _to_float(inputs.get('cfg'))
+            params.sampler = _to_str(inputs.get('sampler_name'))
+            params.scheduler = _to_str(inputs.get('scheduler'))
+        elif 'CheckpointLoader' in class_type and params.model is None:
+            params.model = _to_str(inputs.get('ckpt_name'))
+        elif 'LoraLoader' in class_type and isinstance(inputs.get('lora_name'), str):
+            loras.append((inputs['lora_name'], _to_float(inputs.get('strength_model'))))
+        elif class_type == 'EmptyLatentImage' and params.width is None:
+            params.width = _to_int(inputs.get('width'))
+            params.height = _to_int(inputs.get('height'))
+    params.loras = tuple(loras)
+
+
+# ---- NovelAI ----
+
+@register_params_parser('novelai')
+def parse_novelai_params(info: Dict[str, Any], params: GenerationParams) -> None:
+    comment = _json_object(info.get('Comment'))
+    params.negative_prompt = comment.get('uc') or ''
+    params.steps = _to_int(comment.get('steps'))
+    params.sampler = _to_str(comment.get('sampler'))
+    params.scheduler = _to_str(comment.get('noise_schedule'))
+    params.cfg_scale = _to_float(comment.get('scale'))
+    params.seed = _to_seed(comment.get('seed'))
+    params.width = _to_int(comment.get('width'))
+    params.height = _to_int(comment.get('height'))
+    params.model = _to_str(info.get('Source'))
+
+
+# ---- InvokeAI ----
+
+_DREAM_OPTION = re.compile(r'-(\w)\s*(\S+)')
+
+
+@register_params_parser('invokeai')
+def parse_invokeai_params(info: Dict[str, Any], params: GenerationParams) -> None:
+    metadata = _json_object(info.get('invokeai_metadata'))
+    if metadata:
+        model = metadata.get('model')
+        params.negative_prompt = metadata.get('negative_prompt') or ''
+        params.steps = _to_int(metadata.get('steps'))
+        params.scheduler = _to_str(metadata.get('scheduler'))
+        params.cfg_scale = _to_float(metadata.get('cfg_scale'))
+        params.seed = _to_seed(metadata.get('seed'))
+        params.width = _to_int(metadata.get('width'))
+        params.height = _to_int(metadata.get('height'))
+        if isinstance(model, dict):
+            params.model = _to_str(model.get('name', model.get('model_name')))
+            params.model_hash = _to_str(model.get('hash'))
+        loras = []
+        for entry in metadata.get('loras') or []:
+            lora = entry.get('model', entry.get('lora')) or {}
+            name = lora.get('name', lora.get('model_name'))
+            if isinstance(name, str):
+                loras.append((name, _to_float(entry.get('weight'))))
+        params.loras = tuple(loras)
+        return
+
+    metadata = _json_object(info.get('sd-metadata'))
+    if metadata:
+        image = metadata.get('image', {})
+        params.steps = _to_int(image.get('steps'))
+        params.sampler = _to_str(image.get('sampler'))
+        params.cfg_scale = _to_float(image.get('cfg_scale'))
+        params.seed = _to_seed(image.get('seed'))
+        params.width = _to_int(image.get('width'))
+        params.height = _to_int(image.get('height'))
+        params.model = _to_str(metadata.get('model_weights'))
+        params.model_hash = _to_str(metadata.get('model_hash'))
+        return
+
+    dream = info.get('Dream')
+    if isinstance(dream, str):
+        # "prompt" -s 50 -S 1234 -W 512 -H 512 -C 7.5 -A k_lms
+        options = dict(_DREAM_OPTION.findall(dream[dream.rfind('"') + 1:]))
+        params.steps = _to_int(options.get('s'))
+        params.seed = _to_seed(options.get('S'))
+        params.width = _to_int(options.get('W'))
+        params.height = _to_int(options.get('H'))
+        params.cfg_scale = _to_float(options.get('C'))
+        params.sampler = options.get('A')
+
+
+class GenerationTable:
+    """以列式結構累積生成參數，每個欄位一個列表"""
+
+    def __init__(self) -> None:
+        self.columns: Dict[str, List[Any]] = {name: [] for name in COLUMNS}
+
+    def __len__(self) -> int:
+        return len(self.columns['path'])
+
+    def append(self, path: str, params: GenerationParams) -> None:
+        """
+        加入一張圖片的參數
+
+        Args:
+            path (str): 圖片路徑
+            params (GenerationParams): 生成參數
+        """
+        self.columns['path'].append(path)
+        for name in PARAM_FIELDS:
+            self.columns[name].append(getattr(params, name))
+
+    def row(self, index: int) -> GenerationParams:
+        """取回第 index 行的生成參數"""
+        return GenerationParams(**{name: self.columns[name][index] for name in PARAM_FIELDS})
+
+    def to_csv(self, path: str) -> None:
+        """
+        寫成 CSV，LoRA 以「名稱:權重」並以分號分隔
+
+        Args:
+            path (str): 輸出路徑
+        """
+        loras = [';'.join(name if weight is None else f"{name}:{weight:g}"
+                          for name, weight in entry) for entry in self.columns['loras']]
+        columns = [loras if name == 'loras' else self.columns[name] for name in COLUMNS]
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(COLUMNS)
+            writer.writerows(zip(*columns))
+
+    def to_arrow(self):
+        """
+        轉換為 pyarrow.Table（需要安裝 pyarrow），LoRA 為 list<struct<name, weight>>
+
+        Returns:
+            pyarrow.Table: 生成參數表
+        """
+        import pyarrow as pa
+
+        schema = pa.schema([
+            ('path', pa.string()),
+            ('source_format', pa.string()),
+            ('prompt', pa.string()),
+            ('negative_prompt', pa.string()),
+            ('steps', pa.int32()),
+            ('sampler', pa.string()),
+            ('scheduler', pa.string()),
+            ('cfg_scale', pa.float64()),
+            ('seed', pa.uint64()),
+            ('width', pa.int32()),
+            ('height', pa.int32()),
+            ('model', pa.string()),
+            ('model_hash', pa.string()),
+            ('loras', pa.list_(pa.struct([('name', pa.string()), ('weight', pa.float64())]))),
+        ])
+        data = dict(self.columns)
+        data['loras'] = [[{'name': name, 'weight': weight} for name, weight in entry]
+                         for entry in self.columns['loras']]
+        return pa.Table.from_pydict(data, schema=schema)
+
+    def export(self, path: str, fmt: str = 'csv') -> None:
+        """
+        匯出為文件
+
+        Args:
+            path (str): 輸出路徑
+            fmt (str): 'csv'、'parquet' 或 'arrow'（Arrow IPC 文件），後兩者需要 pyarrow
+        """
+        if fmt not in TABLE_FORMATS:
+            raise ValueError(f"不支援的匯出格式：{fmt}")
+        if fmt == 'csv':
+            self.to_csv(path)
+            return
+        table = self.to_arrow()
+        if fmt == 'parquet':
+            import pyarrow.parquet as pq
+            pq.write_table(table, path)
+        else:
+            import pyarrow as pa
+            with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
@@ -1,34 +1,180 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
+import bisect
 import os
+import threading
 from PIL import Image, ImageTk
 import tkinter as tk
 from tkinter import ttk
+from utils.prompt_index import PromptIndex, get_prompt_index
+from utils.image_prefetcher import ImagePrefetcher, PreparedImage
+from utils.display_cache import DisplayImageCache
+from utils.folder_scanner import FolderScanner, iter_image_batches
+from utils.image_utils import get_txt_path
+from utils.tag_index import TagIndex
+from utils.tag_stats import TagStatistics
+from utils.tracing import get_logger, span
+
+logger = get_logger(__name__)
 
 
 class ImageHandler:
+    # 快速預覽時，reduce() 後的圖片至少保留最終尺寸的倍數
+    REDUCING_GAP = 2
+
     def __init__(self) -> None:
         self.current_index: int = -1
         self.image_files: List[str] = []
         self.photo: Optional[ImageTk.PhotoImage] = None
         self.current_image = None
+        self.prompt_index: Optional[PromptIndex] = None
         # 設置固定的顯示區域尺寸
         self.display_width = 400
         self.display_height = 400
+        # 已合成的顯示圖片快取，重複瀏覽時不再重新縮放
+        self.display_cache = DisplayImageCache()
+        # 背景預取前後的圖片，切換時不阻塞界面
+        self.prefetcher = ImagePrefetcher(self.prepare_image)
+        # 圖片列表每次變動時遞增，用於判斷標籤索引是否過期
+        self.files_version = 0
+        # 提示詞倒排索引及建立時的圖片列表快照
+        self.tag_index: Optional[TagIndex] = None
+        self.tag_index_paths: List[str] = []
+        self.tag_index_version = -1
+        # 資料夾的標籤統計及建立時的圖片列表版本，保存 txt 時增量更新
+        self.tag_stats: Optional[TagStatistics] = None
+        self.tag_stats_version = -1
+        # 切換資料夾時遞增，背景建立的統計只在資料夾未變時發布
+        self.folder_generation = 0
+        # 這個資料夾中已保存的 txt 提示詞（圖片路徑 -> 提示詞）
+        self._saved_txt_prompts: Dict[str, List[str]] = {}
+        self._tag_stats_lock = threading.Lock()
+        # 篩選後的圖片路徑（已排序），None 表示不篩選
+        self.filter_paths: Optional[List[str]] = None
 
     def load_images(self, folder_path: str) -> bool:
-        """加載資料夾中的圖片"""
-        self.image_files = []
-        for file in os.listdir(folder_path):
-            if file.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.bmp')):
-                self.image_files.append(os.path.join(folder_path, file))
-        self.image_files.sort()  # 按文件名排序
+        """加載資料夾中的圖片（同步掃描整個資料夾）"""
+        self.reset(folder_path)
+        for batch in iter_image_batches(folder_path):
+            self.add_images(batch)
         if self.image_files:
             self.current_index = 0
-            self.current_image = Image.open(self.image_files[0])
         return bool(self.image_files)
 
-    def resize_image(self, image: Image.Image) -> Image.Image:
-        """按比例調整圖片大小以適應固定的顯示區域"""
+    def start_folder_scan(self, folder_path: str) -> FolderScanner:
+        """
+        清空目前的圖片列表並在背景開始掃描資料夾
+
+        Args:
+            folder_path (str): 資料夾路徑
+
+        Returns:
+            FolderScanner: 掃描器，由調用方定期 drain() 並交給 add_images()
+        """
+        self.reset(folder_path)
+        return FolderScanner(folder_path).start()
+
+    def reset(self, folder_path: str) -> None:
+        """切換資料夾時清空圖片列表與預取狀態"""
+        self.image_files = []
+        self.current_index = -1
+        self.current_image = None
+        self.files_version += 1
+        self.filter_paths = None
+        with self._tag_stats_lock:
+            self.folder_generation += 1
+            self.tag_stats = None
+            self._saved_txt_prompts = {}
+        self.prefetcher.clear()
+        # 開啟資料夾的提示詞索引
+        self.prompt_index = get_prompt_index(folder_path)
+
+    def add_images(self, paths: List[str]) -> None:
+        """
+        將一批圖片路徑合併到已排序的列表中，當前索引保持指向同一張圖片
+
+        Args:
+            paths (List[str]): 新找到的圖片路徑
+        """
+        if not paths:
+            return
+        current_path = self.get_current_image_path()
+        self.image_files.extend(paths)
+        # 已排序的舊列表加上一段新數據，Timsort 只需合併兩段有序區間
+        self.image_files.sort()  # 按文件名排序
+        self.files_version += 1
+        if current_path is not None:
+            self.current_index = bisect.bisect_left(
+                self.image_files, current_path)
+
+    def apply_changes(self, added: List[str], removed: List[str]) -> bool:
+        """
+        將資料夾監視到的變動套用到已排序的列表與提示詞索引，當前索引保持指向同一張圖片
+
+        整批變動只合併一次：刪除的路徑以一次走訪濾掉，新增的路徑排序後接在列表尾端，
+        Timsort 只需合併兩段有序區間，不需要重新掃描資料夾。新圖片的提示詞在顯示或預取時才解析。
+
+        Args:
+            added (List[str]): 新增的圖片路徑（已在列表中的會被略過）
+            removed (List[str]): 刪除的圖片路徑
+
+        Returns:
+            bool: 當前圖片是否被刪除（此時當前索引指向原位置的下一張圖片）
+        """
+        removed_set = {path for path in removed if self.find_index(path) is not None}
+        # 同一批中先刪除再新增的路徑仍需加回
+        new_paths = sorted({path for path in added
+                            if path in removed_set or self.find_index(path) is None})
+        if not removed_set and not new_paths:
+            return False
+
+        current_path = self.get_current_image_path()
+        current_removed = current_path in removed_set
+        if removed_set:
+            self.image_files[:] = [path for path in self.image_files if path not in removed_set]
+            if self.filter_paths is not None:
+                self.filter_paths[:] = [path for path in self.filter_paths
+                                        if path not in removed_set]
+            if self.prompt_index is not None:
+                for path in removed_set:
+                    self.prompt_index.invalidate(path)
+        self.image_files.extend(new_paths)
+        self.image_files.sort()
+        self.files_version += 1
+
+        if current_path is not None:
+            # 當前圖片被刪除時指向原位置的下一張圖片
+            index = bisect.bisect_left(self.image_files, current_path)
+            self.current_index = min(index, len(self.image_files) - 1)
+        if current_removed:
+            self.current_image = None
+        return current_removed
+
+    def sync_with_folder(self, folder_path: str) -> bool:
+        """
+        重新列出資料夾並套用差異（監視器遺失事件時使用）
+
+        Args:
+            folder_path (str): 資料夾路徑
+
+        Returns:
+            bool: 當前圖片是否被刪除
+        """
+        on_disk = {path for batch in iter_image_batches(folder_path) for path in batch}
+        loaded = set(self.image_files)
+        return self.apply_changes(sorted(on_disk - loaded), sorted(loaded - on_disk))
+
+    def resize_image(self, image: Image.Image, fast: bool = True) -> Image.Image:
+        """
+        按比例調整圖片大小以適應固定的顯示區域
+
+        Args:
+            image (Image.Image): 原始圖片（最好尚未載入像素，才能使用 draft）
+            fast (bool): 是否使用快速預覽路徑：JPEG 在解碼時以 DCT 縮放，
+                其他格式先以 reduce() 整數倍縮小，再做最後的 LANCZOS 重採樣
+
+        Returns:
+            Image.Image: 置中合成在白色背景上的顯示圖片
+        """
         # 獲取原始圖片尺寸
         w, h = image.size
 
@@ -41,28 +187,62 @@ class ImageHandler:
         new_width = int(w * ratio)
         new_height = int(h * ratio)
 
-        # 調整圖片大小
-        resized_image = image.resize(
-            (new_width, new_height), Image.Resampling.LANCZOS)
+        with span('decode'):
+            if fast:
+                image = self.reduce_for_preview(image, new_width, new_height)
+            image.load()
+
+        with span('resize'):
+            # 調整圖片大小
+            resized_image = image.resize(
+                (new_width, new_height), Image.Resampling.LANCZOS)
 
-        # 創建一個固定大小的白色背景
-        background = Image.new(
-            'RGB', (self.display_width, self.display_height), 'white')
+            # 創建一個固定大小的白色背景
+            background = Image.new(
+                'RGB', (self.display_width, self.display_height), 'white')
 
-        # 將調整後的圖片居中放置在背景上
-        x = (self.display_width - new_width) // 2
-        y = (self.display_height - new_height) // 2
-        background.paste(resized_image, (x, y))
+            # 將調整後的圖片居中放置在背景上
+            x = (self.display_width - new_width) // 2
+            y = (self.display_height - new_height) // 2
+            background.paste(resized_image, (x, y))
 
         return background
 
+    def reduce_for_preview(self, image: Image.Image, width: int, height: int) -> Image.Image:
+        """
+        在最後的重採樣之前先廉價地縮小圖片，使解碼的記憶體與時間取決於顯示尺寸
+
+        Args:
+            image (Image.Image): 原始圖片
+            width (int): 最終寬度
+            height (int): 最終高度
+
+        Returns:
+            Image.Image: 仍不小於最終尺寸 REDUCING_GAP 倍的圖片
+        """
+        if image.format == 'JPEG':
+            # 讓 JPEG 解碼器直接以 1/2、1/4 或 1/8 比例解碼
+            image.draft(None, (width * self.REDUCING_GAP,
+                               height * self.REDUCING_GAP))
+
+        if image.mode in ('1', 'P') or width < 1 or height < 1:
+            return image
+
+        # 保留 REDUCING_GAP 倍的餘量給 LANCZOS，以維持畫質
+        factor = min(image.width // (width * self.REDUCING_GAP),
+                     image.height // (height * self.REDUCING_GAP))
+        if factor > 1:
+            image = image.reduce(factor)
+        return image
+
     def show_image(self, index: int, image_label) -> bool:
         """顯示指定索引的圖片"""
         if 0 <= index < len(self.image_files):
             self.current_index = index
+            image_path = self.image_files[index]
             try:
                 # 打開並調整圖片大小
-                image = Image.open(self.image_files[index])
+                image = Image.open(image_path)
                 resized_image = self.resize_image(image)
 
                 # 創建 PhotoImage 對象
@@ -72,7 +252,7 @@ class ImageHandler:
                 image_label.configure(image=self.photo)
                 return True
             except Exception as e:
-                print(f"無法載入圖片: {str(e)}")
+                logger.warning("無法載入圖片 %s：%s", image_path, e)
                 return False
         return False
 
@@ -92,16 +272,200 @@ class ImageHandler:
 
     def can_move_prev(self) -> bool:
         """檢查是否可以顯示上一張圖片"""
-        return self.current_index > 0
+        return self.get_prev_index() is not None
 
     def can_move_next(self) -> bool:
         """檢查是否可以顯示下一張圖片"""
-        return self.current_index < len(self.image_files) - 1
+        return self.get_next_index() is not None
+
+    def get_prev_index(self) -> Optional[int]:
+        """獲取上一張圖片的索引（篩選時只在符合的圖片間移動）"""
+        if self.filter_paths is None:
+            return self.current_index - 1 if self.current_index > 0 else None
+        current_path = self.get_current_image_path()
+        if current_path is None:
+            return None
+        j = bisect.bisect_left(self.filter_paths, current_path) - 1
+        while j >= 0:
+            index = self.find_index(self.filter_paths[j])
+            if index is not None:
+                return index
+            j -= 1
+        return None
+
+    def get_next_index(self) -> Optional[int]:
+        """獲取下一張圖片的索引（篩選時只在符合的圖片間移動）"""
+        if self.filter_paths is None:
+            if self.current_index < len(self.image_files) - 1:
+                return self.current_index + 1
+            return None
+        current_path = self.get_current_image_path()
+        j = 0
+        if current_path is not None:
+            j = bisect.bisect_right(self.filter_paths, current_path)
+        while j < len(self.filter_paths):
+            index = self.find_index(self.filter_paths[j])
+            if index is not None:
+                return index
+            j += 1
+        return None
+
+    def find_index(self, image_path: str) -> Optional[int]:
+        """以二分搜尋在已排序的圖片列表中定位圖片"""
+        index = bisect.bisect_left(self.image_files, image_path)
+        if index < len(self.image_files) and self.image_files[index] == image_path:
+            return index
+        return None
+
+    def get_image_tags(self, image_path: str) -> List[str]:
+        """獲取圖片元數據與同名 txt 文件中的所有提示詞"""
+        prompt_index = get_prompt_index(os.path.dirname(image_path))
+        txt_prompts = prompt_index.get_txt_prompts(get_txt_path(image_path))
+        return prompt_index.get_image_prompts(image_path) + (txt_prompts or [])
+
+    def is_tag_index_current(self) -> bool:
+        """標籤索引是否已為目前的圖片列表建立"""
+        return self.tag_index is not None and self.tag_index_version == self.files_version
+
+    def build_tag_index(self) -> TagIndex:
+        """為目前的圖片列表建立提示詞倒排索引（可在背景執行緒中調用）"""
+        version = self.files_version
+        paths = list(self.image_files)
+        tag_index = TagIndex.build(paths, self.get_image_tags)
+        self.tag_index, self.tag_index_paths = tag_index, paths
+        self.tag_index_version = version
+        return tag_index
+
+    def is_tag_stats_current(self) -> bool:
+        """標籤統計是否已為目前的圖片列表建立"""
+        return self.tag_stats is not None and self.tag_stats_version == self.files_version
+
+    def build_tag_stats(self) -> TagStatistics:
+        """
+        為目前的圖片列表統計標籤（可在背景執行緒中調用）
+
+        建立期間切換了資料夾時不發布結果；建立期間保存的 txt 在發布前重新套用，
+        避免統計讀到尚未寫入磁碟的舊內容。
+        """
+        generation = self.folder_generation
+        version = self.files_version
+        with span('tag_stats_build', images=len(self.image_files)):
+            tag_stats = TagStatistics.build(list(self.image_files), self.get_image_tags)
+        with self._tag_stats_lock:
+            if generation != self.folder_generation:
+                return tag_stats
+            for image_path, txt_prompts in self._saved_txt_prompts.items():
+                self._set_image_tags(tag_stats, image_path, txt_prompts)
+            self.tag_stats = tag_stats
+            self.tag_stats_version = version
+        return tag_stats
+
+    def update_image_tags(self, image_path: str, txt_prompts: List[str]) -> None:
+        """
+        圖片的 txt 已保存：以新的提示詞增量更新標籤統計
+
+        Args:
+            image_path (str): 圖片路徑
+            txt_prompts (List[str]): 保存到 txt 的提示詞
+        """
+        with self._tag_stats_lock:
+            # 記錄下來，正在背景建立的統計在發布前會重新套用
+            self._saved_txt_prompts[image_path] = list(txt_prompts)
+            tag_stats = self.tag_stats
+        if tag_stats is not None:
+            self._set_image_tags(tag_stats, image_path, txt_prompts)
+
+    @staticmethod
+    def _set_image_tags(tag_stats: TagStatistics, image_path: str,
+                        txt_prompts: List[str]) -> None:
+        prompt_index = get_prompt_index(os.path.dirname(image_path))
+        tag_stats.set_image_tags(
+            image_path, prompt_index.get_image_prompts(image_path) + txt_prompts)
+
+    def apply_filter(self, query: str) -> int:
+        """
+        以查詢語句篩選圖片，之後的上一張/下一張只在符合的圖片間移動
+
+        Args:
+            query (str): 查詢語句，例如 "1girl AND NOT watermark"
+
+        Returns:
+            int: 符合的圖片數
+        """
+        if not self.is_tag_index_current():
+            # 圖片列表在建立索引後已變動
+            self.build_tag_index()
+        indices = self.tag_index.query(query)
+        self.filter_paths = [self.tag_index_paths[i] for i in indices]
+        return len(self.filter_paths)
+
+    def matches_filter(self, image_path: Optional[str]) -> bool:
+        """圖片是否符合目前的篩選（以二分搜尋查找已排序的符合列表，未篩選時總是符合）"""
+        if self.filter_paths is None:
+            return True
+        if image_path is None:
+            return False
+        j = bisect.bisect_left(self.filter_paths, image_path)
+        return j < len(self.filter_paths) and self.filter_paths[j] == image_path
+
+    def clear_filter(self) -> None:
+        """取消篩選"""
+        self.filter_paths = None
 
     def set_current_image(self, index: int) -> bool:
-        """設置當前圖片"""
+        """設置當前圖片，並在背景預取前後的圖片"""
         if 0 <= index < len(self.image_files):
             self.current_index = index
-            self.current_image = Image.open(self.image_files[index])
+            self.current_image = None
+            self.prefetcher.prefetch_around(self.image_files, index)
             return True
         return False
+
+    def get_prepared_image(self, index: int) -> Optional[PreparedImage]:
+        """不阻塞地獲取已在背景準備好的圖片，尚未完成時返回 None"""
+        if not 0 <= index < len(self.image_files):
+            return None
+        image_path = self.image_files[index]
+        prepared = self.prefetcher.get(image_path)
+        if prepared is None:
+            # 預取結果已被淘汰，但顯示圖片仍在快取中時直接使用
+            key = DisplayImageCache.make_key(
+                image_path, self.display_width, self.display_height)
+            display_image = self.display_cache.get(key, record_miss=False)
+            if display_image is not None:
+                image_prompts = get_prompt_index(
+                    os.path.dirname(image_path)).get_image_prompts(image_path)
+                prepared = PreparedImage(
+                    image_path, display_image, image_prompts)
+            elif index == self.current_index:
+                # 失敗的結果已被取走或已被淘汰時重新提交，等待顯示的一方不會無限輪詢
+                self.prefetcher.request(image_path)
+        if prepared is not None and index == self.current_index:
+            self.current_image = prepared.display_image
+        return prepared
+
+    def prepare_image(self, image_path: str) -> PreparedImage:
+        """在工作執行緒中解碼、縮放圖片並解析元數據"""
+        error = None
+        try:
+            display_image = self.get_display_image(image_path)
+        except Exception as e:
+            logger.warning("無法載入圖片 %s：%s", image_path, e)
+            display_image = None
+            error = str(e)
+
+        image_prompts = get_prompt_index(
+            os.path.dirname(image_path)).get_image_prompts(image_path)
+        return PreparedImage(image_path, display_image, image_prompts, error)
+
+    def get_display_image(self, image_path: str) -> Image.Image:
+        """獲取縮放並合成後的顯示圖片，優先使用快取"""
+        key = DisplayImageCache.make_key(
+            image_path, self.display_width, self.display_height)
+        display_image = self.display_cache.get(key)
+        if display_image is None:
+            with Image.open(image_path) as image:
+                display_image = self.resize_image(image)
+            if key is not None:
+                self.display_cache.put(key, display_image)
+        return display_image
@@ -0,0 +1,141 @@
+from typing import Callable, Dict, List, NamedTuple, Optional
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+import threading
+from PIL import Image
+
+
+class PreparedImage(NamedTuple):
+    """已在背景完成解碼、縮放與元數據解析、可以直接顯示的圖片"""
+    path: str
+    display_image: Optional[Image.Image]
+    image_prompts: List[str]
+    # 準備失敗（例如圖片損壞）時的錯誤訊息
+    error: Optional[str] = None
+
+
+class ImagePrefetcher:
+    """
+    圖片預取器
+
+    使用執行緒池在背景準備當前圖片前後各 radius 張圖片，
+    完成的結果放入有上限的 LRU 中，界面執行緒只做不阻塞的查詢。
+    """
+
+    def __init__(self, prepare: Callable[[str], PreparedImage], radius: int = 2,
+                 capacity: int = 8, max_workers: int = 2) -> None:
+        """
+        初始化預取器
+
+        Args:
+            prepare (Callable[[str], PreparedImage]): 在工作執行緒中準備單張圖片的函數
+            radius (int): 當前圖片前後各預取的張數
+            capacity (int): 就緒 LRU 最多保存的圖片數
+            max_workers (int): 工作執行緒數
+        """
+        self.prepare = prepare
+        self.radius = radius
+        self.capacity = max(capacity, 2 * radius + 1)
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='prefetch')
+        self._ready: 'OrderedDict[str, PreparedImage]' = OrderedDict()
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        # 每次清空時遞增，用於丟棄舊資料夾遲到的結果
+        self._generation = 0
+
+    def get(self, path: str) -> Optional[PreparedImage]:
+        """
+        不阻塞地獲取已準備好的圖片
+
+        Args:
+            path (str): 圖片路徑
+
+        Returns:
+            Optional[PreparedImage]: 已就緒的圖片，尚未完成時返回 None；
+                失敗的結果（error 不為 None）只返回一次，之後再請求時會重新準備
+        """
+        with self._lock:
+            prepared = self._ready.get(path)
+            if prepared is not None:
+                if prepared.error is not None:
+                    del self._ready[path]
+                else:
+                    self._ready.move_to_end(path)
+            return prepared
+
+    def request(self, path: str) -> None:
+        """
+        提交一張圖片的準備工作（已就緒或已在處理中則忽略）
+
+        Args:
+            path (str): 圖片路徑
+        """
+        with self._lock:
+            if path in self._ready or path in self._pending:
+                return
+            generation = self._generation
+            future = self.executor.submit(self.prepare, path)
+            self._pending[path] = future
+        future.add_done_callback(
+            lambda f: self._on_done(path, f, generation))
+
+    def prefetch_around(self, paths: List[str], index: int) -> None:
+        """
+        預取指定索引的圖片及其前後 radius 張，並取消視窗外尚未開始的工作
+
+        Args:
+            paths (List[str]): 圖片路徑列表
+            index (int): 當前圖片索引
+        """
+        # 先提交當前圖片，再由近到遠提交前後的圖片
+        window = [index]
+        for offset in range(1, self.radius + 1):
+            window.extend([index + offset, index - offset])
+        wanted = [paths[i] for i in window if 0 <= i < len(paths)]
+
+        with self._lock:
+            wanted_set = set(wanted)
+            stale = [future for path, future in self._pending.items()
+                     if path not in wanted_set]
+        # 取消尚未開始的工作會立即在本執行緒中調用 _on_done，不能持有鎖
+        for future in stale:
+            future.cancel()
+
+        for path in wanted:
+            self.request(path)
+
+    def _on_done(self, path: str, future: Future, generation: int) -> None:
+        """工作完成後將結果放入就緒 LRU"""
+        with self._lock:
+            if generation != self._generation:
+                return
+            if self._pending.get(path) is future:
+                del self._pending[path]
+            if future.cancelled():
+                return
+            error = future.exception()
+            if error is not None:
+                # 保存失敗的結果，等待顯示的界面可以停止輪詢並顯示錯誤
+                self._ready[path] = PreparedImage(path, None, [], str(error))
+            else:
+                self._ready[path] = future.result()
+            self._ready.move_to_end(path)
+            while len(self._ready) > self.capacity:
+                self._ready.popitem(last=False)
+
+    def clear(self) -> None:
+        """清空就緒的圖片並取消所有尚未開始的工作（例如切換資料夾時）"""
+        with self._lock:
+            self._generation += 1
+            pending = list(self._pending.values())
+            self._pending.clear()
+            self._ready.clear()
+        # 取消時會立即調用 _on_done，它需要取得鎖
+        for future in pending:
+            future.cancel()
+
+    def shutdown(self) -> None:
+        """關閉執行緒池，不等待尚未開始的工作"""
+        self.clear()
+        self.executor.shutdown(wait=False, cancel_futures=True)
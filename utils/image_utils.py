@@ -1,71 +1,110 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 import os
 from PIL import Image
-import json
-import pytesseract
+from utils.file_utils import read_text_mapped
+from utils.metadata_reader import read_image_metadata
+from utils.prompt_formats import extract_prompts
+from utils.prompt_tokenizer import canonical_tag, split_prompts
+from utils.tracing import get_logger
 
+logger = get_logger(__name__)
 
-def get_image_prompts(image_path: str) -> List[str]:
+
+def get_image_prompts(image_path: str, use_mmap: bool = False) -> List[str]:
     """
     從圖片中讀取提示詞信息
 
     Args:
         image_path (str): 圖片的路徑
+        use_mmap (bool): 以 mmap 掃描檔頭（批次模式使用）
 
     Returns:
         list: 包含提示詞的列表，如果沒有找到提示詞則返回空列表
     """
     try:
-        # 打開圖片
-        with Image.open(image_path) as img:
-            # 獲取圖片信息
-            info = img.info
-
-            # 檢查是否有參數信息
-            if 'parameters' in info:
-                # 分割參數字符串，第一個部分通常是提示詞
-                params = info['parameters'].split('\n')
-                if params:
-                    # 分割提示詞，並過濾空字符串
-                    prompts = [p.strip()
-                               for p in params[0].split(',') if p.strip()]
-                    return prompts
-
-            # 檢查是否有其他格式的提示詞信息
-            if 'prompt' in info:
-                # 如果是字符串格式
-                if isinstance(info['prompt'], str):
-                    prompts = [p.strip()
-                               for p in info['prompt'].split(',') if p.strip()]
-                    return prompts
-                # 如果是 JSON 格式
-                elif isinstance(info['prompt'], dict):
-                    return info['prompt'].get('prompts', [])
-
-            # 檢查是否有 PNG 特定的元數據
-            if 'Description' in info:
-                try:
-                    # 嘗試解析 JSON 格式的描述
-                    desc = json.loads(info['Description'])
-                    if isinstance(desc, dict) and 'prompt' in desc:
-                        prompts = [p.strip()
-                                   for p in desc['prompt'].split(',') if p.strip()]
-                        return prompts
-                except:
-                    pass
-
-            # 檢查是否有其他常見的元數據字段
-            for key in ['UserComment', 'Comment', 'ImageDescription']:
-                if key in info:
-                    value = info[key]
-                    if isinstance(value, str):
-                        # 嘗試分割字符串
-                        prompts = [p.strip()
-                                   for p in value.split(',') if p.strip()]
-                        if prompts:
-                            return prompts
+        return prompts_from_info(read_image_info(image_path, use_mmap))
 
     except Exception as e:
-        print(f"讀取圖片提示詞時發生錯誤: {str(e)}")
+        logger.warning("讀取圖片提示詞時發生錯誤 %s：%s", image_path, e)
 
     return []
+
+
+def read_image_info(image_path: str, use_mmap: bool = False) -> Dict[str, Any]:
+    """
+    讀取圖片的元數據字典
+
+    Args:
+        image_path (str): 圖片的路徑
+        use_mmap (bool): 以 mmap 掃描檔頭（批次模式使用）
+
+    Returns:
+        Dict[str, Any]: 元數據（鍵名與 Pillow 的 img.info 一致）
+    """
+    # PNG / JPEG 只讀取檔頭的文字塊，其他格式回退到 Pillow
+    info = read_image_metadata(image_path, use_mmap)
+    if info is None:
+        info = _read_info_with_pillow(image_path)
+    return info
+
+
+def _read_info_with_pillow(image_path: str) -> Dict[str, Any]:
+    """使用 Pillow 讀取圖片信息（適用於 PNG / JPEG 以外的格式）"""
+    with Image.open(image_path) as img:
+        return dict(img.info)
+
+
+def get_txt_path(image_path: str) -> str:
+    """獲取與圖片同名的文本文件路徑"""
+    return os.path.splitext(image_path)[0] + '.txt'
+
+
+def merge_prompts(image_prompts: List[str], txt_prompts: List[str]) -> List[str]:
+    """
+    合併圖片與文本文件的提示詞並去重，並按字母順序排序
+
+    去重比較正規化後的標籤（見 utils.prompt_tokenizer），例如 long_hair、Long hair 與
+    (long hair:1.2) 視為同一個標籤；重複時保留文本文件中的寫法。
+
+    Args:
+        image_prompts (List[str]): 圖片元數據中的提示詞
+        txt_prompts (List[str]): 文本文件中的提示詞
+
+    Returns:
+        List[str]: 合併後的提示詞列表
+    """
+    merged: Dict[str, str] = {}
+    for prompt in txt_prompts + image_prompts:
+        merged.setdefault(canonical_tag(prompt), prompt)
+    return sorted(merged.values())
+
+
+def read_txt_prompts(txt_path: str, use_mmap: bool = False) -> List[str]:
+    """
+    讀取文本文件中以逗號分隔的提示詞
+
+    Args:
+        txt_path (str): 文本文件路徑
+        use_mmap (bool): 以 mmap 讀取（批次模式使用）
+
+    Returns:
+        List[str]: 提示詞列表
+    """
+    if use_mmap:
+        # \r 會在切分時與其他空白一起去除，不需要轉換換行符
+        return split_prompts(read_text_mapped(txt_path).strip())
+    with open(txt_path, 'r', encoding='utf-8') as f:
+        return split_prompts(f.read().strip())
+
+
+def prompts_from_info(info: Dict[str, Any]) -> List[str]:
+    """
+    從圖片信息字典中取出提示詞（格式識別見 utils.prompt_formats）
+
+    Args:
+        info (Dict[str, Any]): 圖片元數據（鍵名與 Pillow 的 img.info 一致）
+
+    Returns:
+        List[str]: 提示詞列表，如果沒有找到提示詞則返回空列表
+    """
+    return extract_prompts(info)
@@ -0,0 +1,411 @@
+"""
+僅讀取檔頭的圖片元數據解析器
+
+直接在檔案中逐塊（chunk / segment）定位文字元數據，遇到第一個圖像數據塊即停止，
+全程不建立 Pillow 圖片物件：
+- PNG：讀取 tEXt / iTXt / zTXt（以及 eXIf）塊，遇到 IDAT 停止
+- JPEG：讀取 APP1（EXIF）與 COM 段，遇到 SOS 停止
+
+批次掃描時可改用 mmap（read_image_metadata(path, use_mmap=True)）：整個檔案只需要
+一次映射，跳過的塊不會產生 seek / read 系統調用，只有實際讀到的分頁會被載入，
+文字塊以 memoryview 切片後直接解碼或解壓，不會先複製成 bytes。
+"""
+from typing import BinaryIO, Dict, Optional, Tuple, Union
+import mmap
+import struct
+import zlib
+
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+JPEG_SOI = b'\xff\xd8'
+
+# 單一文字塊解壓後的最大長度，避免惡意檔案造成記憶體暴增
+MAX_TEXT_CHUNK = 64 * 1024 * 1024
+
+# PNG 中需要解析的塊
+_PNG_TEXT_CHUNKS = (b'tEXt', b'zTXt', b'iTXt', b'eXIf')
+# 在 memoryview 中尋找零位元組時先複製的長度（關鍵字最長 79 個位元組）
+_NULL_SEARCH = 256
+
+# EXIF 標籤
+_TAG_IMAGE_DESCRIPTION = 0x010E
+_TAG_EXIF_IFD = 0x8769
+_TAG_USER_COMMENT = 0x9286
+_TAG_XP_COMMENT = 0x9C9C
+
+# TIFF 資料型別對應的位元組長度
+_TIFF_TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 7: 1, 9: 4, 10: 8}
+
+
+def detect_image_format(header: bytes) -> Optional[str]:
+    """
+    根據檔頭魔數判斷圖片格式
+
+    Args:
+        header (bytes): 檔案開頭至少 8 個位元組
+
+    Returns:
+        Optional[str]: 'png'、'jpeg'，無法識別時返回 None
+    """
+    if header.startswith(PNG_SIGNATURE):
+        return 'png'
+    if header.startswith(JPEG_SOI):
+        return 'jpeg'
+    return None
+
+
+def read_image_metadata(image_path: str, use_mmap: bool = False) -> Optional[Dict[str, str]]:
+    """
+    讀取圖片的文字元數據
+
+    Args:
+        image_path (str): 圖片的路徑
+        use_mmap (bool): 以 mmap 映射檔案後掃描（批次模式使用）
+
+    Returns:
+        Optional[Dict[str, str]]: 元數據字典（鍵名與 Pillow 的 img.info 一致），
+        若檔案不是 PNG 或 JPEG 則返回 None，由呼叫端自行回退
+    """
+    if use_mmap:
+        return _read_image_metadata_mmap(image_path)
+    with open(image_path, 'rb') as f:
+        fmt = detect_image_format(f.read(8))
+        f.seek(0)
+        if fmt == 'png':
+            return read_png_metadata(f)
+        if fmt == 'jpeg':
+            return read_jpeg_metadata(f)
+    return None
+
+
+def _read_image_metadata_mmap(image_path: str) -> Optional[Dict[str, str]]:
+    """以 mmap 映射檔案並從記憶體中掃描元數據"""
+    with open(image_path, 'rb') as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # 空檔案無法映射
+            return None
+    with mapped:
+        fmt = detect_image_format(mapped[:8])
+        if fmt == 'png':
+            return parse_png_buffer(mapped)
+        if fmt == 'jpeg':
+            return parse_jpeg_buffer(mapped)
+    return None
+
+
+def parse_png_buffer(buffer: Union[bytes, mmap.mmap]) -> Dict[str, str]:
+    """
+    從記憶體中的 PNG 數據讀取文字元數據，遇到 IDAT 即停止
+
+    Args:
+        buffer (Union[bytes, mmap.mmap]): 完整（或至少包含 IDAT 之前部分）的 PNG 數據
+
+    Returns:
+        Dict[str, str]: 關鍵字到文字內容的字典
+    """
+    info: Dict[str, str] = {}
+    if buffer[:8] != PNG_SIGNATURE:
+        return info
+
+    size = len(buffer)
+    pos = 8
+    with memoryview(buffer) as view:
+        while pos + 8 <= size:
+            length, chunk_type = struct.unpack_from('>I4s', buffer, pos)
+            if chunk_type in (b'IDAT', b'IEND'):
+                break
+            start = pos + 8
+            end = start + length
+            if end > size:
+                break
+            if chunk_type in _PNG_TEXT_CHUNKS:
+                _parse_png_chunk(chunk_type, view[start:end], info)
+            # 跳過數據與 CRC
+            pos = end + 4
+    return info
+
+
+def read_png_metadata(f: BinaryIO) -> Dict[str, str]:
+    """
+    逐塊讀取 PNG 的文字元數據，遇到 IDAT 即停止
+
+    Args:
+        f (BinaryIO): 以二進位模式開啟、位於檔案開頭的 PNG 檔案
+
+    Returns:
+        Dict[str, str]: 關鍵字到文字內容的字典
+    """
+    info: Dict[str, str] = {}
+    if f.read(8) != PNG_SIGNATURE:
+        return info
+
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            break
+        length, chunk_type = struct.unpack('>I4s', header)
+        if chunk_type in (b'IDAT', b'IEND'):
+            break
+        if chunk_type in _PNG_TEXT_CHUNKS:
+            data = f.read(length)
+            if len(data) < length:
+                break
+            f.seek(4, 1)  # 跳過 CRC
+            _parse_png_chunk(chunk_type, data, info)
+        else:
+            # 跳過數據與 CRC
+            f.seek(length + 4, 1)
+    return info
+
+
+def _partition_null(data: Union[bytes, memoryview]) -> Tuple[Union[bytes, memoryview],
+                                                             Optional[Union[bytes, memoryview]]]:
+    """以第一個零位元組分割，找不到時第二項為 None（memoryview 沒有 find，只複製開頭部分搜尋）"""
+    if isinstance(data, memoryview):
+        index = data[:_NULL_SEARCH].tobytes().find(b'\x00')
+        if index < 0 and len(data) > _NULL_SEARCH:
+            index = data.tobytes().find(b'\x00')
+    else:
+        index = data.find(b'\x00')
+    if index < 0:
+        return data, None
+    return data[:index], data[index + 1:]
+
+
+def _parse_png_chunk(chunk_type: bytes, data: Union[bytes, memoryview],
+                     info: Dict[str, str]) -> None:
+    """解析單一 PNG 文字塊並寫入 info（data 可以是 bytes 或 memoryview 切片）"""
+    try:
+        if chunk_type == b'eXIf':
+            info.update(parse_exif(bytes(data)))
+            return
+
+        keyword, rest = _partition_null(data)
+        if rest is None:
+            return
+        key = str(keyword, 'latin-1')
+
+        if chunk_type == b'tEXt':
+            info[key] = str(rest, 'latin-1')
+        elif chunk_type == b'zTXt':
+            # 第一個位元組為壓縮方法，僅支援 0（deflate）
+            if rest[:1] == b'\x00':
+                info[key] = _decompress(rest[1:]).decode('latin-1')
+        elif chunk_type == b'iTXt':
+            compressed, method = rest[0], rest[1]
+            _lang, rest = _partition_null(rest[2:])
+            if rest is None:
+                return
+            _translated, text = _partition_null(rest)
+            if text is None:
+                return
+            if compressed:
+                if method != 0:
+                    return
+                text = _decompress(text)
+            info[key] = str(text, 'utf-8', 'replace')
+    except (IndexError, ValueError, zlib.error):
+        # 損壞的文字塊直接忽略，與 Pillow 的寬鬆行為一致
+        pass
+
+
+def _decompress(data: bytes) -> bytes:
+    """解壓縮文字塊，並限制解壓後的大小"""
+    decompressor = zlib.decompressobj()
+    result = decompressor.decompress(data, MAX_TEXT_CHUNK)
+    if decompressor.unconsumed_tail:
+        raise ValueError("文字塊解壓後過大")
+    return result
+
+
+def read_jpeg_metadata(f: BinaryIO) -> Dict[str, str]:
+    """
+    逐段讀取 JPEG 的 APP1（EXIF）與 COM 段，遇到 SOS 即停止
+
+    Args:
+        f (BinaryIO): 以二進位模式開啟、位於檔案開頭的 JPEG 檔案
+
+    Returns:
+        Dict[str, str]: 元數據字典
+    """
+    info: Dict[str, str] = {}
+    if f.read(2) != JPEG_SOI:
+        return info
+
+    while True:
+        byte = f.read(1)
+        if not byte:
+            break
+        if byte != b'\xff':
+            # 段之間不應有其他數據，視為損壞
+            break
+        marker = f.read(1)
+        # 跳過填充用的 0xFF
+        while marker == b'\xff':
+            marker = f.read(1)
+        if not marker:
+            break
+        code = marker[0]
+        # 無長度欄位的獨立標記（RSTn、TEM）
+        if 0xD0 <= code <= 0xD7 or code == 0x01:
+            continue
+        # SOS 之後是壓縮圖像數據，EOI 則是檔案結尾
+        if code in (0xDA, 0xD9):
+            break
+        size_bytes = f.read(2)
+        if len(size_bytes) < 2:
+            break
+        length = struct.unpack('>H', size_bytes)[0] - 2
+        if length < 0:
+            break
+        if code == 0xE1 or code == 0xFE:
+            data = f.read(length)
+            if len(data) < length:
+                break
+            if code == 0xFE:
+                info['Comment'] = _decode_text(data)
+            elif data.startswith(b'Exif\x00\x00'):
+                info.update(parse_exif(data[6:]))
+        else:
+            f.seek(length, 1)
+    return info
+
+
+def parse_jpeg_buffer(buffer: Union[bytes, mmap.mmap]) -> Dict[str, str]:
+    """
+    從記憶體中的 JPEG 數據讀取 APP1（EXIF）與 COM 段，遇到 SOS 即停止
+
+    Args:
+        buffer (Union[bytes, mmap.mmap]): JPEG 數據
+
+    Returns:
+        Dict[str, str]: 元數據字典
+    """
+    info: Dict[str, str] = {}
+    if buffer[:2] != JPEG_SOI:
+        return info
+
+    size = len(buffer)
+    pos = 2
+    with memoryview(buffer) as view:
+        while pos + 1 < size:
+            if view[pos] != 0xFF:
+                # 段之間不應有其他數據，視為損壞
+                break
+            pos += 1
+            # 跳過填充用的 0xFF
+            while pos < size and view[pos] == 0xFF:
+                pos += 1
+            if pos >= size:
+                break
+            code = view[pos]
+            pos += 1
+            # 無長度欄位的獨立標記（RSTn、TEM）
+            if 0xD0 <= code <= 0xD7 or code == 0x01:
+                continue
+            # SOS 之後是壓縮圖像數據，EOI 則是檔案結尾
+            if code in (0xDA, 0xD9) or pos + 2 > size:
+                break
+            length = struct.unpack_from('>H', buffer, pos)[0] - 2
+            pos += 2
+            if length < 0 or pos + length > size:
+                break
+            if code == 0xFE:
+                info['Comment'] = _decode_text(view[pos:pos + length].tobytes())
+            elif code == 0xE1 and view[pos:pos + 6] == b'Exif\x00\x00':
+                info.update(parse_exif(view[pos + 6:pos + length].tobytes()))
+            pos += length
+    return info
+
+
+def _decode_text(data: bytes) -> str:
+    """將位元組解碼為文字，優先使用 UTF-8"""
+    data = data.rstrip(b'\x00')
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        return data.decode('latin-1')
+
+
+def parse_exif(data: bytes) -> Dict[str, str]:
+    """
+    從 TIFF 格式的 EXIF 數據中取出與提示詞相關的文字欄位
+
+    Args:
+        data (bytes): 以 'II' 或 'MM' 開頭的 TIFF 數據
+
+    Returns:
+        Dict[str, str]: 可能包含 ImageDescription、UserComment、XPComment
+    """
+    info: Dict[str, str] = {}
+    if data[:2] == b'II':
+        endian = '<'
+    elif data[:2] == b'MM':
+        endian = '>'
+    else:
+        return info
+
+    try:
+        ifd0_offset = struct.unpack(endian + 'I', data[4:8])[0]
+        ifd0 = _read_ifd(data, ifd0_offset, endian)
+
+        if _TAG_IMAGE_DESCRIPTION in ifd0:
+            info['ImageDescription'] = _decode_text(ifd0[_TAG_IMAGE_DESCRIPTION][1])
+        if _TAG_XP_COMMENT in ifd0:
+            info['XPComment'] = ifd0[_TAG_XP_COMMENT][1].decode(
+                'utf-16-le', errors='replace').rstrip('\x00')
+
+        if _TAG_EXIF_IFD in ifd0:
+            exif_offset = struct.unpack(endian + 'I', ifd0[_TAG_EXIF_IFD][1][:4])[0]
+            exif_ifd = _read_ifd(data, exif_offset, endian)
+            if _TAG_USER_COMMENT in exif_ifd:
+                comment = decode_user_comment(exif_ifd[_TAG_USER_COMMENT][1])
+                if comment:
+                    info['UserComment'] = comment
+    except (struct.error, IndexError):
+        pass
+    return info
+
+
+def _read_ifd(data: bytes, offset: int, endian: str) -> Dict[int, Tuple[int, bytes]]:
+    """讀取一個 IFD，返回標籤到（型別, 原始數據）的字典"""
+    entries: Dict[int, Tuple[int, bytes]] = {}
+    count = struct.unpack(endian + 'H', data[offset:offset + 2])[0]
+    pos = offset + 2
+    for _ in range(count):
+        tag, typ, n, value = struct.unpack(
+            endian + 'HHI4s', data[pos:pos + 12])
+        pos += 12
+        size = _TIFF_TYPE_SIZES.get(typ, 1) * n
+        if size <= 4:
+            raw = value[:size]
+        else:
+            start = struct.unpack(endian + 'I', value)[0]
+            raw = data[start:start + size]
+        entries[tag] = (typ, raw)
+    return entries
+
+
+def decode_user_comment(raw: bytes) -> str:
+    """
+    解碼 EXIF UserComment，前 8 個位元組為字元集標識
+
+    Args:
+        raw (bytes): UserComment 的原始數據
+
+    Returns:
+        str: 解碼後的文字
+    """
+    prefix, payload = raw[:8], raw[8:]
+    if prefix.startswith(b'UNICODE'):
+        # 不同寫入工具的位元組序不一致，依據零位元組的位置判斷
+        if len(payload) >= 2 and payload[0] == 0 and payload[1] != 0:
+            encoding = 'utf-16-be'
+        else:
+            encoding = 'utf-16-le'
+        return payload.decode(encoding, errors='replace').rstrip('\x00')
+    if prefix.startswith(b'ASCII') or prefix == b'\x00' * 8:
+        return _decode_text(payload)
+    return _decode_text(raw)
@@ -0,0 +1,339 @@
+"""
+可擴充的圖片元數據提示詞格式
+
+每種格式註冊一個廉價的特徵檢查（detect）與解析函數（parse），按 priority 由小到大嘗試，
+第一個特徵相符且解析成功（不返回 None）的格式決定結果。內建格式：
+
+- novelai：Software 為 NovelAI，Comment 為包含 prompt 的 JSON，Description 為純文字提示詞
+- invokeai：invokeai_metadata（3.x 以後）、sd-metadata（2.x）或 Dream 文字塊
+- comfyui：prompt 文字塊為 API 格式的節點圖，沿採樣器的 positive 連線找到實際的正向提示詞；
+  另一個 workflow 文字塊（界面用的完整節點圖，通常大得多）不會被解析
+- a1111：parameters 文字塊（JPEG 為 EXIF UserComment），取 Negative prompt / Steps 之前的部分
+- generic：以上皆不符合時的舊有規則
+
+新增格式：
+
+    @register_extractor('myformat', lambda info: 'my_key' in info, priority=50)
+    def parse_myformat(info):
+        return split_prompts(info['my_key'])
+"""
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+import json
+import re
+from utils.prompt_tokenizer import split_prompts
+
+
+class PromptExtractor(NamedTuple):
+    """一種元數據格式"""
+    name: str
+    # 只檢查鍵名或字串開頭等廉價特徵，不做完整解析
+    detect: Callable[[Dict[str, Any]], bool]
+    # 返回提示詞列表；格式不符合時返回 None，交給下一個格式
+    parse: Callable[[Dict[str, Any]], Optional[List[str]]]
+    priority: int
+
+
+_extractors: List[PromptExtractor] = []
+
+
+def register_extractor(name: str, detect: Callable[[Dict[str, Any]], bool],
+                       priority: int = 100) -> Callable:
+    """
+    註冊元數據格式的裝飾器
+
+    Args:
+        name (str): 格式名稱
+        detect (Callable[[Dict[str, Any]], bool]): 特徵檢查
+        priority (int): 嘗試順序，數字越小越先嘗試；相同時按註冊順序
+
+    Returns:
+        Callable: 裝飾器，被裝飾的解析函數保持不變
+    """
+    def decorator(parse: Callable[[Dict[str, Any]], Optional[List[str]]]):
+        _extractors.append(PromptExtractor(name, detect, parse, priority))
+        _extractors.sort(key=lambda extractor: extractor.priority)
+        return parse
+    return decorator
+
+
+def get_extractors() -> List[PromptExtractor]:
+    """返回已註冊的格式（按嘗試順序）"""
+    return list(_extractors)
+
+
+def detect_format(info: Dict[str, Any]) -> Optional[str]:
+    """
+    只做特徵檢查，返回第一個相符的格式名稱（不解析內容）
+
+    Args:
+        info (Dict[str, Any]): 圖片元數據
+
+    Returns:
+        Optional[str]: 格式名稱
+    """
+    for extractor in _extractors:
+        if extractor.detect(info):
+            return extractor.name
+    return None
+
+
+def extract_prompts_with_format(info: Dict[str, Any]) -> Tuple[Optional[str], List[str]]:
+    """
+    從圖片信息字典中取出提示詞，並返回識別出的格式
+
+    Args:
+        info (Dict[str, Any]): 圖片元數據（鍵名與 Pillow 的 img.info 一致）
+
+    Returns:
+        Tuple[Optional[str], List[str]]: （格式名稱, 提示詞列表），沒有相符的格式時為 (None, [])
+    """
+    for extractor in _extractors:
+        if not extractor.detect(info):
+            continue
+        try:
+            prompts = extractor.parse(info)
+        except (ValueError, TypeError, KeyError, AttributeError):
+            # 特徵相符但內容損壞，交給下一個格式
+            continue
+        if prompts is not None:
+            return extractor.name, prompts
+    return None, []
+
+
+def extract_prompts(info: Dict[str, Any]) -> List[str]:
+    """從圖片信息字典中取出提示詞，見 extract_prompts_with_format()"""
+    return extract_prompts_with_format(info)[1]
+
+
+def _json_object(value: Any) -> Optional[Dict[str, Any]]:
+    """解析看起來是 JSON 物件的字串，其他情況返回 None"""
+    if isinstance(value, str) and value.lstrip()[:1] == '{':
+        data = json.loads(value)
+        return data if isinstance(data, dict) else None
+    return None
+
+
+# ---- NovelAI ----
+
+def _is_novelai(info: Dict[str, Any]) -> bool:
+    return info.get('Software') == 'NovelAI'
+
+
+@register_extractor('novelai', _is_novelai, priority=10)
+def parse_novelai(info: Dict[str, Any]) -> Optional[List[str]]:
+    """Comment JSON 的 prompt 為完整提示詞，沒有時使用 Description"""
+    comment = _json_object(info.get('Comment'))
+    if comment is not None and isinstance(comment.get('prompt'), str):
+        return split_prompts(comment['prompt'])
+    description = info.get('Description')
+    if isinstance(description, str):
+        return split_prompts(description)
+    return None
+
+
+# ---- InvokeAI ----
+
+_INVOKEAI_KEYS = ('invokeai_metadata', 'sd-metadata', 'Dream')
+# InvokeAI 2.x 把反向提示詞寫在方括號中
+_INVOKEAI_NEGATIVE = re.compile(r'\[[^\]]*\]')
+
+
+def _is_invokeai(info: Dict[str, Any]) -> bool:
+    return any(key in info for key in _INVOKEAI_KEYS)
+
+
+def _invokeai_positive(text: str) -> List[str]:
+    return split_prompts(_INVOKEAI_NEGATIVE.sub('', text))
+
+
+@register_extractor('invokeai', _is_invokeai, priority=20)
+def parse_invokeai(info: Dict[str, Any]) -> Optional[List[str]]:
+    """依序嘗試 invokeai_metadata、sd-metadata 與 Dream"""
+    metadata = _json_object(info.get('invokeai_metadata'))
+    if metadata is not None:
+        prompt = metadata.get('positive_prompt', metadata.get('prompt'))
+        if isinstance(prompt, str):
+            return split_prompts(prompt)
+
+    metadata = _json_object(info.get('sd-metadata'))
+    if metadata is not None:
+        prompt = metadata.get('image', {}).get('prompt')
+        if isinstance(prompt, list):
+            # [{"prompt": "...", "weight": 1.0}, ...]
+            prompt = ','.join(part.get('prompt', '') for part in prompt if isinstance(part, dict))
+        if isinstance(prompt, str):
+            return _invokeai_positive(prompt)
+
+    dream = info.get('Dream')
+    if isinstance(dream, str) and dream.startswith('"'):
+        # "a cat [blurry]" -s 50 -S 1234 ...
+        end = dream.find('"', 1)
+        if end > 0:
+            return _invokeai_positive(dream[1:end])
+    return None
+
+
+# ---- ComfyUI ----
+
+# 文字編碼或字串節點中保存提示詞的輸入名稱
+_COMFYUI_TEXT_INPUTS = ('text', 'text_g', 'text_l', 'string', 'value', 'prompt', 'positive')
+
+
+def _is_comfyui(info: Dict[str, Any]) -> bool:
+    prompt = info.get('prompt')
+    return isinstance(prompt, str) and prompt[:1] == '{' and '"class_type"' in prompt
+
+
+def _is_link(value: Any) -> bool:
+    """API 格式中的連線為 [來源節點 id, 輸出索引]"""
+    return isinstance(value, list) and len(value) == 2 and isinstance(value[1], int)
+
+
+def _comfyui_texts(graph: Dict[str, Any], node_id: str, visited: Set[str],
+                   texts: List[str]) -> None:
+    """從節點出發沿所有輸入連線收集提示詞文字（條件合併、字串節點等都會被走訪）"""
+    if node_id in visited:
+        return
+    visited.add(node_id)
+    node = graph.get(node_id)
+    if not isinstance(node, dict):
+        return
+    for name, value in node.get('inputs', {}).items():
+        if _is_link(value):
+            _comfyui_texts(graph, str(value[0]), visited, texts)
+        elif isinstance(value, str) and name in _COMFYUI_TEXT_INPUTS:
+            texts.append(value)
+
+
+def comfyui_sampler_texts(graph: Dict[str, Any], input_name: str = 'positive') -> List[str]:
+    """
+    找出節點圖中送入採樣器 positive（或 negative）輸入的提示詞文字
+
+    Args:
+        graph (Dict[str, Any]): API 格式的節點圖（節點 id -> {class_type, inputs}）
+        input_name (str): 採樣器的輸入名稱
+
+    Returns:
+        List[str]: 提示詞文字，沒有採樣器時返回空列表
+    """
+    texts: List[str] = []
+    visited: Set[str] = set()
+    for node in graph.values():
+        if isinstance(node, dict) and _is_link(node.get('inputs', {}).get(input_name)):
+            _comfyui_texts(graph, str(node['inputs'][input_name][0]), visited, texts)
+    return texts
+
+
+def comfyui_positive_texts(graph: Dict[str, Any]) -> List[str]:
+    """
+    找出節點圖中的正向提示詞文字
+
+    Args:
+        graph (Dict[str, Any]): API 格式的節點圖
+
+    Returns:
+        List[str]: 提示詞文字；沒有採樣器時返回第一個文字編碼節點的文字
+    """
+    texts = comfyui_sampler_texts(graph, 'positive')
+    if texts:
+        return texts
+    for node in graph.values():
+        if isinstance(node, dict) and 'TextEncode' in str(node.get('class_type', '')):
+            text = node.get('inputs', {}).get('text')
+            if isinstance(text, str):
+                return [text]
+    return []
+
+
+@register_extractor('comfyui', _is_comfyui, priority=30)
+def parse_comfyui(info: Dict[str, Any]) -> Optional[List[str]]:
+    """只解析 prompt 文字塊（API 節點圖），不解析 workflow"""
+    graph = _json_object(info['prompt'])
+    if graph is None:
+        return None
+    prompts: List[str] = []
+    for text in comfyui_positive_texts(graph):
+        prompts.extend(split_prompts(text))
+    return prompts
+
+
+# ---- AUTOMATIC1111 / Forge ----
+
+_A1111_STEPS = '\nSteps: '
+
+
+def _a1111_parameters(info: Dict[str, Any]) -> Optional[str]:
+    parameters = info.get('parameters')
+    if isinstance(parameters, str):
+        return parameters
+    # JPEG / WebP 把同樣的文字寫在 EXIF UserComment
+    comment = info.get('UserComment')
+    if isinstance(comment, str) and _A1111_STEPS in comment:
+        return comment
+    return None
+
+
+def _is_a1111(info: Dict[str, Any]) -> bool:
+    return _a1111_parameters(info) is not None
+
+
+def split_a1111_parameters(parameters: str) -> Tuple[str, str, str]:
+    """
+    將 A1111 參數文字分為正向提示詞、反向提示詞與設定行
+
+    Args:
+        parameters (str): 參數文字，格式為「提示詞\\nNegative prompt: ...\\nSteps: ...」，
+            提示詞可以有多行
+
+    Returns:
+        Tuple[str, str, str]: （正向提示詞, 反向提示詞, 由 Steps: 開始的設定文字）
+    """
+    text = '\n' + parameters
+    settings = ''
+    steps = text.rfind('\nSteps: ')
+    if steps >= 0:
+        settings = text[steps + 1:]
+        text = text[:steps]
+    negative = ''
+    marker = text.find('\nNegative prompt:')
+    if marker >= 0:
+        negative = text[marker + len('\nNegative prompt:'):].strip()
+        text = text[:marker]
+    return text[1:].strip(), negative, settings
+
+
+def a1111_positive_prompt(parameters: str) -> str:
+    """取出 A1111 參數文字中的正向提示詞，見 split_a1111_parameters()"""
+    return split_a1111_parameters(parameters)[0]
+
+
+@register_extractor('a1111', _is_a1111, priority=40)
+def parse_a1111(info: Dict[str, Any]) -> Optional[List[str]]:
+    return split_prompts(a1111_positive_prompt(_a1111_parameters(info)))
+
+
+# ---- 舊有規則 ----
+
+@register_extractor('generic', lambda info: True, priority=1000)
+def parse_generic(info: Dict[str, Any]) -> Optional[List[str]]:
+    """純文字 prompt、Description JSON 與常見的 EXIF / 註解欄位"""
+    prompt = info.get('prompt')
+    if isinstance(prompt, str):
+        return split_prompts(prompt)
+    if isinstance(prompt, dict):
+        return prompt.get('prompts', [])
+
+    try:
+        description = _json_object(info.get('Description'))
+    except ValueError:
+        description = None
+    if description is not None and isinstance(description.get('prompt'), str):
+        return split_prompts(description['prompt'])
+
+    for key in ('UserComment', 'Comment', 'ImageDescription'):
+        value = info.get(key)
+        if isinstance(value, str):
+            prompts = split_prompts(value)
+            if prompts:
+                return prompts
+    return []
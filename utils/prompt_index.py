@@ -0,0 +1,256 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+import json
+import os
+import sqlite3
+import threading
+from utils.image_utils import get_txt_path, prompts_from_info, read_image_info, read_txt_prompts
+from utils.tracing import get_logger, span
+
+logger = get_logger(__name__)
+
+
+INDEX_FILENAME = '.prompt_index.sqlite'
+# 提示詞解析規則的版本；規則改變時，舊索引中的結果全部作廢並重新解析
+PARSER_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS image_prompts (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    prompts TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS txt_prompts (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    prompts TEXT NOT NULL
+);
+"""
+
+# 已開啟的索引，讓 ImageHandler 與 ListManager 共用同一個連線
+_open_indexes: Dict[str, 'PromptIndex'] = {}
+_open_indexes_lock = threading.Lock()
+
+
+def get_prompt_index(folder_path: str) -> 'PromptIndex':
+    """
+    獲取資料夾對應的提示詞索引（同一資料夾只會開啟一次）
+
+    Args:
+        folder_path (str): 圖片資料夾路徑
+
+    Returns:
+        PromptIndex: 該資料夾的提示詞索引
+    """
+    key = os.path.normcase(os.path.abspath(folder_path))
+    with _open_indexes_lock:
+        index = _open_indexes.get(key)
+        if index is None:
+            index = PromptIndex(folder_path)
+            _open_indexes[key] = index
+        return index
+
+
+class PromptIndex:
+    """
+    資料夾級別的持久化提示詞索引
+
+    以 SQLite 保存在資料夾內的 .prompt_index.sqlite，
+    以（路徑, mtime, 大小）判斷記錄是否過期：
+    未變更的檔案直接返回索引中的結果，過期的記錄才會重新解析。
+    """
+
+    def __init__(self, folder_path: str, db_path: Optional[str] = None) -> None:
+        """
+        初始化提示詞索引
+
+        Args:
+            folder_path (str): 圖片資料夾路徑
+            db_path (Optional[str]): 索引檔案路徑，預設為資料夾內的 .prompt_index.sqlite
+        """
+        self.folder_path = folder_path
+        self.db_path = db_path or os.path.join(folder_path, INDEX_FILENAME)
+        self._lock = threading.Lock()
+        self.conn = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        """開啟索引資料庫，失敗時（唯讀資料夾或檔案損壞）改用記憶體資料庫"""
+        try:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.executescript(_SCHEMA)
+        except sqlite3.DatabaseError as e:
+            logger.warning("無法開啟提示詞索引，改用記憶體索引：%s", e)
+            conn = sqlite3.connect(':memory:', check_same_thread=False)
+            conn.executescript(_SCHEMA)
+        # 索引只是快取，可以隨時重建，不需要每次提交都同步到磁碟
+        conn.execute('PRAGMA synchronous=OFF')
+        if conn.execute('PRAGMA user_version').fetchone()[0] != PARSER_VERSION:
+            conn.execute('DELETE FROM image_prompts')
+            conn.execute('DELETE FROM txt_prompts')
+            conn.execute(f'PRAGMA user_version={PARSER_VERSION}')
+            conn.commit()
+        return conn
+
+    def _key(self, path: str) -> str:
+        """將絕對路徑轉換為相對於資料夾的鍵，使資料夾搬移後索引仍然有效"""
+        return os.path.relpath(path, self.folder_path)
+
+    def _lookup(self, table: str, path: str,
+                stat: os.stat_result) -> Optional[List[str]]:
+        """查詢未過期的記錄，不存在或已過期時返回 None"""
+        row = self.conn.execute(
+            f'SELECT mtime_ns, size, prompts FROM {table} WHERE path = ?',
+            (self._key(path),)).fetchone()
+        if row and row[0] == stat.st_mtime_ns and row[1] == stat.st_size:
+            return json.loads(row[2])
+        return None
+
+    def _store(self, table: str, path: str, stat: os.stat_result,
+               prompts: List[str]) -> None:
+        """寫入或更新一條記錄"""
+        self.conn.execute(
+            f'INSERT OR REPLACE INTO {table} (path, mtime_ns, size, prompts) '
+            'VALUES (?, ?, ?, ?)',
+            (self._key(path), stat.st_mtime_ns, stat.st_size,
+             json.dumps(prompts, ensure_ascii=False)))
+        self.conn.commit()
+
+    def get_image_prompts(self, image_path: str) -> List[str]:
+        """
+        獲取圖片元數據中的提示詞，未變更的圖片不會重新解析
+
+        Args:
+            image_path (str): 圖片路徑
+
+        Returns:
+            List[str]: 提示詞列表
+        """
+        try:
+            stat = os.stat(image_path)
+        except OSError:
+            return []
+        with self._lock:
+            prompts = self._lookup('image_prompts', image_path, stat)
+            if prompts is not None:
+                return prompts
+        try:
+            with span('metadata', path=image_path):
+                prompts = prompts_from_info(read_image_info(image_path))
+        except Exception as e:
+            # 解析失敗（例如圖片仍在寫入中）不寫入索引，下次請求時重新解析
+            logger.warning("讀取圖片提示詞時發生錯誤 %s：%s", image_path, e)
+            return []
+        with self._lock:
+            self._store('image_prompts', image_path, stat, prompts)
+        return prompts
+
+    def get_txt_prompts(self, txt_path: str) -> Optional[List[str]]:
+        """
+        獲取文本文件中的提示詞，未變更的文件不會重新讀取
+
+        Args:
+            txt_path (str): 文本文件路徑
+
+        Returns:
+            Optional[List[str]]: 提示詞列表，文件不存在時返回 None
+        """
+        try:
+            stat = os.stat(txt_path)
+        except OSError:
+            self.invalidate(txt_path)
+            return None
+        with self._lock:
+            prompts = self._lookup('txt_prompts', txt_path, stat)
+            if prompts is not None:
+                return prompts
+        with span('txt_read', path=txt_path):
+            prompts = read_txt_prompts(txt_path)
+        with self._lock:
+            self._store('txt_prompts', txt_path, stat, prompts)
+        return prompts
+
+    def invalidate(self, path: str) -> None:
+        """
+        刪除某個檔案的索引記錄（例如剛寫入的文本文件）
+
+        Args:
+            path (str): 圖片或文本文件路徑
+        """
+        key = self._key(path)
+        with self._lock:
+            self.conn.execute('DELETE FROM image_prompts WHERE path = ?', (key,))
+            self.conn.execute('DELETE FROM txt_prompts WHERE path = ?', (key,))
+            self.conn.commit()
+
+    def refresh(self, image_paths: Iterable[str]) -> int:
+        """
+        增量刷新：只重新解析過期的圖片及其文本文件
+
+        Args:
+            image_paths (Iterable[str]): 圖片路徑
+
+        Returns:
+            int: 重新解析的記錄數
+        """
+        with self._lock:
+            known = {
+                table: {path: (mtime_ns, size) for path, mtime_ns, size in
+                        self.conn.execute(f'SELECT path, mtime_ns, size FROM {table}')}
+                for table in ('image_prompts', 'txt_prompts')
+            }
+
+        refreshed = 0
+        for image_path in image_paths:
+            txt_path = get_txt_path(image_path)
+            for table, path in (('image_prompts', image_path), ('txt_prompts', txt_path)):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if known[table].get(self._key(path)) == (stat.st_mtime_ns, stat.st_size):
+                    continue
+                if table == 'image_prompts':
+                    self.get_image_prompts(path)
+                else:
+                    self.get_txt_prompts(path)
+                refreshed += 1
+        return refreshed
+
+    def prune(self, image_paths: Iterable[str]) -> int:
+        """
+        刪除已不存在於資料夾中的圖片記錄
+
+        Args:
+            image_paths (Iterable[str]): 目前存在的圖片路徑
+
+        Returns:
+            int: 刪除的記錄數
+        """
+        keep_images = set()
+        keep_txts = set()
+        for image_path in image_paths:
+            keep_images.add(self._key(image_path))
+            keep_txts.add(self._key(get_txt_path(image_path)))
+
+        removed = 0
+        with self._lock:
+            for table, keep in (('image_prompts', keep_images), ('txt_prompts', keep_txts)):
+                stale = [(path,) for (path,) in
+                         self.conn.execute(f'SELECT path FROM {table}') if path not in keep]
+                self.conn.executemany(f'DELETE FROM {table} WHERE path = ?', stale)
+                removed += len(stale)
+            self.conn.commit()
+        return removed
+
+    def stats(self) -> Tuple[int, int]:
+        """返回（圖片記錄數, 文本記錄數）"""
+        with self._lock:
+            images = self.conn.execute('SELECT COUNT(*) FROM image_prompts').fetchone()[0]
+            txts = self.conn.execute('SELECT COUNT(*) FROM txt_prompts').fetchone()[0]
+        return images, txts
+
+    def close(self) -> None:
+        """關閉索引資料庫"""
+        with self._lock:
+            self.conn.close()
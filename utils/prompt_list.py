@@ -0,0 +1,133 @@
+"""
+有序且不重複的提示詞列表模型
+
+界面上每個提示詞列表的實際內容都保存在這裡，Tk 列表框只負責顯示。
+以列表保存順序、以集合判斷成員，重複檢查為 O(1)，不需要每次從控件讀回全部項目。
+"""
+from typing import Iterable, Iterator, List, Optional, Set, Union, overload
+
+
+class PromptListModel:
+    """保持插入順序、不含重複項目的提示詞列表"""
+
+    def __init__(self, items: Iterable[str] = ()) -> None:
+        """
+        初始化模型
+
+        Args:
+            items (Iterable[str]): 初始項目，重複的項目只保留第一個
+        """
+        self._items: List[str] = []
+        self._members: Set[str] = set()
+        self.extend(items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._items)
+
+    def __contains__(self, item: object) -> bool:
+        return item in self._members
+
+    @overload
+    def __getitem__(self, index: int) -> str: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[str]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[str, List[str]]:
+        return self._items[index]
+
+    def items(self) -> List[str]:
+        """返回所有項目的副本（用於保存與序列化）"""
+        return list(self._items)
+
+    def add(self, item: str) -> bool:
+        """
+        在末尾添加項目
+
+        Args:
+            item (str): 提示詞
+
+        Returns:
+            bool: 是否添加（已存在時返回 False）
+        """
+        return self.insert(len(self._items), item)
+
+    def insert(self, index: int, item: str) -> bool:
+        """
+        在索引處插入項目
+
+        Args:
+            index (int): 插入位置
+            item (str): 提示詞
+
+        Returns:
+            bool: 是否插入（已存在時返回 False）
+        """
+        if item in self._members:
+            return False
+        self._items.insert(index, item)
+        self._members.add(item)
+        return True
+
+    def extend(self, items: Iterable[str]) -> int:
+        """
+        在末尾添加多個項目，跳過已存在的項目
+
+        Args:
+            items (Iterable[str]): 提示詞
+
+        Returns:
+            int: 實際添加的數量
+        """
+        added = 0
+        for item in items:
+            if item not in self._members:
+                self._items.append(item)
+                self._members.add(item)
+                added += 1
+        return added
+
+    def pop(self, index: int) -> str:
+        """刪除並返回索引處的項目"""
+        item = self._items.pop(index)
+        self._members.discard(item)
+        return item
+
+    def delete(self, start: int, end: Optional[int] = None) -> None:
+        """
+        刪除索引範圍內（包含兩端）的項目
+
+        Args:
+            start (int): 起始索引
+            end (Optional[int]): 結束索引，省略時只刪除 start
+        """
+        end = start if end is None else end
+        for item in self._items[start:end + 1]:
+            self._members.discard(item)
+        del self._items[start:end + 1]
+
+    def remove(self, item: str) -> bool:
+        """
+        刪除指定項目
+
+        Returns:
+            bool: 是否刪除（不存在時返回 False）
+        """
+        if item not in self._members:
+            return False
+        self._items.remove(item)
+        self._members.discard(item)
+        return True
+
+    def replace(self, items: Iterable[str]) -> None:
+        """以新的項目取代全部內容"""
+        self._items = []
+        self._members = set()
+        self.extend(items)
+
+    def clear(self) -> None:
+        """清空模型"""
+        self.replace(())
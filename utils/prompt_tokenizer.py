@@ -0,0 +1,244 @@
+"""
+A1111 權重語法的提示詞分詞器
+
+split_prompts() 只在最外層的逗號、換行與 BREAK 處切分，括號、方括號、<lora:...> 與
+{a|b} 中的逗號不會切斷標籤；tokenize_prompt() 另外為每個標籤計算：
+
+- tag：正規化後的標籤，用於去重（去掉強調括號與權重、解析跳脫字元、
+  底線視為空格、小寫）
+- weight：包住整個標籤的強調括號的權重，(x) 為 1.1 倍，[x] 為 1/1.1 倍，(x:1.3) 為 1.3
+- depth：最深的括號層數
+- kind：TAG、LORA（<lora:...> 等額外網路）、EDIT（[a|b]、[a:b:0.5] 等提示詞編輯）或 BREAK
+
+沒有括號的文字直接以 str.split 切分；有括號時按逗號切開後依序追蹤未閉合的括號，
+只在不位於括號內的逗號處切分，巢狀層數沒有限制，耗時與文字長度成正比。
+每段文字的括號收支與單一標籤的權重解析結果都會被快取。
+"""
+from functools import lru_cache
+from typing import List, NamedTuple, Tuple
+import re
+
+
+KIND_TAG = 'tag'
+KIND_LORA = 'lora'
+KIND_EDIT = 'edit'
+KIND_BREAK = 'break'
+
+# A1111 的強調倍數
+ATTENTION_MULTIPLIER = 1.1
+
+# 額外網路的標籤，例如 <lora:name:0.8>、<hypernet:name:1>
+_EXTRA_NETWORKS = ('lora', 'lyco', 'lycoris', 'hypernet')
+
+# 切分時需要檢查的字元：跳脫序列與括號
+_BRACKET_SCAN = re.compile(r'\\.|[()\[\]{}<>]', re.S)
+# 以字面前綴開頭的模式比 \bBREAK\b 快得多
+_BREAK = re.compile(r'BREAK(?!\w)')
+# 標籤內部的語法字元
+_ATTENTION_CHARS = re.compile(r'[\\()\[\]]')
+_TOKEN_SCAN = re.compile(r'\\.|[()\[\]|:]', re.S)
+_EXPLICIT_WEIGHT = re.compile(r':\s*([+-]?(?:\d+\.?\d*|\.\d+))\s*$')
+_WHITESPACE = re.compile(r'\s+')
+
+
+class PromptToken(NamedTuple):
+    """一個提示詞標籤"""
+    text: str
+    tag: str
+    weight: float
+    depth: int
+    kind: str
+
+
+def split_prompts(text: str) -> List[str]:
+    """
+    將提示詞文字切分為標籤原文（BREAK 只作為分隔，不會出現在結果中）
+
+    Args:
+        text (str): 以逗號分隔的提示詞
+
+    Returns:
+        List[str]: 去除首尾空白的標籤原文，不包含空字符串
+    """
+    if 'BREAK' in text:
+        text = _BREAK.sub(',', text)
+    return _split(text)
+
+
+@lru_cache(maxsize=65536)
+def _bracket_balance(piece: str) -> Tuple[int, int]:
+    """
+    一段不含逗號的文字對未閉合括號的影響（括號不區分種類，跳脫的括號不算括號）
+
+    Returns:
+        Tuple[int, int]: （關閉之前的開括號數, 之後留下的開括號數）
+    """
+    closes = opens = 0
+    for char in _BRACKET_SCAN.findall(piece):
+        if len(char) > 1:
+            continue
+        if char in '([{<':
+            opens += 1
+        elif opens:
+            opens -= 1
+        else:
+            closes += 1
+    return closes, opens
+
+
+def _split(text: str) -> List[str]:
+    """在最外層的逗號與換行處切分"""
+    if '\n' in text:
+        text = text.replace('\n', ',')
+    pieces = text.split(',')
+    # 純標籤（最常見的情況）只需要幾次 C 層的字元搜尋
+    if '(' not in text and '[' not in text and '<' not in text and '{' not in text:
+        return list(filter(None, map(str.strip, pieces)))
+
+    # 依序追蹤未閉合的開括號（以編號表示），記錄每個逗號所在的最內層開括號，不在括號內時為 -1
+    openers: List[int] = []
+    tops: List[int] = []
+    count = 0
+    for piece in pieces:
+        closes, opens = _bracket_balance(piece)
+        if closes:
+            # 多餘的閉括號忽略
+            del openers[-closes:]
+        if opens:
+            openers.extend(range(count, count + opens))
+            count += opens
+        tops.append(openers[-1] if openers else -1)
+    tops.pop()
+    if not openers:
+        if max(tops, default=-1) < 0:
+            return list(filter(None, map(str.strip, pieces)))
+        cuts = [i for i, top in enumerate(tops) if top < 0]
+    else:
+        # 到結尾仍未閉合的括號視為普通文字，其中的逗號照常切分，不會吞掉之後的標籤
+        unclosed = set(openers)
+        cuts = [i for i, top in enumerate(tops) if top < 0 or top in unclosed]
+
+    parts: List[str] = []
+    start = 0
+    for i in cuts:
+        parts.append(','.join(pieces[start:i + 1]))
+        start = i + 1
+    parts.append(','.join(pieces[start:]))
+    return list(filter(None, map(str.strip, parts)))
+
+
+def tokenize_prompt(text: str) -> List[PromptToken]:
+    """
+    將提示詞文字切分並解析為標籤
+
+    Args:
+        text (str): 提示詞文字
+
+    Returns:
+        List[PromptToken]: 按原順序排列的標籤，BREAK 以 kind 為 KIND_BREAK 的項目表示
+    """
+    if 'BREAK' in text:
+        text = _BREAK.sub(',BREAK,', text)
+    return [parse_token(p) for p in _split(text)]
+
+
+def canonical_tag(text: str) -> str:
+    """返回標籤原文的正規化形式，見 parse_token()"""
+    return parse_token(text).tag
+
+
+def _normalize(text: str) -> str:
+    return _WHITESPACE.sub(' ', text.replace('_', ' ')).strip().lower()
+
+
+@lru_cache(maxsize=65536)
+def parse_token(text: str) -> PromptToken:
+    """
+    解析單一標籤的原文（結果會被快取，同一標籤在大量圖片中重複出現時不會重複解析）
+
+    Args:
+        text (str): 不含頂層逗號的標籤原文
+
+    Returns:
+        PromptToken: 解析結果
+    """
+    text = text.strip()
+    if text == 'BREAK':
+        return PromptToken(text, 'BREAK', 1.0, 0, KIND_BREAK)
+    if text[:1] == '<' and text[-1:] == '>':
+        fields = text[1:-1].split(':')
+        if len(fields) >= 2 and fields[0].strip().lower() in _EXTRA_NETWORKS:
+            network = fields[0].strip().lower()
+            weight = _to_weight(fields[2]) if len(fields) > 2 else 1.0
+            return PromptToken(text, f"<{network}:{fields[1].strip().lower()}>",
+                               weight, 1, KIND_LORA)
+    if _ATTENTION_CHARS.search(text) is None:
+        return PromptToken(text, _normalize(text), 1.0, 0, KIND_TAG)
+    tag, weight, depth, edited = _parse_attention(text)
+    return PromptToken(text, _normalize(tag), weight, depth, KIND_EDIT if edited else KIND_TAG)
+
+
+def _to_weight(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return 1.0
+
+
+def _parse_attention(text: str) -> Tuple[str, float, int, bool]:
+    """
+    單次掃描解析強調語法
+
+    Returns:
+        Tuple[str, float, int, bool]: （去除強調語法的文字, 包住整個標籤的權重, 最深層數, 是否含提示詞編輯）
+    """
+    out: List[str] = []
+    # 每層：[開括號, 開括號在原文中的位置, 該層文字在 out 中的起點, 層內是否出現 | 或 :]
+    stack: List[list] = []
+    # 已閉合的強調層：(開括號位置, 閉括號位置, 倍數)
+    groups: List[Tuple[int, int, float]] = []
+    depth = 0
+    edited = False
+    pos = 0
+    for match in _TOKEN_SCAN.finditer(text):
+        out.append(text[pos:match.start()])
+        pos = match.end()
+        char = match.group()
+        if char[0] == '\\':
+            out.append(char[1])
+        elif char in '([':
+            stack.append([char, match.start(), len(out), False])
+            depth = max(depth, len(stack))
+        elif char in '|:':
+            out.append(char)
+            if stack:
+                stack[-1][3] = True
+        elif stack and (char == ')') == (stack[-1][0] == '('):
+            bracket, start, out_start, has_separator = stack.pop()
+            inner = ''.join(out[out_start:])
+            del out[out_start:]
+            if bracket == '[' and has_separator:
+                # [a|b] 與 [a:b:0.5] 是提示詞編輯，保留原樣，權重不變
+                edited = True
+                out.append(f"[{inner}]")
+                continue
+            multiplier = 1 / ATTENTION_MULTIPLIER if bracket == '[' else ATTENTION_MULTIPLIER
+            weight_match = _EXPLICIT_WEIGHT.search(inner) if bracket == '(' else None
+            if weight_match:
+                multiplier = float(weight_match.group(1))
+                inner = inner[:weight_match.start()]
+            out.append(inner)
+            groups.append((start, match.start(), multiplier))
+        else:
+            # 不成對的括號視為普通文字
+            out.append(char)
+    out.append(text[pos:])
+
+    # 包住整個標籤的層：開括號位於開頭連續的括號中，閉括號位於結尾連續的括號中
+    lead = len(text) - len(text.lstrip('(['))
+    trail = len(text.rstrip(')]'))
+    weight = 1.0
+    for start, end, multiplier in groups:
+        if start < lead and end >= trail:
+            weight *= multiplier
+    return ''.join(out), round(weight, 4), depth, edited
@@ -0,0 +1,215 @@
+"""
+Gemini 請求的客戶端限流與重試
+
+- TokenBucket：以預約方式扣除令牌的令牌桶，餘額可以為負，
+  每個請求按到達順序得到自己的等待時間，因此排隊的請求會以配額上限的速度依次送出
+- RateLimiter：同時限制每分鐘請求數（RPM）與每分鐘令牌數（TPM），
+  遇到 429 時暫停所有排隊中的請求，避免每個請求各自重試而持續觸發限制
+- RetryPolicy：指數退避加上隨機抖動（full jitter）
+"""
+from typing import Any, Callable, Iterable, NamedTuple, Optional
+import math
+import os
+import random
+import threading
+import time
+from utils.tracing import get_logger
+
+logger = get_logger(__name__)
+
+
+# 可重試的 HTTP 狀態碼：限流與暫時性的伺服器錯誤
+RETRYABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+# 單張圖片的令牌估計：上傳的圖片最長邊預設為 1024，約為 4 個 768x768 區塊，每塊 258 個令牌
+IMAGE_TOKEN_ESTIMATE = 4 * 258
+
+
+def estimate_tokens(contents: Iterable[Any]) -> int:
+    """
+    粗略估計請求的輸入令牌數：文字約每 4 個字元一個令牌，圖片按固定值估計
+
+    Args:
+        contents (Iterable[Any]): 請求內容
+
+    Returns:
+        int: 估計的令牌數
+    """
+    tokens = 0
+    for content in contents:
+        if isinstance(content, str):
+            tokens += math.ceil(len(content) / 4)
+        else:
+            tokens += IMAGE_TOKEN_ESTIMATE
+    return tokens
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    """從 API 錯誤中取出 HTTP 狀態碼（google.genai.errors.APIError 為 code 屬性）"""
+    for attr in ('code', 'status_code'):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    判斷錯誤是否值得重試
+
+    Args:
+        error (BaseException): 請求時拋出的錯誤
+
+    Returns:
+        bool: 限流、暫時性伺服器錯誤或連線問題時返回 True
+    """
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    return status_code(error) in RETRYABLE_STATUS_CODES
+
+
+class RetryPolicy(NamedTuple):
+    """重試策略：第 n 次重試前等待 0 到 min(max_delay, base_delay * 2^n) 之間的隨機時間"""
+    max_retries: int = 5
+    base_delay: float = 1.0
+    max_delay: float = 32.0
+
+    def delay(self, attempt: int, rng: Callable[[float, float], float] = random.uniform) -> float:
+        """
+        計算第 attempt 次重試（從 0 開始）前的等待時間
+
+        Args:
+            attempt (int): 已失敗的次數減一
+            rng (Callable[[float, float], float]): 隨機數函數，測試時可替換
+
+        Returns:
+            float: 等待秒數
+        """
+        return rng(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class TokenBucket:
+    """
+    預約式令牌桶
+
+    reserve() 立即扣除令牌並返回需要等待的秒數，餘額為負時代表已被預約的未來配額。
+    補充速度設為 (limit - burst) / 60，使任意一分鐘內送出的量都不超過 limit。
+    """
+
+    def __init__(self, limit_per_minute: float, burst: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        初始化令牌桶
+
+        Args:
+            limit_per_minute (float): 每分鐘上限
+            burst (Optional[float]): 可瞬間消耗的令牌數，預設為一秒的配額（至少 1）
+            clock (Callable[[], float]): 時鐘函數，測試時可替換
+        """
+        self.capacity = burst if burst is not None else max(1.0, limit_per_minute / 60)
+        self.rate = max(limit_per_minute - self.capacity, 1e-9) / 60
+        self.clock = clock
+        self.level = self.capacity
+        self.updated = clock()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, tokens: float = 1) -> float:
+        """
+        預約令牌
+
+        Args:
+            tokens (float): 需要的令牌數
+
+        Returns:
+            float: 需要等待的秒數
+        """
+        now = self.clock()
+        self._refill(now)
+        self.level -= tokens
+        return max(0.0, -self.level / self.rate)
+
+    def adjust(self, tokens: float) -> None:
+        """
+        修正已預約的令牌數（實際用量小於估計時為正數，歸還差額）
+
+        Args:
+            tokens (float): 歸還（正數）或追加扣除（負數）的令牌數
+        """
+        self._refill(self.clock())
+        self.level = min(self.capacity, self.level + tokens)
+
+
+class RateLimiter:
+    """同時限制 RPM 與 TPM 的限流器，可在多個執行緒與事件循環之間共用"""
+
+    def __init__(self, rpm: float, tpm: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        初始化限流器
+
+        Args:
+            rpm (float): 每分鐘請求數上限
+            tpm (Optional[float]): 每分鐘輸入令牌數上限，None 表示不限制
+            clock (Callable[[], float]): 時鐘函數，測試時可替換
+        """
+        self.clock = clock
+        self.requests = TokenBucket(rpm, clock=clock)
+        self.tokens = TokenBucket(tpm, burst=tpm / 60, clock=clock) if tpm else None
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'RateLimiter':
+        """
+        從環境變量 GEMINI_RPM 與 GEMINI_TPM 建立限流器，預設為免費方案的 15 RPM、1,000,000 TPM
+
+        Returns:
+            RateLimiter: 限流器
+        """
+        try:
+            rpm = float(os.getenv('GEMINI_RPM', 15))
+            tpm = float(os.getenv('GEMINI_TPM', 1_000_000))
+        except ValueError:
+            logger.warning("GEMINI_RPM / GEMINI_TPM 必須是數字，使用預設值")
+            rpm, tpm = 15, 1_000_000
+        return cls(rpm, tpm)
+
+    def reserve(self, tokens: int = 0) -> float:
+        """
+        為一個請求預約配額
+
+        Args:
+            tokens (int): 估計的輸入令牌數
+
+        Returns:
+            float: 送出請求前需要等待的秒數
+        """
+        with self._lock:
+            wait = self.requests.reserve(1)
+            if self.tokens is not None and tokens:
+                wait = max(wait, self.tokens.reserve(tokens))
+            return max(wait, self.blocked_until - self.clock())
+
+    def adjust_tokens(self, tokens: int) -> None:
+        """以實際用量修正令牌預約，正數表示歸還"""
+        if self.tokens is not None and tokens:
+            with self._lock:
+                self.tokens.adjust(tokens)
+
+    def blocked_for(self) -> float:
+        """返回暫停還剩下的秒數，已預約配額的請求在送出前應再次檢查"""
+        with self._lock:
+            return max(0.0, self.blocked_until - self.clock())
+
+    def pause(self, seconds: float) -> None:
+        """
+        在收到限流錯誤後暫停所有請求
+
+        Args:
+            seconds (float): 從現在起暫停的秒數
+        """
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, self.clock() + seconds)
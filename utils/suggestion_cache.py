@@ -0,0 +1,258 @@
+"""
+Gemini 建議的內容定址快取
+
+以（圖片內容雜湊, 排序後的暫存提示詞, 模型名稱, 生成配置）的 SHA-256 為鍵，
+把模型返回的建議保存在 SQLite 中。同一張圖片與同一組暫存提示詞再次請求時直接返回，
+不再消耗延遲與配額。記錄超過有效期（TTL）即視為未命中，
+總大小超過上限時按最近使用時間淘汰最舊的記錄。
+"""
+from typing import Any, Dict, Iterable, List, Optional
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from PIL import Image
+from utils.tracing import get_logger
+
+logger = get_logger(__name__)
+
+
+CACHE_FILENAME = 'gemini_cache.sqlite'
+
+# 讀取圖片文件計算雜湊時的區塊大小
+_HASH_CHUNK_SIZE = 1 << 20
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS suggestions (
+    key TEXT PRIMARY KEY,
+    suggestions TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS suggestions_accessed ON suggestions (accessed);
+"""
+
+
+def default_cache_path() -> str:
+    """
+    預設的快取檔案路徑：環境變量 PROMPT_READER_CACHE_DIR 指定的資料夾，
+    否則為使用者目錄下的 .cache/prompt_reader
+
+    Returns:
+        str: 快取檔案路徑
+    """
+    cache_dir = os.getenv('PROMPT_READER_CACHE_DIR') or os.path.join(
+        os.path.expanduser('~'), '.cache', 'prompt_reader')
+    return os.path.join(cache_dir, CACHE_FILENAME)
+
+
+def hash_image_file(image_path: str) -> str:
+    """
+    計算圖片文件內容的雜湊（不需解碼圖片）
+
+    Args:
+        image_path (str): 圖片路徑
+
+    Returns:
+        str: 十六進位的 SHA-256
+    """
+    digest = hashlib.sha256()
+    with open(image_path, 'rb') as f:
+        while True:
+            chunk = f.read(_HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_image_pixels(img: Image.Image) -> str:
+    """
+    計算已解碼圖片的像素雜湊（包含模式與尺寸）
+
+    Args:
+        img (Image.Image): 圖片物件
+
+    Returns:
+        str: 十六進位的 SHA-256
+    """
+    digest = hashlib.sha256(f"{img.mode}:{img.size[0]}x{img.size[1]}:".encode('ascii'))
+    digest.update(img.tobytes())
+    return digest.hexdigest()
+
+
+def hash_image(img: Image.Image) -> str:
+    """
+    計算圖片的快取雜湊，由文件打開的圖片與 hash_image_file() 相同（不需讀取像素），
+    沒有對應文件的圖片才計算像素雜湊
+
+    Args:
+        img (Image.Image): 圖片物件
+
+    Returns:
+        str: 十六進位的 SHA-256
+    """
+    filename = getattr(img, 'filename', None)
+    if filename and os.path.isfile(filename):
+        return hash_image_file(filename)
+    return hash_image_pixels(img)
+
+
+def make_cache_key(image_hash: str, temp_prompts: Iterable[str], model: str,
+                   config: Dict[str, Any]) -> str:
+    """
+    組合快取鍵，暫存提示詞的順序不影響結果
+
+    Args:
+        image_hash (str): 圖片雜湊
+        temp_prompts (Iterable[str]): 暫存提示詞
+        model (str): 模型名稱
+        config (Dict[str, Any]): 生成配置
+
+    Returns:
+        str: 十六進位的 SHA-256
+    """
+    payload = json.dumps([image_hash, sorted(temp_prompts), model, config],
+                         ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class SuggestionCache:
+    """
+    持久化的 Gemini 建議快取
+
+    以 hits / misses / evictions 計數器統計命中率，可由 stats() 查詢。
+    """
+
+    def __init__(self, db_path: Optional[str] = None, ttl: float = 7 * 24 * 3600,
+                 max_bytes: int = 16 * 1024 * 1024) -> None:
+        """
+        初始化快取
+
+        Args:
+            db_path (Optional[str]): 快取檔案路徑，預設為 default_cache_path()
+            ttl (float): 記錄的有效期（秒），0 表示永不過期
+            max_bytes (int): 所有記錄的總大小上限（位元組）
+        """
+        self.db_path = db_path or default_cache_path()
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self.conn = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        """開啟快取資料庫，失敗時改用記憶體資料庫"""
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.executescript(_SCHEMA)
+        except (OSError, sqlite3.DatabaseError) as e:
+            logger.warning("無法開啟建議快取，改用記憶體快取：%s", e)
+            conn = sqlite3.connect(':memory:', check_same_thread=False)
+            conn.executescript(_SCHEMA)
+        # 快取遺失只會多一次請求，不需要每次提交都同步到磁碟
+        conn.execute('PRAGMA synchronous=OFF')
+        return conn
+
+    def get(self, key: str) -> Optional[List[str]]:
+        """
+        查詢快取
+
+        Args:
+            key (str): make_cache_key() 返回的鍵
+
+        Returns:
+            Optional[List[str]]: 建議列表，未命中或已過期時返回 None
+        """
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT suggestions, created FROM suggestions WHERE key = ?',
+                (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if self.ttl and now - row[1] > self.ttl:
+                self.conn.execute('DELETE FROM suggestions WHERE key = ?', (key,))
+                self.conn.commit()
+                self.misses += 1
+                self.evictions += 1
+                return None
+            self.conn.execute(
+                'UPDATE suggestions SET accessed = ? WHERE key = ?', (now, key))
+            self.conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, suggestions: List[str]) -> None:
+        """
+        寫入快取，總大小超過上限時淘汰最久未使用的記錄
+
+        Args:
+            key (str): make_cache_key() 返回的鍵
+            suggestions (List[str]): 建議列表
+        """
+        value = json.dumps(suggestions, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO suggestions (key, suggestions, size, created, accessed) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (key, value, len(key) + len(value.encode('utf-8')), now, now))
+            self._evict(now)
+            self.conn.commit()
+
+    def _evict(self, now: float) -> None:
+        """刪除過期記錄，再按最近使用時間淘汰直到總大小不超過上限（須持有鎖）"""
+        if self.ttl:
+            cursor = self.conn.execute(
+                'DELETE FROM suggestions WHERE created < ?', (now - self.ttl,))
+            self.evictions += cursor.rowcount
+        total = self.conn.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM suggestions').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        stale = []
+        for key, size in self.conn.execute(
+                'SELECT key, size FROM suggestions ORDER BY accessed'):
+            if total <= self.max_bytes:
+                break
+            stale.append((key,))
+            total -= size
+        self.conn.executemany('DELETE FROM suggestions WHERE key = ?', stale)
+        self.evictions += len(stale)
+
+    def hit_rate(self) -> float:
+        """返回命中率（0 到 1）"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> Dict[str, int]:
+        """返回命中、未命中、淘汰次數以及目前的記錄數與總大小"""
+        with self._lock:
+            entries, total = self.conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM suggestions').fetchone()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': entries,
+            'bytes': total,
+        }
+
+    def clear(self) -> None:
+        """清空快取"""
+        with self._lock:
+            self.conn.execute('DELETE FROM suggestions')
+            self.conn.commit()
+
+    def close(self) -> None:
+        """關閉快取資料庫"""
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,241 @@
+"""
+提示詞倒排索引
+
+從正規化的提示詞映射到包含它的圖片索引，支援 AND / OR / NOT 與括號的查詢，
+例如 "1girl AND NOT watermark"、"(cat OR dog) AND smile"。
+
+每個提示詞的出現位置以緊湊的 array('I') 保存，查詢時轉換為以 Python 整數表示的
+位圖（第 i 位代表第 i 張圖片）並快取，集合運算只需幾次大整數位運算。
+"""
+from typing import Callable, Dict, Iterable, List, Tuple
+from array import array
+from itertools import compress
+import re
+from utils.prompt_tokenizer import KIND_BREAK, parse_token
+
+
+QUERY_OPERATORS = ('AND', 'OR', 'NOT')
+
+_QUERY_TOKEN_RE = re.compile(r'\s*(?:(\()|(\))|"([^"]*)"|([^\s()"]+))')
+
+# 將 b'0' / b'1' 轉換為 0 / 1 的位元組對照表
+_BIT_SELECTORS = bytes.maketrans(b'01', b'\x00\x01')
+
+
+def normalize_tag(tag: str) -> str:
+    """
+    正規化提示詞，與標籤統計相同（prompt_tokenizer.canonical_tag()）：
+    去掉注意力括號與權重、轉為小寫、底線視為空格並合併連續空白，BREAK 視為空提示詞
+
+    Args:
+        tag (str): 原始提示詞
+
+    Returns:
+        str: 正規化後的提示詞
+    """
+    token = parse_token(tag)
+    return '' if token.kind == KIND_BREAK else token.tag
+
+
+class TagQueryError(ValueError):
+    """查詢語法錯誤"""
+
+
+class TagIndex:
+    """提示詞到圖片索引的倒排索引"""
+
+    def __init__(self) -> None:
+        self.size = 0
+        self._postings: Dict[str, array] = {}
+        self._bitmaps: Dict[str, int] = {}
+
+    @classmethod
+    def build(cls, image_paths: List[str],
+              get_tags: Callable[[str], Iterable[str]]) -> 'TagIndex':
+        """
+        為圖片列表建立索引
+
+        Args:
+            image_paths (List[str]): 圖片路徑（列表中的位置即圖片索引）
+            get_tags (Callable[[str], Iterable[str]]): 返回單張圖片提示詞的函數
+
+        Returns:
+            TagIndex: 建立好的索引
+        """
+        index = cls()
+        for i, image_path in enumerate(image_paths):
+            index.add(i, get_tags(image_path))
+        return index
+
+    def add(self, image_index: int, tags: Iterable[str]) -> None:
+        """
+        添加一張圖片的提示詞（圖片索引須遞增添加）
+
+        Args:
+            image_index (int): 圖片索引
+            tags (Iterable[str]): 提示詞
+        """
+        for tag in {normalize_tag(t) for t in tags}:
+            if not tag:
+                continue
+            postings = self._postings.get(tag)
+            if postings is None:
+                postings = self._postings[tag] = array('I')
+            postings.append(image_index)
+            self._bitmaps.pop(tag, None)
+        self.size = max(self.size, image_index + 1)
+
+    def tags(self) -> List[str]:
+        """返回所有已索引的提示詞"""
+        return list(self._postings)
+
+    def count(self, tag: str) -> int:
+        """返回包含某提示詞的圖片數"""
+        postings = self._postings.get(normalize_tag(tag))
+        return len(postings) if postings is not None else 0
+
+    def bitmap(self, tag: str) -> int:
+        """
+        返回提示詞的位圖（第 i 位為 1 表示第 i 張圖片包含該提示詞）
+
+        Args:
+            tag (str): 提示詞
+
+        Returns:
+            int: 位圖
+        """
+        tag = normalize_tag(tag)
+        bitmap = self._bitmaps.get(tag)
+        if bitmap is None:
+            postings = self._postings.get(tag)
+            if not postings:
+                return 0
+            bits = bytearray((self.size + 7) // 8)
+            for i in postings:
+                bits[i >> 3] |= 1 << (i & 7)
+            bitmap = self._bitmaps[tag] = int.from_bytes(bits, 'little')
+        return bitmap
+
+    def query_bitmap(self, query: str) -> int:
+        """
+        執行查詢並返回結果位圖
+
+        Args:
+            query (str): 查詢語句，運算子優先順序為 NOT > AND > OR，
+                相鄰的詞視為同一個多詞提示詞（例如 long hair），可用引號括起
+
+        Returns:
+            int: 結果位圖
+        """
+        parser = _QueryParser(self, query)
+        return parser.parse()
+
+    def query(self, query: str) -> List[int]:
+        """
+        執行查詢並返回排序後的圖片索引
+
+        Args:
+            query (str): 查詢語句
+
+        Returns:
+            List[int]: 符合條件的圖片索引
+        """
+        return bitmap_to_indices(self.query_bitmap(query))
+
+
+def bitmap_to_indices(bitmap: int) -> List[int]:
+    """將位圖轉換為排序後的索引列表"""
+    if not bitmap:
+        return []
+    # 反轉二進位字串後，第 i 個字元就是第 i 位；轉為 0/1 位元組後全部交給 C 層篩選
+    selectors = bin(bitmap)[:1:-1].encode('ascii').translate(_BIT_SELECTORS)
+    return list(compress(range(len(selectors)), selectors))
+
+
+class _QueryParser:
+    """遞迴下降的查詢解析器，邊解析邊以位圖求值"""
+
+    def __init__(self, index: TagIndex, query: str) -> None:
+        self.index = index
+        self.all_bits = (1 << index.size) - 1
+        self.tokens = self._tokenize(query)
+        self.pos = 0
+
+    @staticmethod
+    def _tokenize(query: str) -> List[Tuple[str, str]]:
+        """將查詢切分為（類型, 值），類型為 'op'、'(', ')' 或 'tag'"""
+        tokens: List[Tuple[str, str]] = []
+        # 上一個提示詞是否為未加引號的詞，相鄰的詞會合併為多詞提示詞（例如 long hair）
+        merge_words = False
+        pos = 0
+        query = query.strip()
+        while pos < len(query):
+            match = _QUERY_TOKEN_RE.match(query, pos)
+            if not match:
+                raise TagQueryError(f"無法解析的查詢：{query[pos:]}")
+            pos = match.end()
+            lparen, rparen, quoted, word = match.groups()
+            if lparen or rparen:
+                tokens.append((lparen or rparen, ''))
+                merge_words = False
+            elif quoted is not None:
+                tokens.append(('tag', quoted))
+                merge_words = False
+            elif word in QUERY_OPERATORS:
+                tokens.append(('op', word))
+                merge_words = False
+            elif merge_words:
+                tokens[-1] = ('tag', tokens[-1][1] + ' ' + word)
+            else:
+                tokens.append(('tag', word))
+                merge_words = True
+        return tokens
+
+    def _peek(self) -> Tuple[str, str]:
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        return ('end', '')
+
+    def _accept(self, kind: str, value: str = '') -> bool:
+        """下一個記號符合時將其消耗並返回 True"""
+        if self._peek() == (kind, value):
+            self.pos += 1
+            return True
+        return False
+
+    def parse(self) -> int:
+        if not self.tokens:
+            raise TagQueryError("查詢為空")
+        result = self._parse_or()
+        if self._peek()[0] != 'end':
+            raise TagQueryError(f"多餘的內容：{self._peek()[1] or self._peek()[0]}")
+        return result
+
+    def _parse_or(self) -> int:
+        result = self._parse_and()
+        while self._accept('op', 'OR'):
+            result |= self._parse_and()
+        return result
+
+    def _parse_and(self) -> int:
+        result = self._parse_not()
+        while self._accept('op', 'AND'):
+            result &= self._parse_not()
+        return result
+
+    def _parse_not(self) -> int:
+        if self._accept('op', 'NOT'):
+            return self.all_bits & ~self._parse_not()
+        return self._parse_atom()
+
+    def _parse_atom(self) -> int:
+        if self._accept('('):
+            result = self._parse_or()
+            if not self._accept(')'):
+                raise TagQueryError("缺少右括號")
+            return result
+        kind, value = self._peek()
+        if kind != 'tag':
+            raise TagQueryError(f"預期提示詞，但得到：{value or kind}")
+        self.pos += 1
+        return self.index.bitmap(value)
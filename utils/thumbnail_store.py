@@ -0,0 +1,281 @@
+"""
+持久化的縮略圖儲存與多進程生成
+
+縮略圖以 JPEG 位元組保存在資料夾內 .thumbnails.sqlite 的 BLOB 欄位中，
+以（相對路徑, mtime, 大小）判斷是否過期；缺少的縮略圖交給進程池生成，
+結果回到主執行緒後寫入資料庫。第一次瀏覽之後，同一資料夾的縮略圖都直接從資料庫讀取。
+"""
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from concurrent.futures import Future, ProcessPoolExecutor
+import io
+import os
+import sqlite3
+import threading
+from PIL import Image
+from utils.tracing import get_logger
+
+logger = get_logger(__name__)
+
+
+THUMBNAIL_DB_FILENAME = '.thumbnails.sqlite'
+THUMBNAIL_SIZE = 128
+THUMBNAIL_QUALITY = 80
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS thumbnails (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+"""
+
+# （圖片路徑, mtime_ns, 檔案大小, JPEG 位元組）
+ThumbnailRecord = Tuple[str, int, int, bytes]
+
+_open_stores: Dict[str, 'ThumbnailStore'] = {}
+_open_stores_lock = threading.Lock()
+
+
+def get_thumbnail_store(folder_path: str) -> 'ThumbnailStore':
+    """
+    獲取資料夾對應的縮略圖儲存（同一資料夾只會開啟一次）
+
+    Args:
+        folder_path (str): 圖片資料夾路徑
+
+    Returns:
+        ThumbnailStore: 該資料夾的縮略圖儲存
+    """
+    key = os.path.normcase(os.path.abspath(folder_path))
+    with _open_stores_lock:
+        store = _open_stores.get(key)
+        if store is None:
+            store = ThumbnailStore(folder_path)
+            _open_stores[key] = store
+        return store
+
+
+def make_thumbnail(image_path: str, size: int = THUMBNAIL_SIZE) -> Optional[ThumbnailRecord]:
+    """
+    生成單張圖片的縮略圖（在工作進程中執行）
+
+    JPEG 直接以縮小的比例解碼，其他格式先以 reduce() 整數倍縮小再重採樣。
+
+    Args:
+        image_path (str): 圖片路徑
+        size (int): 縮略圖最長邊
+
+    Returns:
+        Optional[ThumbnailRecord]: 縮略圖記錄，無法讀取時返回 None
+    """
+    try:
+        stat = os.stat(image_path)
+        with Image.open(image_path) as img:
+            img.draft('RGB', (size * 2, size * 2))
+            if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+                # 與顯示時相同，透明部分合成到白色背景上
+                rgba = img.convert('RGBA')
+                thumb = Image.new('RGB', rgba.size, 'white')
+                thumb.paste(rgba, mask=rgba.getchannel('A'))
+            else:
+                thumb = img.convert('RGB')
+        factor = min(thumb.width, thumb.height) // (size * 2)
+        if factor > 1:
+            thumb = thumb.reduce(factor)
+        thumb.thumbnail((size, size), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        thumb.save(buffer, format='JPEG', quality=THUMBNAIL_QUALITY)
+        return image_path, stat.st_mtime_ns, stat.st_size, buffer.getvalue()
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        logger.warning("無法生成縮略圖 %s：%s", image_path, e)
+        return None
+
+
+def make_thumbnails(image_paths: Sequence[str], size: int = THUMBNAIL_SIZE) -> List[ThumbnailRecord]:
+    """批次生成縮略圖（在工作進程中執行），跳過無法讀取的圖片"""
+    return [record for record in (make_thumbnail(path, size) for path in image_paths)
+            if record is not None]
+
+
+class ThumbnailStore:
+    """資料夾級別的縮略圖資料庫"""
+
+    def __init__(self, folder_path: str, db_path: Optional[str] = None) -> None:
+        """
+        初始化縮略圖儲存
+
+        Args:
+            folder_path (str): 圖片資料夾路徑
+            db_path (Optional[str]): 資料庫路徑，預設為資料夾內的 .thumbnails.sqlite
+        """
+        self.folder_path = folder_path
+        self.db_path = db_path or os.path.join(folder_path, THUMBNAIL_DB_FILENAME)
+        self._lock = threading.Lock()
+        self.conn = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        """開啟資料庫，失敗時（唯讀資料夾或檔案損壞）改用記憶體資料庫"""
+        try:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.executescript(_SCHEMA)
+        except sqlite3.DatabaseError as e:
+            logger.warning("無法開啟縮略圖資料庫，改用記憶體資料庫：%s", e)
+            conn = sqlite3.connect(':memory:', check_same_thread=False)
+            conn.executescript(_SCHEMA)
+        # 縮略圖可以隨時重新生成，不需要每次提交都同步到磁碟
+        conn.execute('PRAGMA synchronous=OFF')
+        return conn
+
+    def _key(self, path: str) -> str:
+        """將絕對路徑轉換為相對於資料夾的鍵，使資料夾搬移後仍然有效"""
+        return os.path.relpath(path, self.folder_path)
+
+    def get_many(self, image_paths: Iterable[str]) -> Dict[str, bytes]:
+        """
+        讀取多張圖片未過期的縮略圖
+
+        Args:
+            image_paths (Iterable[str]): 圖片路徑
+
+        Returns:
+            Dict[str, bytes]: 圖片路徑到 JPEG 位元組的字典，缺少或過期的圖片不在其中
+        """
+        stats = {}
+        for path in image_paths:
+            try:
+                stats[self._key(path)] = (path, os.stat(path))
+            except OSError:
+                continue
+        if not stats:
+            return {}
+
+        keys = list(stats)
+        placeholders = ','.join('?' * len(keys))
+        with self._lock:
+            rows = self.conn.execute(
+                f'SELECT path, mtime_ns, size, data FROM thumbnails WHERE path IN ({placeholders})',
+                keys).fetchall()
+
+        result = {}
+        for key, mtime_ns, size, data in rows:
+            path, stat = stats[key]
+            if mtime_ns == stat.st_mtime_ns and size == stat.st_size:
+                result[path] = data
+        return result
+
+    def put_many(self, records: Iterable[ThumbnailRecord]) -> None:
+        """
+        寫入縮略圖
+
+        Args:
+            records (Iterable[ThumbnailRecord]): make_thumbnail() 返回的記錄
+        """
+        rows = [(self._key(path), mtime_ns, size, sqlite3.Binary(data))
+                for path, mtime_ns, size, data in records]
+        if not rows:
+            return
+        with self._lock:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO thumbnails (path, mtime_ns, size, data) '
+                'VALUES (?, ?, ?, ?)', rows)
+            self.conn.commit()
+
+    def count(self) -> int:
+        """返回資料庫中的縮略圖數"""
+        with self._lock:
+            return self.conn.execute('SELECT COUNT(*) FROM thumbnails').fetchone()[0]
+
+    def close(self) -> None:
+        """關閉資料庫"""
+        with self._lock:
+            self.conn.close()
+
+
+class ThumbnailGenerator:
+    """
+    以進程池生成縮略圖
+
+    request() 把缺少的縮略圖排入佇列（先到先處理，可插隊到最前面），
+    每次最多有 max_pending 批在進程池中；主執行緒定期調用 collect() 取回完成的記錄。
+    """
+
+    def __init__(self, size: int = THUMBNAIL_SIZE, workers: Optional[int] = None,
+                 batch_size: int = 16, max_pending: Optional[int] = None) -> None:
+        """
+        初始化生成器
+
+        Args:
+            size (int): 縮略圖最長邊
+            workers (Optional[int]): 工作進程數，預設為 CPU 核心數
+            batch_size (int): 每次交給工作進程的圖片數
+            max_pending (Optional[int]): 同時在進程池中的批數上限，預設為工作進程數的兩倍
+        """
+        self.size = size
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.max_pending = max_pending or self.workers * 2
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.queue: List[str] = []
+        self.requested: set = set()
+        self.pending: List[Future] = []
+
+    def request(self, image_paths: Iterable[str], urgent: bool = False) -> None:
+        """
+        要求生成縮略圖，已在佇列或正在生成的圖片會被略過
+
+        Args:
+            image_paths (Iterable[str]): 圖片路徑
+            urgent (bool): 是否排到佇列最前面（例如當前可見的圖片）
+        """
+        new_paths = [path for path in image_paths if path not in self.requested]
+        self.requested.update(new_paths)
+        if urgent:
+            self.queue[:0] = new_paths
+        else:
+            self.queue.extend(new_paths)
+        self._submit()
+
+    def _submit(self) -> None:
+        """在進程池未滿時提交新的批次"""
+        while self.queue and len(self.pending) < self.max_pending:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            batch = self.queue[:self.batch_size]
+            del self.queue[:self.batch_size]
+            self.pending.append(self.executor.submit(make_thumbnails, batch, self.size))
+
+    def collect(self) -> List[ThumbnailRecord]:
+        """
+        取回已完成的縮略圖，並補充提交新的批次
+
+        Returns:
+            List[ThumbnailRecord]: 完成的記錄
+        """
+        records: List[ThumbnailRecord] = []
+        still_pending = []
+        for future in self.pending:
+            if not future.done():
+                still_pending.append(future)
+            elif future.exception() is None:
+                records.extend(future.result())
+            else:
+                logger.error("縮略圖生成失敗：%s", future.exception())
+        self.pending = still_pending
+        self._submit()
+        return records
+
+    def is_idle(self) -> bool:
+        """佇列與進程池中都沒有工作時返回 True"""
+        return not self.queue and not self.pending
+
+    def shutdown(self) -> None:
+        """取消排隊中的工作並關閉進程池"""
+        self.queue.clear()
+        self.requested.clear()
+        for future in self.pending:
+            future.cancel()
+        self.pending = []
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
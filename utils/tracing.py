@@ -0,0 +1,255 @@
+"""
+分級日誌與耗時區段（span）追蹤
+
+- get_logger()：返回 prompt_reader 之下的 logging 記錄器。預設只輸出警告以上，
+  除錯訊息以 %s 參數延遲格式化，關閉時不會建立字串（例如完整的提示詞列表）
+- span()：以 with 語句量測一段程式的耗時。追蹤關閉時返回共用的空物件，
+  只多一次屬性判斷；開啟時記錄名稱、開始時間、耗時、執行緒與參數
+- export_trace()：將記錄匯出為 JSON（含各區段的統計）或 Chrome trace
+  （可在 chrome://tracing 或 https://ui.perfetto.dev 打開）
+
+區段名稱：decode、resize、metadata、txt_read、txt_write、gemini、gemini_upload。
+"""
+from typing import Any, Deque, Dict, List, NamedTuple, Optional
+from collections import deque
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+
+LOGGER_NAME = 'prompt_reader'
+TRACE_FORMATS = ('chrome', 'json')
+# 記錄的區段數上限，超過時丟棄最舊的記錄
+MAX_SPANS = 1_000_000
+
+logging.getLogger(LOGGER_NAME).addHandler(logging.NullHandler())
+_stream_handler: Optional[logging.Handler] = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    獲取模組的記錄器
+
+    Args:
+        name (str): 模組名稱（通常為 __name__）
+
+    Returns:
+        logging.Logger: prompt_reader.<name> 記錄器
+    """
+    return logging.getLogger(f'{LOGGER_NAME}.{name}')
+
+
+def setup_logging(level: Optional[str] = None) -> None:
+    """
+    設置日誌等級並輸出到標準錯誤
+
+    Args:
+        level (Optional[str]): DEBUG / INFO / WARNING / ERROR，
+            省略時讀取環境變量 PROMPT_READER_LOG_LEVEL，預設為 WARNING
+    """
+    global _stream_handler
+    level = (level or os.getenv('PROMPT_READER_LOG_LEVEL') or 'WARNING').upper()
+    if not isinstance(logging.getLevelName(level), int):
+        print(f"未知的日誌等級 {level}，使用 WARNING", file=sys.stderr)
+        level = 'WARNING'
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(level)
+    if _stream_handler is None:
+        _stream_handler = logging.StreamHandler()
+        _stream_handler.setFormatter(logging.Formatter(
+            '%(asctime)s %(levelname)s %(name)s: %(message)s'))
+        logger.addHandler(_stream_handler)
+
+
+class SpanRecord(NamedTuple):
+    """一個已結束的區段"""
+    name: str
+    start_ns: int
+    duration_ns: int
+    thread_id: int
+    thread_name: str
+    args: Dict[str, Any]
+
+
+class _NullSpan:
+    """追蹤關閉時使用的空區段"""
+    __slots__ = ()
+
+    def __enter__(self) -> '_NullSpan':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'args', 'start_ns')
+
+    def __init__(self, tracer: 'Tracer', name: str, args: Dict[str, Any]) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.start_ns = 0
+
+    def __enter__(self) -> '_Span':
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        end_ns = time.perf_counter_ns()
+        thread = threading.current_thread()
+        # deque.append 是原子操作，多個執行緒同時記錄不需要加鎖
+        self.tracer.spans.append(SpanRecord(
+            self.name, self.start_ns, end_ns - self.start_ns,
+            thread.ident or 0, thread.name, self.args))
+
+
+class Tracer:
+    """收集區段記錄的追蹤器"""
+
+    def __init__(self, max_spans: int = MAX_SPANS) -> None:
+        self.enabled = False
+        self.spans: Deque[SpanRecord] = deque(maxlen=max_spans)
+        self.origin_ns = time.perf_counter_ns()
+
+    def enable(self) -> None:
+        """開始記錄"""
+        self.enabled = True
+
+    def disable(self) -> None:
+        """停止記錄（已記錄的區段保留）"""
+        self.enabled = False
+
+    def clear(self) -> None:
+        """清空記錄"""
+        self.spans.clear()
+        self.origin_ns = time.perf_counter_ns()
+
+    def span(self, name: str, **args: Any):
+        """
+        建立區段
+
+        Args:
+            name (str): 區段名稱
+            **args: 附加在記錄上的參數（例如路徑）
+
+        Returns:
+            with 語句使用的區段物件
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, args)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        各區段名稱的統計
+
+        Returns:
+            Dict[str, Dict[str, float]]: 名稱 -> {count, total_ms, mean_ms, max_ms}
+        """
+        result: Dict[str, Dict[str, float]] = {}
+        for record in list(self.spans):
+            stats = result.setdefault(
+                record.name, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            ms = record.duration_ns / 1e6
+            stats['count'] += 1
+            stats['total_ms'] += ms
+            stats['max_ms'] = max(stats['max_ms'], ms)
+        for stats in result.values():
+            stats['mean_ms'] = stats['total_ms'] / stats['count']
+        return result
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """轉換為 Chrome trace 事件格式（完整事件 ph='X'，時間單位為微秒）"""
+        pid = os.getpid()
+        events: List[Dict[str, Any]] = []
+        thread_names: Dict[int, str] = {}
+        for record in list(self.spans):
+            thread_names[record.thread_id] = record.thread_name
+            events.append({
+                'name': record.name, 'cat': record.name.split('_')[0], 'ph': 'X',
+                'ts': (record.start_ns - self.origin_ns) / 1000,
+                'dur': record.duration_ns / 1000,
+                'pid': pid, 'tid': record.thread_id,
+                'args': {key: str(value) for key, value in record.args.items()},
+            })
+        for tid, thread_name in thread_names.items():
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+                           'args': {'name': thread_name}})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def to_json(self) -> Dict[str, Any]:
+        """轉換為包含統計與每個區段的 JSON 物件（時間單位為毫秒）"""
+        return {
+            'summary': self.summary(),
+            'spans': [{
+                'name': record.name,
+                'start_ms': (record.start_ns - self.origin_ns) / 1e6,
+                'duration_ms': record.duration_ns / 1e6,
+                'thread': record.thread_name,
+                'args': {key: str(value) for key, value in record.args.items()},
+            } for record in list(self.spans)],
+        }
+
+    def export(self, path: str, fmt: str = 'chrome') -> int:
+        """
+        將記錄寫入文件
+
+        Args:
+            path (str): 輸出路徑
+            fmt (str): 'chrome' 或 'json'
+
+        Returns:
+            int: 匯出的區段數
+        """
+        if fmt not in TRACE_FORMATS:
+            raise ValueError(f"不支援的追蹤格式：{fmt}")
+        data = self.to_chrome_trace() if fmt == 'chrome' else self.to_json()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        return len(self.spans)
+
+
+# 全程序共用的追蹤器
+tracer = Tracer()
+# 在全局追蹤器上建立區段：with span('decode', path=path): ...
+span = tracer.span
+
+
+def start_tracing(path: Optional[str] = None) -> Optional[str]:
+    """
+    開啟追蹤
+
+    Args:
+        path (Optional[str]): 匯出路徑，省略時讀取環境變量 PROMPT_READER_TRACE，
+            兩者皆無時不開啟
+
+    Returns:
+        Optional[str]: 實際使用的匯出路徑，未開啟時返回 None
+    """
+    path = path or os.getenv('PROMPT_READER_TRACE')
+    if path:
+        tracer.enable()
+    return path
+
+
+def export_trace(path: str, fmt: Optional[str] = None) -> None:
+    """
+    匯出全局追蹤器的記錄
+
+    Args:
+        path (str): 輸出路徑
+        fmt (Optional[str]): 'chrome' 或 'json'，省略時讀取環境變量 PROMPT_READER_TRACE_FORMAT，預設為 chrome
+    """
+    fmt = fmt or os.getenv('PROMPT_READER_TRACE_FORMAT') or 'chrome'
+    try:
+        count = tracer.export(path, fmt)
+        print(f"已匯出 {count} 個追蹤區段到 {path}", file=sys.stderr)
+    except (OSError, ValueError) as e:
+        print(f"無法匯出追蹤記錄：{str(e)}", file=sys.stderr)
@@ -1,6 +1,9 @@
 from typing import Dict, List, Optional
 import json
 import os
+from utils.tracing import get_logger
+
+logger = get_logger(__name__)
 
 
 class TranslationManager:
@@ -33,7 +36,7 @@ class TranslationManager:
                 with open(json_path, 'r', encoding='utf-8') as f:
                     self.translations[lang_code] = json.load(f)
             except Exception as e:
-                print(f"無法加載 {lang_code} 的翻譯文件：{str(e)}")
+                logger.error("無法加載 %s 的翻譯文件：%s", lang_code, e)
                 # 如果加載失敗，使用空字典
                 self.translations[lang_code] = {}
 
@@ -0,0 +1,173 @@
+"""
+上傳到 Gemini 之前的圖片預處理
+
+把圖片縮小到最長邊不超過 max_edge，再以 JPEG 或 WebP 重新編碼，
+上傳的位元組數與序列化時間都會大幅下降。編碼結果按圖片快取，
+同一張圖片重複請求時不需要再次縮放與編碼。
+"""
+from typing import Hashable, NamedTuple, Optional, Tuple
+from collections import OrderedDict
+import io
+import os
+import threading
+import time
+from PIL import Image
+from utils.tracing import get_logger
+
+logger = get_logger(__name__)
+
+
+UPLOAD_FORMATS = ('JPEG', 'WEBP')
+
+# 重採樣前保留的縮小餘量，與顯示圖片的縮放相同
+REDUCING_GAP = 2
+
+
+class UploadSettings(NamedTuple):
+    """上傳圖片的預處理設定"""
+    max_edge: int = 1024
+    format: str = 'JPEG'
+    quality: int = 85
+
+    @classmethod
+    def from_env(cls) -> 'UploadSettings':
+        """
+        從環境變量讀取設定：GEMINI_UPLOAD_MAX_EDGE、GEMINI_UPLOAD_FORMAT、
+        GEMINI_UPLOAD_QUALITY，未設置或無效時使用預設值
+
+        Returns:
+            UploadSettings: 設定
+        """
+        default = cls()
+        try:
+            max_edge = int(os.getenv('GEMINI_UPLOAD_MAX_EDGE', default.max_edge))
+            quality = int(os.getenv('GEMINI_UPLOAD_QUALITY', default.quality))
+        except ValueError:
+            logger.warning("GEMINI_UPLOAD_MAX_EDGE / GEMINI_UPLOAD_QUALITY 必須是整數，使用預設值")
+            return default
+        fmt = os.getenv('GEMINI_UPLOAD_FORMAT', default.format).upper()
+        if fmt not in UPLOAD_FORMATS:
+            fmt = default.format
+        return cls(max_edge=max_edge, format=fmt, quality=min(max(quality, 1), 100))
+
+    @property
+    def mime_type(self) -> str:
+        """編碼結果的 MIME 類型"""
+        return 'image/webp' if self.format == 'WEBP' else 'image/jpeg'
+
+
+class UploadPayload(NamedTuple):
+    """編碼後的上傳內容"""
+    data: bytes
+    mime_type: str
+    size: Tuple[int, int]
+
+
+def open_for_upload(image_path: str, settings: UploadSettings) -> Image.Image:
+    """
+    打開並解碼圖片；JPEG 直接以縮小的比例解碼
+
+    Args:
+        image_path (str): 圖片路徑
+        settings (UploadSettings): 預處理設定
+
+    Returns:
+        Image.Image: 已完整解碼、可在文件關閉後使用的圖片
+    """
+    with Image.open(image_path) as img:
+        if img.format == 'JPEG' and settings.max_edge > 0:
+            edge = settings.max_edge * REDUCING_GAP
+            img.draft('RGB', (edge, edge))
+        img.load()
+        return img.copy()
+
+
+def encode_for_upload(img: Image.Image, settings: UploadSettings) -> UploadPayload:
+    """
+    縮小並重新編碼圖片
+
+    Args:
+        img (Image.Image): 原始圖片
+        settings (UploadSettings): 預處理設定
+
+    Returns:
+        UploadPayload: 編碼後的內容
+    """
+    start = time.perf_counter()
+    original = img
+
+    has_alpha = img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info)
+    if settings.format == 'WEBP' and has_alpha:
+        img = img.convert('RGBA')
+    elif has_alpha:
+        # JPEG 不支援透明度，與顯示時相同地合成到白色背景上
+        rgba = img.convert('RGBA')
+        img = Image.new('RGB', rgba.size, 'white')
+        img.paste(rgba, mask=rgba.getchannel('A'))
+    elif img.mode != 'RGB':
+        img = img.convert('RGB')
+
+    if settings.max_edge > 0 and max(img.size) > settings.max_edge:
+        if img is original:
+            img = img.copy()
+        img.thumbnail((settings.max_edge, settings.max_edge),
+                      Image.Resampling.LANCZOS, reducing_gap=REDUCING_GAP)
+
+    buffer = io.BytesIO()
+    img.save(buffer, format=settings.format, quality=settings.quality)
+    data = buffer.getvalue()
+
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    logger.debug("上傳圖片：%dx%d -> %dx%d %s，%.1f KB，編碼 %.1f ms",
+                 original.width, original.height, img.width, img.height,
+                 settings.format, len(data) / 1024, elapsed_ms)
+    return UploadPayload(data, settings.mime_type, img.size)
+
+
+class UploadPayloadCache:
+    """按位元組數限制容量的上傳內容 LRU 快取"""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024) -> None:
+        """
+        初始化快取
+
+        Args:
+            max_bytes (int): 所有編碼內容的總位元組上限
+        """
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: 'OrderedDict[Hashable, UploadPayload]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[UploadPayload]:
+        """查詢快取，未命中時返回 None"""
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def put(self, key: Hashable, payload: UploadPayload) -> None:
+        """寫入快取，超過容量時淘汰最久未使用的內容"""
+        if len(payload.data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= len(old.data)
+            self._entries[key] = payload
+            self.current_bytes += len(payload.data)
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= len(evicted.data)
+
+    def clear(self) -> None:
+        """清空快取"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
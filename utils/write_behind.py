@@ -0,0 +1,169 @@
+"""
+延遲合併寫入（write-behind）的文本文件保存
+
+界面每次編輯只把文件的最新內容放入記憶體並標記為待寫入，
+同一文件在防抖時間內的多次編輯合併為一次寫入，由背景執行緒以原子方式寫入磁碟。
+尚未寫入的內容可以用 pending() 讀回，因此切換圖片後再回來也能看到最新的編輯。
+"""
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+import threading
+import time
+from utils.file_utils import atomic_write_text
+from utils.tracing import get_logger, span
+
+logger = get_logger(__name__)
+
+
+class _PendingWrite(NamedTuple):
+    content: str
+    deadline: float
+    on_written: Optional[Callable[[str], None]]
+
+
+class WriteBehindWriter:
+    """以背景執行緒延遲寫入文本文件，同一文件的連續編輯只寫入最後的內容"""
+
+    def __init__(self, debounce: float = 0.5,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        初始化寫入器
+
+        Args:
+            debounce (float): 最後一次編輯後等待多久才寫入（秒）
+            clock (Callable[[], float]): 時鐘函數，測試時可替換
+        """
+        self.debounce = debounce
+        self.clock = clock
+        self.writes = 0
+        self._pending: Dict[str, _PendingWrite] = {}
+        # 正在寫入的文件，flush() 需要等它們完成
+        self._writing: Dict[str, str] = {}
+        self._errors: List[Tuple[str, str]] = []
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(
+            target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+
+    def schedule(self, path: str, content: str,
+                 on_written: Optional[Callable[[str], None]] = None) -> None:
+        """
+        標記文件待寫入（不阻塞），之前尚未寫入的內容會被取代
+
+        Args:
+            path (str): 文件路徑
+            content (str): 文件的完整內容
+            on_written (Optional[Callable[[str], None]]): 寫入完成後在背景執行緒中調用，參數為路徑
+        """
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("寫入器已關閉")
+            self._pending[path] = _PendingWrite(
+                content, self.clock() + self.debounce, on_written)
+            self._condition.notify_all()
+
+    def pending(self, path: str) -> Optional[str]:
+        """
+        返回文件尚未寫入磁碟的最新內容
+
+        Args:
+            path (str): 文件路徑
+
+        Returns:
+            Optional[str]: 待寫入的內容，沒有待寫入的編輯時返回 None
+        """
+        with self._condition:
+            entry = self._pending.get(path)
+            if entry is not None:
+                return entry.content
+            return self._writing.get(path)
+
+    def flush(self, wait: bool = False, timeout: Optional[float] = None) -> bool:
+        """
+        立即寫入所有待寫入的文件（不再等待防抖時間）
+
+        Args:
+            wait (bool): 是否等待寫入完成
+            timeout (Optional[float]): 等待的最長秒數
+
+        Returns:
+            bool: 所有文件都已寫入時返回 True（wait 為 False 時表示是否沒有待寫入的文件）
+        """
+        with self._condition:
+            now = self.clock()
+            for path, entry in self._pending.items():
+                self._pending[path] = entry._replace(deadline=min(entry.deadline, now))
+            self._condition.notify_all()
+            if wait:
+                self._condition.wait_for(
+                    lambda: not self._pending and not self._writing, timeout)
+            return not self._pending and not self._writing
+
+    def drain_errors(self) -> List[Tuple[str, str]]:
+        """
+        取出寫入失敗的記錄
+
+        Returns:
+            List[Tuple[str, str]]: （文件路徑, 錯誤訊息）
+        """
+        with self._condition:
+            errors, self._errors = self._errors, []
+            return errors
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """
+        寫入所有待寫入的文件並停止背景執行緒（例如程式退出時）
+
+        Returns:
+            bool: 所有文件都已寫入時返回 True
+        """
+        done = self.flush(wait=True, timeout=timeout)
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+        return done
+
+    def _take_due(self) -> Optional[List[Tuple[str, _PendingWrite]]]:
+        """等待到有文件到期，返回並移出到期的文件；關閉且沒有工作時返回 None"""
+        with self._condition:
+            while True:
+                if self._pending:
+                    now = self.clock()
+                    due = [(path, entry) for path, entry in self._pending.items()
+                           if entry.deadline <= now]
+                    if due:
+                        for path, entry in due:
+                            del self._pending[path]
+                            self._writing[path] = entry.content
+                        return due
+                    next_deadline = min(entry.deadline for entry in self._pending.values())
+                    self._condition.wait(next_deadline - now)
+                elif self._closed:
+                    return None
+                else:
+                    self._condition.wait()
+
+    def _run(self) -> None:
+        """背景執行緒：寫入到期的文件"""
+        while True:
+            due = self._take_due()
+            if due is None:
+                return
+            for path, entry in due:
+                try:
+                    with span('txt_write', path=path):
+                        atomic_write_text(path, entry.content)
+                    if entry.on_written is not None:
+                        entry.on_written(path)
+                    error = None
+                except Exception as e:
+                    logger.error("無法寫入 %s：%s", path, e)
+                    error = str(e)
+                with self._condition:
+                    del self._writing[path]
+                    if error is None:
+                        self.writes += 1
+                    else:
+                        self._errors.append((path, error))
+                    self._condition.notify_all()